@@ -6,20 +6,19 @@ You can download the necessary files from there.
 
 We have used it in our paper (https://arxiv.org/pdf/2004.09813.pdf) in Section 4.2 to evaluate different multilingual models.
 
-This script requires that you have FAISS installed:
-https://github.com/facebookresearch/faiss
+The parallel sentences are mined with sentence_transformers.util.margin_mining, which requires no
+additional dependencies, also not for the approximate nearest neighbor search.
 """
 
 import os
 import pickle
 from collections import defaultdict
 
-import numpy as np
 import torch
-from bitext_mining_utils import kNN, score_candidates
 from sklearn.decomposition import PCA
 
 from sentence_transformers import SentenceTransformer, models
+from sentence_transformers.util import margin_mining
 
 # Model we want to use for bitext mining. LaBSE achieves state-of-the-art performance
 model_name = "LaBSE"
@@ -146,50 +145,34 @@ else:
 
 ##### Now we start to search for parallel (translated) sentences
 
-# Normalize embeddings
 x = source_embeddings
 y = target_embeddings
 
 print("Shape Source:", x.shape)
 print("Shape Target:", y.shape)
 
-x = x / np.linalg.norm(x, axis=1, keepdims=True)
-y = y / np.linalg.norm(y, axis=1, keepdims=True)
-
-# Perform kNN in both directions
-x2y_sim, x2y_ind = kNN(x, y, knn_neighbors, use_ann_search, ann_num_clusters, ann_num_cluster_probe)
-x2y_mean = x2y_sim.mean(axis=1)
-
-y2x_sim, y2x_ind = kNN(y, x, knn_neighbors, use_ann_search, ann_num_clusters, ann_num_cluster_probe)
-y2x_mean = y2x_sim.mean(axis=1)
-
-# Compute forward and backward scores
-margin = lambda a, b: a / b
-fwd_scores = score_candidates(x, y, x2y_ind, x2y_mean, y2x_mean, margin)
-bwd_scores = score_candidates(y, x, y2x_ind, y2x_mean, x2y_mean, margin)
-fwd_best = x2y_ind[np.arange(x.shape[0]), fwd_scores.argmax(axis=1)]
-bwd_best = y2x_ind[np.arange(y.shape[0]), bwd_scores.argmax(axis=1)]
-
-indices = np.stack(
-    [np.concatenate([np.arange(x.shape[0]), bwd_best]), np.concatenate([fwd_best, np.arange(y.shape[0])])], axis=1
+# Mine the candidates with the highest ratio margin in both directions, based on the k nearest neighbors of each
+# element. The embeddings are normalized by margin_mining, and the ANN search uses an inverted file index
+scores, source_indices, target_indices = margin_mining(
+    x,
+    y,
+    top_k=knn_neighbors,
+    margin="ratio",
+    min_score=min_threshold,
+    backend="ivf" if use_ann_search else "exact",
+    num_clusters=max(1, min(ann_num_clusters, int(y.shape[0] / 1000))),
+    num_probes=ann_num_cluster_probe,
+    show_progress_bar=True,
 )
-scores = np.concatenate([fwd_scores.max(axis=1), bwd_scores.max(axis=1)])
 seen_src, seen_trg = set(), set()
 
 # Extract list of parallel sentences
 bitext_list = []
-for i in np.argsort(-scores):
-    src_ind, trg_ind = indices[i]
-    src_ind = int(src_ind)
-    trg_ind = int(trg_ind)
-
-    if scores[i] < min_threshold:
-        break
-
+for score, src_ind, trg_ind in zip(scores.tolist(), source_indices.tolist(), target_indices.tolist()):
     if src_ind not in seen_src and trg_ind not in seen_trg:
         seen_src.add(src_ind)
         seen_trg.add(trg_ind)
-        bitext_list.append([scores[i], source_ids[src_ind], target_ids[trg_ind]])
+        bitext_list.append([score, source_ids[src_ind], target_ids[trg_ind]])
 
 
 # Measure Performance by computing the threshold
@@ -0,0 +1,75 @@
+"""
+This script benchmarks the approximate nearest neighbor backends of `util.paraphrase_mining_embeddings` and
+`util.community_detection` against the exact brute-force search. It reports the neighbor recall, i.e. the fraction of the
+exact top-k neighbors that is also found by the approximate backend, the overlap of the mined paraphrase pairs and the
+runtime of each backend.
+
+The "ivf" backend needs no additional dependencies, while the "faiss" and "usearch" backends require
+`pip install faiss-cpu` (or `faiss-gpu`) and `pip install usearch`, respectively.
+"""
+
+import time
+
+from datasets import load_dataset
+
+from sentence_transformers import SentenceTransformer, util
+
+# 1. Load the quora corpus with questions
+dataset = load_dataset("quora", split="train").map(
+    lambda batch: {"text": [text for sample in batch["questions"] for text in sample["text"]]},
+    batched=True,
+    remove_columns=["questions", "is_duplicate"],
+)
+max_corpus_size = 100_000
+corpus = list(dict.fromkeys(dataset["text"]))[:max_corpus_size]
+
+# 2. Load the model and encode the corpus
+model = SentenceTransformer("all-MiniLM-L6-v2")
+embeddings = model.encode(corpus, normalize_embeddings=True, convert_to_tensor=True, show_progress_bar=True)
+
+# 3. Compute the exact neighbors, paraphrases and communities as a reference
+top_k = 10
+start_time = time.time()
+exact_scores, exact_indices = util.nearest_neighbors(embeddings, top_k=top_k, backend="exact")
+print(f"Exact nearest neighbors: {time.time() - start_time:.2f} sec")
+
+start_time = time.time()
+exact_pairs = util.paraphrase_mining_embeddings(embeddings, top_k=top_k, max_pairs=100_000)
+print(f"Exact paraphrase mining: {time.time() - start_time:.2f} sec")
+exact_pairs = {(i, j) for _, i, j in exact_pairs}
+
+start_time = time.time()
+exact_communities = util.community_detection(embeddings, threshold=0.75, min_community_size=10)
+print(f"Exact community detection: {time.time() - start_time:.2f} sec, {len(exact_communities)} communities")
+
+# 4. Compare the approximate backends against the exact results
+for backend in ("ivf", "faiss", "usearch"):
+    try:
+        start_time = time.time()
+        scores, indices = util.nearest_neighbors(embeddings, top_k=top_k, backend=backend)
+        neighbors_time = time.time() - start_time
+    except ImportError:
+        print(f"\nSkipping the {backend} backend as it is not installed.")
+        continue
+
+    recall = (
+        sum(
+            len(set(approx_row) & set(exact_row))
+            for approx_row, exact_row in zip(indices.tolist(), exact_indices.tolist())
+        )
+        / exact_indices.numel()
+    )
+
+    start_time = time.time()
+    pairs = util.paraphrase_mining_embeddings(embeddings, top_k=top_k, max_pairs=100_000, neighbor_backend=backend)
+    pairs_time = time.time() - start_time
+    pairs_overlap = len({(i, j) for _, i, j in pairs} & exact_pairs) / max(len(exact_pairs), 1)
+
+    start_time = time.time()
+    communities = util.community_detection(embeddings, threshold=0.75, min_community_size=10, neighbor_backend=backend)
+    communities_time = time.time() - start_time
+
+    print(f"\nBackend: {backend}")
+    print(f"Nearest neighbors: {neighbors_time:.2f} sec, Recall@{top_k}: {recall:.4f}")
+    print(f"Paraphrase mining: {pairs_time:.2f} sec, overlap with the exact pairs: {pairs_overlap:.4f}")
+    print(f"Community detection: {communities_time:.2f} sec, {len(communities)} communities")
@@ -71,7 +71,7 @@ for dim in matryoshka_dims:
             truncate_dim=dim,
         )
     )
-dev_evaluator = SequentialEvaluator(evaluators, main_score_function=lambda scores: scores[0])
+dev_evaluator = SequentialEvaluator(evaluators, main_score_function=lambda scores: scores[0], cache_embeddings=True)
 
 # 5. Define the training arguments
 args = SentenceTransformerTrainingArguments(
@@ -120,7 +120,7 @@ for dim in matryoshka_dims:
             truncate_dim=dim,
         )
     )
-test_evaluator = SequentialEvaluator(evaluators)
+test_evaluator = SequentialEvaluator(evaluators, cache_embeddings=True)
 test_evaluator(model)
 
 # 8. Save the trained & evaluated model locally
@@ -1,21 +1,29 @@
 from __future__ import annotations
 
+import copy
+import inspect
 import json
 import logging
+import math
 import os
+import queue
 import tempfile
 import traceback
+from collections.abc import Iterable, Iterator
 from fnmatch import fnmatch
+from itertools import islice
+from multiprocessing import Queue
 from pathlib import Path
 from typing import Any, Callable, Literal, overload
 
 import huggingface_hub
 import numpy as np
 import torch
+import torch.multiprocessing as mp
 from huggingface_hub import HfApi
 from packaging import version
 from torch import nn
-from tqdm.autonotebook import trange
+from tqdm.autonotebook import tqdm, trange
 from transformers import (
     AutoConfig,
     AutoModelForSequenceClassification,
@@ -23,6 +31,7 @@ from transformers import (
     PretrainedConfig,
     PreTrainedModel,
     PreTrainedTokenizer,
+    is_torch_npu_available,
 )
 from transformers.utils import PushToHubMixin
 from typing_extensions import deprecated
@@ -30,6 +39,7 @@ from typing_extensions import deprecated
 from sentence_transformers import __version__
 from sentence_transformers.cross_encoder.fit_mixin import FitMixin
 from sentence_transformers.cross_encoder.model_card import CrossEncoderModelCardData, generate_model_card
+from sentence_transformers.cross_encoder.score_cache import ScoreCache
 from sentence_transformers.cross_encoder.util import (
     cross_encoder_init_args_decorator,
     cross_encoder_predict_rank_args_decorator,
@@ -538,6 +548,8 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
         apply_softmax: bool | None = ...,
         convert_to_numpy: Literal[False] = ...,
         convert_to_tensor: Literal[False] = ...,
+        max_tokens_per_batch: int | None = ...,
+        score_cache: ScoreCache | None = ...,
     ) -> torch.Tensor: ...
 
     @overload
@@ -550,6 +562,8 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
         apply_softmax: bool | None = ...,
         convert_to_numpy: Literal[True] = True,
         convert_to_tensor: Literal[False] = False,
+        max_tokens_per_batch: int | None = ...,
+        score_cache: ScoreCache | None = ...,
     ) -> np.ndarray: ...
 
     @overload
@@ -562,6 +576,8 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
         apply_softmax: bool | None = ...,
         convert_to_numpy: bool = ...,
         convert_to_tensor: Literal[True] = ...,
+        max_tokens_per_batch: int | None = ...,
+        score_cache: ScoreCache | None = ...,
     ) -> torch.Tensor: ...
 
     @overload
@@ -574,6 +590,8 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
         apply_softmax: bool | None = ...,
         convert_to_numpy: Literal[False] = ...,
         convert_to_tensor: Literal[False] = ...,
+        max_tokens_per_batch: int | None = ...,
+        score_cache: ScoreCache | None = ...,
     ) -> list[torch.Tensor]: ...
 
     @torch.inference_mode()
@@ -587,6 +605,8 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
         apply_softmax: bool | None = False,
         convert_to_numpy: bool = True,
         convert_to_tensor: bool = False,
+        max_tokens_per_batch: int | None = None,
+        score_cache: ScoreCache | None = None,
     ) -> list[torch.Tensor] | np.ndarray | torch.Tensor:
         """
         Performs predictions with the CrossEncoder on the given sentence pairs.
@@ -606,6 +626,14 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
                 a list of PyTorch tensors. Defaults to True.
             convert_to_tensor (bool, optional): Whether the output should be one large tensor. Overwrites `convert_to_numpy`.
                 Defaults to False.
+            max_tokens_per_batch (int, optional): If set, batches are formed by a token budget instead of ``batch_size``:
+                every batch holds as many pairs as fit in this many (padded) tokens. This requires tokenizing all pairs
+                upfront to get their exact lengths, but gives large batches of short pairs and small batches of long
+                pairs. Defaults to None.
+            score_cache (ScoreCache, optional): A :class:`~sentence_transformers.cross_encoder.ScoreCache` with
+                previously predicted scores. Pairs whose scores are cached for this model, activation function and
+                ``apply_softmax`` are neither tokenized nor passed through the model, and the scores of the other
+                pairs are added to the cache. The scores are returned as float32. Defaults to None.
 
         Returns:
             Union[List[torch.Tensor], np.ndarray, torch.Tensor]: Predictions for the passed sentence pairs.
@@ -624,6 +652,39 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
                 model.predict(sentences)
                 # => array([0.6912767, 0.4303499], dtype=float32)
         """
+        return self._predict(
+            sentences,
+            batch_size=batch_size,
+            show_progress_bar=show_progress_bar,
+            activation_fn=activation_fn,
+            apply_softmax=apply_softmax,
+            convert_to_numpy=convert_to_numpy,
+            convert_to_tensor=convert_to_tensor,
+            max_tokens_per_batch=max_tokens_per_batch,
+            score_cache=score_cache,
+        )
+
+    @torch.inference_mode()
+    def _predict(
+        self,
+        sentences: list[tuple[str, str]] | list[list[str]] | tuple[str, str] | list[str],
+        batch_size: int = 32,
+        show_progress_bar: bool | None = None,
+        activation_fn: Callable | None = None,
+        apply_softmax: bool | None = False,
+        convert_to_numpy: bool = True,
+        convert_to_tensor: bool = False,
+        max_tokens_per_batch: int | None = None,
+        score_cache: ScoreCache | None = None,
+        max_length: int | None = None,
+    ) -> list[torch.Tensor] | np.ndarray | torch.Tensor:
+        """
+        Implements :meth:`predict`, with the pairs truncated to ``max_length`` tokens instead of ``self.max_length``
+        if it is set. The truncation is not part of the keys of the ``score_cache``, so the two cannot be combined.
+        """
+        if max_length is not None and score_cache is not None:
+            raise ValueError("A `score_cache` cannot be used with a custom `max_length`.")
+
         input_was_singular = False
         if isinstance(sentences[0], str):  # Cast an individual pair to a list with length 1
             sentences = [sentences]
@@ -637,14 +698,44 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
         if activation_fn is not None:
             self.set_activation_fn(activation_fn, set_default=False)
 
-        pred_scores = []
+        # Predict the longest pairs first, so pairs of similar lengths are batched together, as in
+        # SentenceTransformer.encode. The predictions of every batch are written into one preallocated
+        # (num_pairs, num_labels) tensor at the original positions of the pairs.
+        pred_scores = None
+        uncached_indices = np.arange(len(sentences))
+        if score_cache is not None:
+            pair_keys = score_cache.pair_keys(self, sentences, apply_softmax=apply_softmax)
+            cached_scores = score_cache.get_many(pair_keys)
+            is_cached = np.array([key in cached_scores for key in pair_keys], dtype=bool)
+            uncached_indices = np.flatnonzero(~is_cached)
+            if is_cached.any():
+                cached_indices = np.flatnonzero(is_cached)
+                pred_scores = torch.empty(
+                    (len(sentences), self.config.num_labels), dtype=torch.float32, device=self.model.device
+                )
+                pred_scores[torch.from_numpy(cached_indices).to(pred_scores.device)] = torch.from_numpy(
+                    np.stack([cached_scores[pair_keys[idx]] for idx in cached_indices])
+                ).to(pred_scores.device)
+            logger.debug(
+                f"Found the scores of {len(sentences) - len(uncached_indices)} of {len(sentences)} pairs in the cache."
+            )
+
         self.eval()
-        for start_index in trange(0, len(sentences), batch_size, desc="Batches", disable=not show_progress_bar):
-            batch = sentences[start_index : start_index + batch_size]
+        batches = []
+        if len(uncached_indices):
+            uncached_sentences = [sentences[idx] for idx in uncached_indices]
+            batches = [
+                uncached_indices[batch_indices]
+                for batch_indices in self._length_sorted_batches(
+                    uncached_sentences, batch_size, max_tokens_per_batch, max_length=max_length
+                )
+            ]
+        for batch_indices in tqdm(batches, desc="Batches", disable=not show_progress_bar):
             features = self.tokenizer(
-                batch,
+                [sentences[idx] for idx in batch_indices],
                 padding=True,
                 truncation=True,
+                max_length=max_length,
                 return_tensors="pt",
             )
             features.to(self.model.device)
@@ -653,21 +744,143 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
 
             if apply_softmax and logits.ndim > 1:
                 logits = torch.nn.functional.softmax(logits, dim=1)
-            pred_scores.extend(logits)
+            if pred_scores is None:
+                # Cached scores are stored as float32, so only use the precision of the logits without a cache
+                dtype = torch.float32 if score_cache is not None else logits.dtype
+                pred_scores = torch.empty((len(sentences), logits.shape[1]), dtype=dtype, device=logits.device)
+            pred_scores[torch.from_numpy(batch_indices).to(pred_scores.device)] = logits.to(pred_scores.dtype)
+
+        if score_cache is not None and len(uncached_indices):
+            uncached_scores = pred_scores[torch.from_numpy(uncached_indices).to(pred_scores.device)].cpu().numpy()
+            score_cache.set_many({pair_keys[idx]: scores for idx, scores in zip(uncached_indices, uncached_scores)})
 
         if self.config.num_labels == 1:
-            pred_scores = [score[0] for score in pred_scores]
+            pred_scores = pred_scores[:, 0]
 
-        if convert_to_tensor:
-            pred_scores = torch.stack(pred_scores)
-        elif convert_to_numpy:
-            pred_scores = np.asarray([score.cpu().detach().float().numpy() for score in pred_scores])
+        if not convert_to_tensor:
+            pred_scores = pred_scores.cpu().float().numpy() if convert_to_numpy else list(pred_scores)
 
         if input_was_singular:
             pred_scores = pred_scores[0]
 
         return pred_scores
 
+    def predict_iter(
+        self,
+        sentences: Iterable[tuple[str, str] | list[str] | dict[str, str]],
+        batch_size: int = 32,
+        chunk_size: int = 10_000,
+        show_progress_bar: bool | None = None,
+        activation_fn: Callable | None = None,
+        apply_softmax: bool | None = False,
+        convert_to_tensor: bool = False,
+        max_tokens_per_batch: int | None = None,
+        score_cache: ScoreCache | None = None,
+    ) -> Iterator[np.ndarray | torch.Tensor]:
+        """
+        Performs predictions with the CrossEncoder on a stream of sentence pairs, e.g. from a generator or a
+        :class:`datasets.IterableDataset`, without materializing all pairs at once. The pairs are read in chunks of
+        ``chunk_size`` pairs, and the pairs within every chunk are sorted by length and batched as in :meth:`predict`.
+        Only one chunk of pairs and scores is kept in memory at a time, so arbitrarily many pairs can be scored.
+
+        Args:
+            sentences (Iterable[Union[Tuple[str, str], List[str], Dict[str, str]]]): An iterable of sentence pairs.
+                If the pairs are dictionaries, e.g. the rows of a :class:`datasets.IterableDataset`, then the first
+                two values of every dictionary are used as the pair.
+            batch_size (int, optional): Batch size for encoding. Defaults to 32.
+            chunk_size (int, optional): The number of pairs to read, sort by length and predict at once. Larger chunks
+                give better length-sorted batches, at the cost of more memory. Defaults to 10,000.
+            show_progress_bar (bool, optional): Output progress bar. Defaults to None.
+            activation_fn (callable, optional): Activation function applied on the logits output of the CrossEncoder.
+                If None, the ``model.activation_fn`` will be used. Defaults to None.
+            apply_softmax (bool, optional): If set to True and `model.num_labels > 1`, applies softmax on the logits
+                output. Defaults to False.
+            convert_to_tensor (bool, optional): Whether to yield tensors instead of numpy arrays. Defaults to False.
+            max_tokens_per_batch (int, optional): If set, form batches by this budget of (padded) tokens instead of
+                ``batch_size``, see :meth:`predict`. Defaults to None.
+            score_cache (ScoreCache, optional): A cache of previously predicted scores, see :meth:`predict`.
+                Defaults to None.
+
+        Yields:
+            Union[np.ndarray, torch.Tensor]: The predictions for every chunk of pairs, in the order of the pairs.
+
+        Example:
+            ::
+
+                from datasets import load_dataset
+                from sentence_transformers import CrossEncoder
+
+                model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L6-v2")
+                dataset = load_dataset("sentence-transformers/msmarco", "triplets", split="train", streaming=True)
+                dataset = dataset.select_columns(["query", "positive"])
+                for scores in model.predict_iter(dataset, chunk_size=50_000):
+                    ...
+        """
+        if show_progress_bar is None:
+            show_progress_bar = (
+                logger.getEffectiveLevel() == logging.INFO or logger.getEffectiveLevel() == logging.DEBUG
+            )
+
+        iterator = iter(sentences)
+        with tqdm(desc="Pairs", unit="pairs", disable=not show_progress_bar) as progress_bar:
+            while chunk := list(islice(iterator, chunk_size)):
+                chunk = [list(pair.values())[:2] if isinstance(pair, dict) else pair for pair in chunk]
+                yield self.predict(
+                    chunk,
+                    batch_size=batch_size,
+                    show_progress_bar=False,
+                    activation_fn=activation_fn,
+                    apply_softmax=apply_softmax,
+                    convert_to_tensor=convert_to_tensor,
+                    max_tokens_per_batch=max_tokens_per_batch,
+                    score_cache=score_cache,
+                )
+                progress_bar.update(len(chunk))
+
+    def _text_length(self, pair: tuple[str, str] | list[str]) -> int:
+        """Estimates the length of a pair, i.e. the sum of the lengths of its texts."""
+        return sum(len(text) for text in pair)
+
+    def _token_lengths(
+        self, sentences: list[tuple[str, str]] | list[list[str]], max_length: int | None = None
+    ) -> np.ndarray:
+        """Returns the number of tokens of every pair, truncated to ``max_length`` or to ``self.max_length``."""
+        input_ids = self.tokenizer(
+            sentences, truncation=True, max_length=max_length, return_attention_mask=False, return_token_type_ids=False
+        )["input_ids"]
+        return np.array([len(ids) for ids in input_ids], dtype=np.int64)
+
+    def _length_sorted_batches(
+        self,
+        sentences: list[tuple[str, str]] | list[list[str]],
+        batch_size: int = 32,
+        max_tokens_per_batch: int | None = None,
+        max_length: int | None = None,
+    ) -> list[np.ndarray]:
+        """
+        Splits the pairs into batches of pair indices, sorted from the longest to the shortest pair. Without a
+        ``max_tokens_per_batch``, the lengths are estimated from the text lengths and every batch holds ``batch_size``
+        pairs. Otherwise, the exact token lengths are used and every batch holds as many pairs as fit in the budget.
+        """
+        if max_tokens_per_batch is None:
+            lengths = np.array([self._text_length(pair) for pair in sentences], dtype=np.int64)
+            length_sorted_idx = np.argsort(-lengths, kind="stable")
+            return [
+                length_sorted_idx[start_idx : start_idx + batch_size]
+                for start_idx in range(0, len(length_sorted_idx), batch_size)
+            ]
+
+        lengths = self._token_lengths(sentences, max_length=max_length)
+        length_sorted_idx = np.argsort(-lengths, kind="stable")
+        batches = []
+        start_idx = 0
+        while start_idx < len(length_sorted_idx):
+            # The first pair of every batch is its longest, so it determines the padded length of the batch
+            num_pairs = max(1, max_tokens_per_batch // max(lengths[length_sorted_idx[start_idx]], 1))
+            batches.append(length_sorted_idx[start_idx : start_idx + num_pairs])
+            start_idx += num_pairs
+        return batches
+
     @cross_encoder_predict_rank_args_decorator
     def rank(
         self,
@@ -681,6 +894,11 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
         apply_softmax=False,
         convert_to_numpy: bool = True,
         convert_to_tensor: bool = False,
+        max_tokens_per_batch: int | None = None,
+        cache_query_prefix: bool = False,
+        cascade_model: CrossEncoder | None = None,
+        cascade_max_length: int | None = None,
+        cascade_rescore_size: int | float = 0.2,
     ) -> list[dict[Literal["corpus_id", "score", "text"], int | float | str]]:
         """
         Performs ranking with the CrossEncoder on the given query and documents. Returns a sorted list with the document indices and scores.
@@ -696,6 +914,26 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
             convert_to_numpy (bool, optional): Convert the output to a numpy matrix. Defaults to True.
             apply_softmax (bool, optional): If there are more than 2 dimensions and apply_softmax=True, applies softmax on the logits output. Defaults to False.
             convert_to_tensor (bool, optional): Convert the output to a tensor. Defaults to False.
+            max_tokens_per_batch (int, optional): If set, form batches by this budget of (padded) tokens instead of
+                ``batch_size``, see :meth:`predict`. Defaults to None.
+            cache_query_prefix (bool, optional): If True and the model is a decoder that supports ``past_key_values``,
+                the tokens that all query-document pairs share (i.e. the query) are only processed once, after which
+                their key/value cache is reused for every batch of documents. This gives the same scores as without
+                the cache, but avoids recomputing the query for every document, which helps most for long queries or
+                instructions. Models that do not support a key/value cache, such as encoder-only models, silently
+                fall back to regular predictions. Defaults to False.
+            cascade_model (CrossEncoder, optional): If set, rank in a cascade: first score all documents with this
+                smaller (i.e. cheaper) CrossEncoder, and then only rescore the best ``cascade_rescore_size`` documents
+                with this model. Defaults to None.
+            cascade_max_length (int, optional): If set, rank in a cascade: first score all documents with this model,
+                but with the pairs truncated to ``cascade_max_length`` tokens, and then only rescore the best
+                ``cascade_rescore_size`` documents with the full pairs. Cannot be combined with ``cascade_model``.
+                Defaults to None.
+            cascade_rescore_size (Union[int, float], optional): The number of documents to rescore in the second
+                stage of a cascade if an integer, or the fraction of the documents to rescore if a float. At least
+                ``top_k`` documents are always rescored. The rescored documents are ranked first, followed by the
+                other documents ranked by their (not comparable) first stage scores. The number of tokens that the
+                cascade scored compared to scoring all full pairs is logged at the DEBUG level. Defaults to 0.2.
 
         Returns:
             List[Dict[Literal["corpus_id", "score", "text"], Union[int, float, str]]]: A sorted list with the "corpus_id", "score", and optionally "text" of the documents.
@@ -742,15 +980,48 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
                 "Consider using CrossEncoder.predict() with input pairs instead."
             )
         query_doc_pairs = [[query, doc] for doc in documents]
-        scores = self.predict(
-            sentences=query_doc_pairs,
-            batch_size=batch_size,
-            show_progress_bar=show_progress_bar,
-            activation_fn=activation_fn,
-            apply_softmax=apply_softmax,
-            convert_to_numpy=convert_to_numpy,
-            convert_to_tensor=convert_to_tensor,
-        )
+        scores = None
+        rescored_ids = None
+        if cascade_model is not None or cascade_max_length is not None:
+            scores, rescored_ids = self._predict_cascade(
+                query_doc_pairs,
+                top_k=top_k,
+                cascade_model=cascade_model,
+                cascade_max_length=cascade_max_length,
+                cascade_rescore_size=cascade_rescore_size,
+                cache_query_prefix=cache_query_prefix,
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar,
+                activation_fn=activation_fn,
+                apply_softmax=apply_softmax,
+                max_tokens_per_batch=max_tokens_per_batch,
+            )
+        elif cache_query_prefix and self._supports_query_prefix_cache():
+            scores = self._predict_with_query_prefix_cache(
+                query_doc_pairs,
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar,
+                activation_fn=activation_fn,
+                apply_softmax=apply_softmax,
+                max_tokens_per_batch=max_tokens_per_batch,
+            )
+        elif cache_query_prefix:
+            logger.info("The model does not support a key/value cache, so the query prefix is not cached.")
+
+        if scores is not None and not convert_to_tensor:
+            scores = scores.cpu().float().numpy() if convert_to_numpy else list(scores)
+
+        if scores is None:
+            scores = self.predict(
+                sentences=query_doc_pairs,
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar,
+                activation_fn=activation_fn,
+                apply_softmax=apply_softmax,
+                convert_to_numpy=convert_to_numpy,
+                convert_to_tensor=convert_to_tensor,
+                max_tokens_per_batch=max_tokens_per_batch,
+            )
 
         results = []
         for i, score in enumerate(scores):
@@ -758,9 +1029,547 @@ class CrossEncoder(nn.Module, PushToHubMixin, FitMixin):
             if return_documents:
                 results[-1].update({"text": documents[i]})
 
-        results = sorted(results, key=lambda x: x["score"], reverse=True)
+        if rescored_ids is None:
+            results = sorted(results, key=lambda x: x["score"], reverse=True)
+        else:
+            # The scores of the two cascade stages are not comparable, so the rescored documents always come first
+            results = sorted(results, key=lambda x: (x["corpus_id"] in rescored_ids, x["score"]), reverse=True)
         return results[:top_k]
 
+    def _predict_cascade(
+        self,
+        sentences: list[list[str]],
+        top_k: int | None = None,
+        cascade_model: CrossEncoder | None = None,
+        cascade_max_length: int | None = None,
+        cascade_rescore_size: int | float = 0.2,
+        cache_query_prefix: bool = False,
+        batch_size: int = 32,
+        show_progress_bar: bool | None = None,
+        activation_fn: Callable | None = None,
+        apply_softmax: bool | None = False,
+        max_tokens_per_batch: int | None = None,
+    ) -> tuple[torch.Tensor, set[int]]:
+        """
+        Scores the pairs in two stages: first all pairs with ``cascade_model`` or with the pairs truncated to
+        ``cascade_max_length`` tokens, and then only the best ``cascade_rescore_size`` pairs with this model.
+
+        Returns:
+            Tuple[torch.Tensor, Set[int]]: The scores of the pairs, i.e. the second stage scores for the rescored
+            pairs and the first stage scores for the others, and the indices of the rescored pairs.
+        """
+        if cascade_model is not None and cascade_max_length is not None:
+            raise ValueError("Only one of `cascade_model` and `cascade_max_length` can be set.")
+        if cascade_model is not None and cascade_model.num_labels != 1:
+            raise ValueError("The `cascade_model` must be a CrossEncoder with num_labels=1.")
+        if isinstance(cascade_rescore_size, float) and not 0 < cascade_rescore_size <= 1:
+            raise ValueError(
+                f"`cascade_rescore_size` must be a fraction between 0 and 1 if it is a float, but got {cascade_rescore_size}."
+            )
+
+        predict_kwargs = {
+            "batch_size": batch_size,
+            "show_progress_bar": show_progress_bar,
+            "max_tokens_per_batch": max_tokens_per_batch,
+            "convert_to_tensor": True,
+        }
+        if cascade_model is not None:
+            first_stage_scores = cascade_model.predict(sentences, **predict_kwargs)
+        else:
+            first_stage_scores = self._predict(
+                sentences,
+                activation_fn=activation_fn,
+                apply_softmax=apply_softmax,
+                max_length=min(cascade_max_length, self.max_length),
+                **predict_kwargs,
+            )
+        first_stage_scores = first_stage_scores.float()
+
+        if isinstance(cascade_rescore_size, float):
+            num_rescored = math.ceil(cascade_rescore_size * len(sentences))
+        else:
+            num_rescored = cascade_rescore_size
+        num_rescored = min(max(num_rescored, top_k or 0), len(sentences))
+        rescored_indices = torch.topk(first_stage_scores, num_rescored).indices.cpu()
+        rescored_pairs = [sentences[idx] for idx in rescored_indices.tolist()]
+
+        second_stage_scores = None
+        if cache_query_prefix and self._supports_query_prefix_cache():
+            second_stage_scores = self._predict_with_query_prefix_cache(
+                rescored_pairs,
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar,
+                activation_fn=activation_fn,
+                apply_softmax=apply_softmax,
+                max_tokens_per_batch=max_tokens_per_batch,
+            )
+        if second_stage_scores is None and rescored_pairs:
+            second_stage_scores = self.predict(
+                rescored_pairs, activation_fn=activation_fn, apply_softmax=apply_softmax, **predict_kwargs
+            )
+
+        scores = first_stage_scores.clone()
+        if rescored_pairs:
+            scores[rescored_indices.to(scores.device)] = second_stage_scores.to(scores)
+
+        # Counting the scored tokens requires tokenizing all pairs again, so it is only done when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            full_lengths = self._token_lengths(sentences)
+            if cascade_model is not None:
+                first_stage_lengths = cascade_model._token_lengths(sentences)
+            else:
+                first_stage_lengths = np.minimum(full_lengths, cascade_max_length)
+            first_stage_tokens = int(first_stage_lengths.sum())
+            second_stage_tokens = int(full_lengths[rescored_indices.numpy()].sum())
+            full_tokens = int(full_lengths.sum())
+            scored_tokens = first_stage_tokens + second_stage_tokens
+            logger.debug(
+                f"The cascade scored {scored_tokens} tokens, i.e. {scored_tokens / max(full_tokens, 1):.1%} of the "
+                f"{full_tokens} tokens of the full pairs: {first_stage_tokens} tokens for "
+                f"{len(sentences)} pairs in the first stage, and {second_stage_tokens} tokens for "
+                f"{num_rescored} rescored pairs in the second stage."
+            )
+
+        return scores, set(rescored_indices.tolist())
+
+    def rank_many(
+        self,
+        queries: list[str],
+        documents_per_query: list[list[str]],
+        top_k: int | None = None,
+        return_documents: bool = False,
+        return_arrays: bool = False,
+        batch_size: int = 32,
+        show_progress_bar: bool | None = None,
+        activation_fn: Callable | None = None,
+        apply_softmax: bool | None = False,
+        max_tokens_per_batch: int | None = None,
+    ) -> list[list[dict[Literal["corpus_id", "score", "text"], int | float | str]]] | tuple[np.ndarray, np.ndarray]:
+        """
+        Performs ranking with the CrossEncoder for several queries at once, e.g. to rerank the candidates of a batch
+        of queries in a retrieve-then-rerank setup. Rather than calling :meth:`rank` once per query, which only
+        fills small batches with the pairs of one query, the pairs of all queries are predicted together in one
+        length-sorted stream of full batches. Afterwards, the top-k documents of every query are selected at once.
+
+        Args:
+            queries (List[str]): The queries.
+            documents_per_query (List[List[str]]): For every query, the list of documents to rank. The queries may
+                have different numbers of documents.
+            top_k (Optional[int], optional): Return the top-k documents per query. If None, all documents are
+                returned. Defaults to None.
+            return_documents (bool, optional): If True, also returns the documents. Only used if ``return_arrays`` is
+                False. Defaults to False.
+            return_arrays (bool, optional): If True, returns a tuple of ``corpus_ids`` and ``scores`` numpy arrays
+                with shape (num_queries, k) instead of lists of dictionaries, where ``k`` is ``top_k`` or the largest
+                number of documents of a query. Rows of queries with fewer than ``k`` documents are padded with
+                ``-1`` corpus ids and ``nan`` scores. Defaults to False.
+            batch_size (int, optional): Batch size for encoding. Defaults to 32.
+            show_progress_bar (bool, optional): Output progress bar. Defaults to None.
+            activation_fn (callable, optional): Activation function applied on the logits output of the CrossEncoder.
+                If None, the ``model.activation_fn`` will be used. Defaults to None.
+            apply_softmax (bool, optional): If there are more than 2 dimensions and apply_softmax=True, applies softmax
+                on the logits output. Defaults to False.
+            max_tokens_per_batch (int, optional): If set, form batches by this budget of (padded) tokens instead of
+                ``batch_size``, see :meth:`predict`. Defaults to None.
+
+        Returns:
+            Union[List[List[Dict[Literal["corpus_id", "score", "text"], Union[int, float, str]]]], Tuple[np.ndarray, np.ndarray]]:
+            For every query, a sorted list with the "corpus_id", "score", and optionally "text" of its documents, like
+            :meth:`rank`. If ``return_arrays`` is True, a tuple of ``corpus_ids`` and ``scores`` arrays instead.
+
+        Example:
+            ::
+
+                from sentence_transformers import CrossEncoder
+                model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L6-v2")
+
+                queries = ["Who wrote 'To Kill a Mockingbird'?", "Who wrote 'Moby-Dick'?"]
+                documents_per_query = [
+                    [
+                        "'To Kill a Mockingbird' is a novel by Harper Lee published in 1960.",
+                        "The novel 'Moby-Dick' was written by Herman Melville and first published in 1851.",
+                    ],
+                    [
+                        "Herman Melville was an American novelist, best known for 'Moby-Dick'.",
+                        "Harper Lee was an American novelist, best known for 'To Kill a Mockingbird'.",
+                        "'Moby-Dick' is an 1851 novel by American writer Herman Melville.",
+                    ],
+                ]
+                model.rank_many(queries, documents_per_query, top_k=2)
+        """
+        if self.num_labels != 1:
+            raise ValueError(
+                "CrossEncoder.rank_many() only works for models with num_labels=1. "
+                "Consider using CrossEncoder.predict() with input pairs instead."
+            )
+        if len(queries) != len(documents_per_query):
+            raise ValueError(
+                f"Expected one list of documents per query, but got {len(queries)} queries and "
+                f"{len(documents_per_query)} lists of documents."
+            )
+
+        query_doc_pairs = [[query, doc] for query, documents in zip(queries, documents_per_query) for doc in documents]
+        if query_doc_pairs:
+            scores = self.predict(
+                sentences=query_doc_pairs,
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar,
+                activation_fn=activation_fn,
+                apply_softmax=apply_softmax,
+                convert_to_tensor=True,
+                max_tokens_per_batch=max_tokens_per_batch,
+            ).float()
+        else:
+            scores = torch.empty(0, device=self.model.device)
+
+        # Scatter the flat scores into a (num_queries, max_num_documents) matrix, padded with -inf, so the top-k of
+        # every query can be selected with one segmented top-k over the rows
+        num_documents = torch.tensor([len(documents) for documents in documents_per_query], dtype=torch.long)
+        max_num_documents = int(num_documents.max()) if len(num_documents) else 0
+        k = max_num_documents if top_k is None else min(top_k, max_num_documents)
+        query_indices = torch.repeat_interleave(torch.arange(len(num_documents)), num_documents)
+        offsets = torch.cumsum(num_documents, dim=0) - num_documents
+        document_indices = torch.arange(len(query_indices)) - offsets[query_indices]
+        padded_scores = torch.full((len(num_documents), max_num_documents), -torch.inf, device=scores.device)
+        padded_scores[query_indices.to(scores.device), document_indices.to(scores.device)] = scores
+        top_scores, top_indices = torch.topk(padded_scores, k, dim=1)
+
+        top_scores = top_scores.cpu().numpy()
+        top_indices = top_indices.cpu().numpy()
+        is_document = top_indices < num_documents.numpy()[:, None]
+        if return_arrays:
+            return np.where(is_document, top_indices, -1), np.where(is_document, top_scores, np.nan)
+
+        results = []
+        for query_idx, documents in enumerate(documents_per_query):
+            query_results = []
+            for corpus_id, score in zip(
+                top_indices[query_idx][is_document[query_idx]], top_scores[query_idx][is_document[query_idx]]
+            ):
+                query_results.append({"corpus_id": int(corpus_id), "score": score})
+                if return_documents:
+                    query_results[-1].update({"text": documents[corpus_id]})
+            results.append(query_results)
+        return results
+
+    def _supports_query_prefix_cache(self) -> bool:
+        """Whether the model is a decoder whose forward pass can continue from a key/value cache."""
+        if self.backend != "torch" or self.config.is_encoder_decoder or self.config.pad_token_id is None:
+            return False
+        try:
+            forward_parameters = inspect.signature(self.model.forward).parameters
+        except (TypeError, ValueError):
+            return False
+        return all(parameter in forward_parameters for parameter in ("past_key_values", "use_cache", "position_ids"))
+
+    @staticmethod
+    def _expand_key_value_cache(cache: Any, batch_size: int) -> Any:
+        """Returns a copy of a key/value cache of a single sequence, repeated for ``batch_size`` sequences."""
+        if isinstance(cache, tuple):
+            # Legacy caches are tuples of (key, value) tensors per layer, which the model does not modify in-place
+            return tuple(tuple(tensor.expand(batch_size, *tensor.shape[1:]) for tensor in layer) for layer in cache)
+        # Cache objects are extended in-place by the forward pass, so every batch needs its own copy
+        cache = copy.deepcopy(cache)
+        cache.batch_repeat_interleave(batch_size)
+        return cache
+
+    @torch.inference_mode()
+    def _predict_with_query_prefix_cache(
+        self,
+        sentences: list[list[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool | None = None,
+        activation_fn: Callable | None = None,
+        apply_softmax: bool | None = False,
+        max_tokens_per_batch: int | None = None,
+    ) -> torch.Tensor | None:
+        """
+        Predicts the scores of pairs that share a prefix, e.g. the query in :meth:`rank`, by processing the shared
+        tokens once and continuing from their key/value cache for every batch of suffixes. The suffixes are padded
+        on the right and get the positions that they have in the full pairs, so the scores match :meth:`predict`.
+
+        Returns:
+            Optional[torch.Tensor]: The scores of the pairs, or None if there are fewer than two pairs or if they do not
+            share any tokens.
+        """
+        if len(sentences) < 2:
+            return None
+
+        if show_progress_bar is None:
+            show_progress_bar = (
+                logger.getEffectiveLevel() == logging.INFO or logger.getEffectiveLevel() == logging.DEBUG
+            )
+
+        if activation_fn is not None:
+            self.set_activation_fn(activation_fn, set_default=False)
+
+        features = self.tokenizer(sentences, truncation=True, return_attention_mask=False)
+        input_ids = features["input_ids"]
+        # Models such as GPT-2 also embed the token type ids, which are then split like the input ids
+        token_type_ids = features.get("token_type_ids")
+        if "token_type_ids" not in inspect.signature(self.model.forward).parameters:
+            token_type_ids = None
+        # The cached prefix is the longest run of tokens that all pairs start with, but every pair must keep at
+        # least one token of its own, as the score is computed from the last token of the pair
+        prefix_length = min(len(ids) for ids in input_ids) - 1
+        for idx in range(1, len(input_ids)):
+            while prefix_length > 0 and (
+                input_ids[idx][:prefix_length] != input_ids[0][:prefix_length]
+                or (token_type_ids and token_type_ids[idx][:prefix_length] != token_type_ids[0][:prefix_length])
+            ):
+                prefix_length -= 1
+        if prefix_length <= 0:
+            return None
+
+        self.eval()
+        device = self.model.device
+        prefix_features = {"input_ids": torch.tensor([input_ids[0][:prefix_length]], device=device)}
+        if token_type_ids:
+            prefix_features["token_type_ids"] = torch.tensor([token_type_ids[0][:prefix_length]], device=device)
+        prefix_output = self.model(**prefix_features, use_cache=True, return_dict=True)
+        prefix_cache = prefix_output.past_key_values
+
+        suffixes = [ids[prefix_length:] for ids in input_ids]
+        lengths = np.array([len(suffix) for suffix in suffixes], dtype=np.int64)
+        length_sorted_idx = np.argsort(-lengths, kind="stable")
+        batches = []
+        start_idx = 0
+        while start_idx < len(length_sorted_idx):
+            num_pairs = batch_size
+            if max_tokens_per_batch is not None:
+                # Every pair in a batch attends to the prefix as well as to the (padded) suffix of the longest pair
+                num_pairs = max(1, max_tokens_per_batch // (prefix_length + lengths[length_sorted_idx[start_idx]]))
+            batches.append(length_sorted_idx[start_idx : start_idx + num_pairs])
+            start_idx += num_pairs
+
+        pred_scores = torch.empty(len(sentences), device=device)
+        for batch_indices in tqdm(batches, desc="Batches", disable=not show_progress_bar):
+            max_suffix_length = int(lengths[batch_indices].max())
+            batch_input_ids = torch.full(
+                (len(batch_indices), max_suffix_length), self.config.pad_token_id, dtype=torch.long
+            )
+            batch_token_type_ids = torch.full_like(batch_input_ids, self.tokenizer.pad_token_type_id)
+            attention_mask = torch.zeros((len(batch_indices), prefix_length + max_suffix_length), dtype=torch.long)
+            attention_mask[:, :prefix_length] = 1
+            for row, idx in enumerate(batch_indices.tolist()):
+                batch_input_ids[row, : lengths[idx]] = torch.tensor(suffixes[idx])
+                if token_type_ids:
+                    batch_token_type_ids[row, : lengths[idx]] = torch.tensor(token_type_ids[idx][prefix_length:])
+                attention_mask[row, prefix_length : prefix_length + lengths[idx]] = 1
+            batch_features = {
+                "input_ids": batch_input_ids,
+                "attention_mask": attention_mask,
+                "position_ids": torch.arange(prefix_length, prefix_length + max_suffix_length).expand(
+                    len(batch_indices), -1
+                ),
+            }
+            if token_type_ids:
+                batch_features["token_type_ids"] = batch_token_type_ids
+            batch_features = {key: value.to(device) for key, value in batch_features.items()}
+
+            model_predictions = self.model(
+                **batch_features,
+                past_key_values=self._expand_key_value_cache(prefix_cache, len(batch_indices)),
+                use_cache=True,
+                return_dict=True,
+            )
+            logits = self.activation_fn(model_predictions.logits)
+            if apply_softmax and logits.ndim > 1:
+                logits = torch.nn.functional.softmax(logits, dim=1)
+            pred_scores[torch.from_numpy(batch_indices).to(device)] = logits[:, 0].to(pred_scores.dtype)
+
+        return pred_scores
+
+    def start_multi_process_pool(
+        self, target_devices: list[str] = None
+    ) -> dict[Literal["input", "output", "processes"], Any]:
+        """
+        Starts a multi-process pool to process the predictions with several independent processes
+        via :meth:`CrossEncoder.predict_multi_process <sentence_transformers.cross_encoder.CrossEncoder.predict_multi_process>`.
+
+        This method is recommended if you want to predict on multiple GPUs or CPUs. It is advised
+        to start only one process per GPU. This method works together with predict_multi_process
+        and stop_multi_process_pool.
+
+        Args:
+            target_devices (List[str], optional): PyTorch target devices, e.g. ["cuda:0", "cuda:1", ...],
+                ["npu:0", "npu:1", ...], or ["cpu", "cpu", "cpu", "cpu"]. If target_devices is None and CUDA/NPU
+                is available, then all available CUDA/NPU devices will be used. If target_devices is None and
+                CUDA/NPU is not available, then 4 CPU devices will be used.
+
+        Returns:
+            Dict[str, Any]: A dictionary with the target processes, an input queue, and an output queue.
+        """
+        if target_devices is None:
+            if torch.cuda.is_available():
+                target_devices = [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+            elif is_torch_npu_available():
+                target_devices = [f"npu:{i}" for i in range(torch.npu.device_count())]
+            else:
+                logger.info("CUDA/NPU is not available. Starting 4 CPU workers")
+                target_devices = ["cpu"] * 4
+
+        logger.info("Start multi-process pool on devices: {}".format(", ".join(map(str, target_devices))))
+
+        self.to("cpu")
+        self.share_memory()
+        ctx = mp.get_context("spawn")
+        input_queue = ctx.Queue()
+        output_queue = ctx.Queue()
+        processes = []
+
+        for device_id in target_devices:
+            p = ctx.Process(
+                target=CrossEncoder._predict_multi_process_worker,
+                args=(device_id, self, input_queue, output_queue),
+                daemon=True,
+            )
+            p.start()
+            processes.append(p)
+
+        return {"input": input_queue, "output": output_queue, "processes": processes}
+
+    @staticmethod
+    def stop_multi_process_pool(pool: dict[Literal["input", "output", "processes"], Any]) -> None:
+        """
+        Stops all processes started with start_multi_process_pool.
+
+        Args:
+            pool (Dict[str, object]): A dictionary containing the input queue, output queue, and process list.
+
+        Returns:
+            None
+        """
+        for p in pool["processes"]:
+            p.terminate()
+
+        for p in pool["processes"]:
+            p.join()
+            p.close()
+
+        pool["input"].close()
+        pool["output"].close()
+
+    def predict_multi_process(
+        self,
+        sentences: list[tuple[str, str]] | list[list[str]],
+        pool: dict[Literal["input", "output", "processes"], Any],
+        batch_size: int = 32,
+        chunk_size: int | None = None,
+        show_progress_bar: bool | None = None,
+        activation_fn: Callable | None = None,
+        apply_softmax: bool | None = False,
+        max_tokens_per_batch: int | None = None,
+    ) -> np.ndarray:
+        """
+        Predicts the scores of a list of sentence pairs using multiple processes and GPUs via
+        :meth:`CrossEncoder.predict <sentence_transformers.cross_encoder.CrossEncoder.predict>`.
+        The pairs are sorted by length and chunked into smaller packages, so every package holds pairs of similar
+        lengths, and the packages with the longest pairs are sent to the individual processes first. The processes
+        write their scores directly into an output array in shared memory. This method is only suitable for
+        predicting large sets of pairs, e.g. for offline reranking or labeling distillation data.
+
+        Args:
+            sentences (Union[List[Tuple[str, str]], List[List[str]]]): List of sentence pairs to predict.
+            pool (Dict[Literal["input", "output", "processes"], Any]): A pool of workers started with
+                :meth:`CrossEncoder.start_multi_process_pool <sentence_transformers.cross_encoder.CrossEncoder.start_multi_process_pool>`.
+            batch_size (int): Predict pairs with batch size. Defaults to 32.
+            chunk_size (int, optional): Pairs are chunked and sent to the individual processes. If None, it
+                determines a sensible size. Defaults to None.
+            show_progress_bar (bool, optional): Whether to output a progress bar over the chunks. Defaults to None.
+            activation_fn (Callable, optional): Activation function applied on the logits output of the CrossEncoder.
+                If None, the ``model.activation_fn`` will be used. Defaults to None.
+            apply_softmax (bool, optional): If set to True and `model.num_labels > 1`, applies softmax on the logits
+                output. Defaults to False.
+            max_tokens_per_batch (int, optional): If set, the processes form batches by this budget of (padded)
+                tokens instead of ``batch_size``, see :meth:`predict`. Defaults to None.
+
+        Returns:
+            np.ndarray: A numpy array with shape [num_pairs] if ``model.num_labels == 1``, and
+            [num_pairs, num_labels] otherwise.
+
+        Example:
+            ::
+
+                from sentence_transformers import CrossEncoder
+
+                def main():
+                    model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L6-v2")
+                    pairs = [["How many people live in Berlin?", "Berlin has 3.5 million inhabitants."]] * 10000
+
+                    pool = model.start_multi_process_pool()
+                    scores = model.predict_multi_process(pairs, pool)
+                    model.stop_multi_process_pool(pool)
+
+                    print(scores.shape)
+                    # => (10000,)
+
+                if __name__ == "__main__":
+                    main()
+        """
+        if chunk_size is None:
+            chunk_size = max(min(math.ceil(len(sentences) / len(pool["processes"]) / 10), 5000), 1)
+
+        if show_progress_bar is None:
+            show_progress_bar = logger.getEffectiveLevel() in (logging.INFO, logging.DEBUG)
+
+        logger.debug(f"Chunk data into {math.ceil(len(sentences) / chunk_size)} packages of size {chunk_size}")
+
+        # The processes write their scores into this shared memory tensor, so only the chunk ids are sent back
+        output_shape = (len(sentences),) if self.num_labels == 1 else (len(sentences), self.num_labels)
+        output = torch.zeros(output_shape, dtype=torch.float32).share_memory_()
+        predict_kwargs = {
+            "batch_size": batch_size,
+            "activation_fn": activation_fn,
+            "apply_softmax": apply_softmax,
+            "max_tokens_per_batch": max_tokens_per_batch,
+        }
+
+        # Send the chunks with the longest pairs first, so the processes finish at about the same time
+        length_sorted_idx = np.argsort(-np.array([self._text_length(pair) for pair in sentences]), kind="stable")
+        input_queue = pool["input"]
+        num_chunks = 0
+        for start_idx in range(0, len(sentences), chunk_size):
+            chunk_indices = length_sorted_idx[start_idx : start_idx + chunk_size]
+            chunk = [sentences[idx] for idx in chunk_indices]
+            input_queue.put([num_chunks, chunk_indices, chunk, output, predict_kwargs])
+            num_chunks += 1
+
+        # Collect the results of all chunks before raising any error, so no results of this call are left in the
+        # output queue, where they would be mistaken for results of the next call on the same pool
+        output_queue = pool["output"]
+        errors = []
+        for _ in trange(num_chunks, desc="Chunks", disable=not show_progress_bar):
+            chunk_id, error = output_queue.get()
+            if error is not None:
+                errors.append((chunk_id, error))
+        if errors:
+            chunk_id, error = min(errors)
+            raise RuntimeError(f"Predicting chunk {chunk_id} failed in a worker process: {error}")
+        return output.numpy()
+
+    @staticmethod
+    def _predict_multi_process_worker(
+        target_device: str, model: CrossEncoder, input_queue: Queue, results_queue: Queue
+    ) -> None:
+        """
+        Internal working process to predict pairs in multi-process setup
+        """
+        model.to(target_device)
+        while True:
+            try:
+                chunk_id, chunk_indices, sentences, output, predict_kwargs = input_queue.get()
+                try:
+                    scores = model.predict(
+                        sentences, show_progress_bar=False, convert_to_tensor=True, **predict_kwargs
+                    )
+                    output[torch.from_numpy(chunk_indices)] = scores.float().cpu()
+                    results_queue.put([chunk_id, None])
+                except Exception as exc:
+                    results_queue.put([chunk_id, str(exc)])
+            except queue.Empty:
+                break
+
     def save(self, path: str, *, safe_serialization: bool = True, **kwargs) -> None:
         """
         Saves the model and tokenizer to path; identical to `save_pretrained`
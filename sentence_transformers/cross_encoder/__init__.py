@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from .CrossEncoder import CrossEncoder
 from .model_card import CrossEncoderModelCardData
+from .score_cache import ScoreCache
 from .trainer import CrossEncoderTrainer
 from .training_args import CrossEncoderTrainingArguments
 
@@ -10,4 +11,5 @@ __all__ = [
     "CrossEncoderTrainer",
     "CrossEncoderTrainingArguments",
     "CrossEncoderModelCardData",
+    "ScoreCache",
 ]
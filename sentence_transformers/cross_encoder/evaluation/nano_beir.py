@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Callable, Literal
 
 import numpy as np
@@ -9,7 +10,7 @@ from tqdm import tqdm
 
 from sentence_transformers.cross_encoder.evaluation.reranking import CrossEncoderRerankingEvaluator
 from sentence_transformers.evaluation.SentenceEvaluator import SentenceEvaluator
-from sentence_transformers.util import is_datasets_available
+from sentence_transformers.util import _load_dataset_columns, is_datasets_available
 
 if TYPE_CHECKING:
     from sentence_transformers.cross_encoder.CrossEncoder import CrossEncoder
@@ -108,6 +109,9 @@ class CrossEncoderNanoBEIREvaluator(SentenceEvaluator):
         write_csv (bool): Write results to CSV file. Defaults to True.
         aggregate_fn (Callable[[list[float]], float]): The function to aggregate the scores. Defaults to np.mean.
         aggregate_key (str): The key to use for the aggregated score. Defaults to "mean".
+        cache_folder (str, optional): Directory in which the prepared datasets are stored as Arrow files, so that
+            subsequent evaluators load them without going through ``datasets``. Defaults to None, i.e. a directory in
+            the ``datasets`` cache.
 
     Example:
         ::
@@ -173,6 +177,7 @@ class CrossEncoderNanoBEIREvaluator(SentenceEvaluator):
         write_csv: bool = True,
         aggregate_fn: Callable[[list[float]], float] = np.mean,
         aggregate_key: str = "mean",
+        cache_folder: str | None = None,
     ):
         super().__init__()
         if dataset_names is None:
@@ -187,6 +192,7 @@ class CrossEncoderNanoBEIREvaluator(SentenceEvaluator):
         self.write_csv = write_csv
         self.aggregate_fn = aggregate_fn
         self.aggregate_key = aggregate_key
+        self.cache_folder = cache_folder
 
         self.name = f"NanoBEIR_R{rerank_k:d}_{self.aggregate_key}"
 
@@ -200,10 +206,16 @@ class CrossEncoderNanoBEIREvaluator(SentenceEvaluator):
             "write_csv": self.write_csv,
         }
 
-        self.evaluators = [
-            self._load_dataset(name, **reranking_kwargs)
-            for name in tqdm(self.dataset_names, desc="Loading NanoBEIR datasets", leave=False)
-        ]
+        # Load the datasets concurrently, as loading them is mostly I/O bound
+        with ThreadPoolExecutor(max_workers=min(len(self.dataset_names), 8)) as executor:
+            self.evaluators = list(
+                tqdm(
+                    executor.map(lambda name: self._load_dataset(name, **reranking_kwargs), self.dataset_names),
+                    total=len(self.dataset_names),
+                    desc="Loading NanoBEIR datasets",
+                    leave=False,
+                )
+            )
 
         self.csv_file: str = f"NanoBEIR_evaluation_{aggregate_key}_results.csv"
         self.csv_headers = ["epoch", "steps", "MAP", f"MRR@{self.at_k}", f"NDCG@{self.at_k}"]
@@ -295,33 +307,33 @@ class CrossEncoderNanoBEIREvaluator(SentenceEvaluator):
             raise ValueError(
                 "datasets is not available. Please install it to use the CrossEncoderNanoBEIREvaluator via `pip install datasets`."
             )
-        from datasets import load_dataset
 
         dataset_path = dataset_name_to_id[dataset_name.lower()]
-        corpus = load_dataset(dataset_path, "corpus", split="train")
+        corpus = _load_dataset_columns(dataset_path, "corpus", ["_id", "text"], cache_folder=self.cache_folder)
         corpus_mapping = dict(zip(corpus["_id"], corpus["text"]))
-        queries = load_dataset(dataset_path, "queries", split="train")
+        queries = _load_dataset_columns(dataset_path, "queries", ["_id", "text"], cache_folder=self.cache_folder)
         query_mapping = dict(zip(queries["_id"], queries["text"]))
-        relevance = load_dataset(dataset_path, "relevance", split="train")
-
-        def mapper(sample, corpus_mapping: dict[str, str], query_mapping: dict[str, str], rerank_k: int):
-            query = query_mapping[sample["query-id"]]
-            positives = [corpus_mapping[positive_id] for positive_id in sample["positive-corpus-ids"]]
-            documents = [corpus_mapping[document_id] for document_id in sample["bm25-ranked-ids"][:rerank_k]]
-            return {
-                "query": query,
-                "positive": positives,
-                "documents": documents,
-            }
-
-        relevance = relevance.map(
-            mapper,
-            fn_kwargs={"corpus_mapping": corpus_mapping, "query_mapping": query_mapping, "rerank_k": self.rerank_k},
+        relevance = _load_dataset_columns(
+            dataset_path,
+            "relevance",
+            ["query-id", "positive-corpus-ids", "bm25-ranked-ids"],
+            cache_folder=self.cache_folder,
         )
 
+        samples = [
+            {
+                "query": query_mapping[query_id],
+                "positive": [corpus_mapping[positive_id] for positive_id in positive_ids],
+                "documents": [corpus_mapping[document_id] for document_id in ranked_ids[: self.rerank_k]],
+            }
+            for query_id, positive_ids, ranked_ids in zip(
+                relevance["query-id"], relevance["positive-corpus-ids"], relevance["bm25-ranked-ids"]
+            )
+        ]
+
         human_readable_name = self._get_human_readable_name(dataset_name)
         return CrossEncoderRerankingEvaluator(
-            samples=list(relevance),
+            samples=samples,
             name=human_readable_name,
             **ir_evaluator_kwargs,
         )
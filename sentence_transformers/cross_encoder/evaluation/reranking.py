@@ -7,9 +7,9 @@ from typing import TYPE_CHECKING
 
 import numpy as np
 from sklearn.metrics import average_precision_score, ndcg_score
-from tqdm import tqdm
 
 from sentence_transformers.evaluation.SentenceEvaluator import SentenceEvaluator
+from sentence_transformers.util import ragged_ranking_metrics
 
 if TYPE_CHECKING:
     from sentence_transformers.cross_encoder.CrossEncoder import CrossEncoder
@@ -145,16 +145,13 @@ class CrossEncoderRerankingEvaluator(SentenceEvaluator):
 
         logger.info(f"CrossEncoderRerankingEvaluator: Evaluating the model on the {self.name} dataset{out_txt}:")
 
-        base_mrr_scores = []
-        base_ndcg_scores = []
-        base_ap_scores = []
-        all_mrr_scores = []
-        all_ndcg_scores = []
-        all_ap_scores = []
-        num_queries = 0
+        queries = []
+        docs_per_query = []
+        all_is_relevant = []
+        base_is_relevant_per_query = []
         num_positives = []
         num_negatives = []
-        for instance in tqdm(self.samples, desc="Evaluating samples", disable=not self.show_progress_bar, leave=False):
+        for instance in self.samples:
             if "query" not in instance:
                 raise ValueError("CrossEncoderRerankingEvaluator requires a 'query' key in each sample.")
             if "positive" not in instance:
@@ -176,16 +173,10 @@ class CrossEncoderRerankingEvaluator(SentenceEvaluator):
 
             if documents:
                 base_is_relevant = [int(sample in positive) for sample in documents]
-                if sum(base_is_relevant) == 0:
-                    base_mrr, base_ndcg, base_ap = 0, 0, 0
-                else:
+                if sum(base_is_relevant) > 0:
                     # If not all positives are in documents, we need to add them at the end
                     base_is_relevant += [1] * (len(positive) - sum(base_is_relevant))
-                    base_pred_scores = np.array(range(len(base_is_relevant), 0, -1))
-                    base_mrr, base_ndcg, base_ap = self.compute_metrics(base_is_relevant, base_pred_scores)
-                base_mrr_scores.append(base_mrr)
-                base_ndcg_scores.append(base_ndcg)
-                base_ap_scores.append(base_ap)
+                base_is_relevant_per_query.append(base_is_relevant)
 
                 if self.always_rerank_positives:
                     docs = positive + [doc for doc in documents if doc not in positive]
@@ -197,29 +188,58 @@ class CrossEncoderRerankingEvaluator(SentenceEvaluator):
                 docs = positive + negative
                 is_relevant = [1] * len(positive) + [0] * len(negative)
 
-            num_queries += 1
-
             num_positives.append(len(positive))
             num_negatives.append(len(is_relevant) - sum(is_relevant))
 
-            if sum(is_relevant) == 0:
-                all_mrr_scores.append(0)
-                all_ndcg_scores.append(0)
-                all_ap_scores.append(0)
-                continue
-
-            model_input = [[query, doc] for doc in docs]
-            pred_scores = model.predict(model_input, convert_to_numpy=True, show_progress_bar=False)
-
-            # Add the ignored positives at the end
-            if num_ignored_positives := len(is_relevant) - len(pred_scores):
-                pred_scores = np.concatenate([pred_scores, np.zeros(num_ignored_positives)])
+            # Queries without relevant documents score 0 on all metrics, so their documents don't need predictions
+            queries.append(query)
+            docs_per_query.append(docs if sum(is_relevant) > 0 else [])
+            all_is_relevant.append(is_relevant)
+        num_queries = len(queries)
+
+        # Predict all unique (query, document) pairs at once, which CrossEncoder.predict batches by length
+        pair_to_idx = {}
+        pair_ids = [
+            pair_to_idx.setdefault((query, doc), len(pair_to_idx))
+            for query, docs in zip(queries, docs_per_query)
+            for doc in docs
+        ]
+        unique_pairs = list(pair_to_idx)
+        unique_pred_scores = np.zeros(len(unique_pairs), dtype=np.float32)
+        if unique_pairs:
+            unique_pred_scores[:] = model.predict(
+                unique_pairs,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=self.show_progress_bar,
+            )
 
-            mrr, ndcg, ap = self.compute_metrics(is_relevant, pred_scores)
+        # Scatter the predictions into the ragged (query, documents) layout. Relevant documents without a prediction,
+        # e.g. positives that were ignored, are added at the end with a score of 0.
+        offsets = np.concatenate([[0], np.cumsum([len(is_relevant) for is_relevant in all_is_relevant])])
+        pred_scores = np.zeros(offsets[-1], dtype=np.float32)
+        pair_positions = np.concatenate(
+            [np.arange(start_idx, start_idx + len(docs)) for start_idx, docs in zip(offsets, docs_per_query)]
+            + [np.zeros(0, dtype=np.int64)]
+        )
+        pred_scores[pair_positions] = unique_pred_scores[np.array(pair_ids, dtype=np.int64)]
+        is_relevant = np.concatenate([np.array(is_relevant) for is_relevant in all_is_relevant] + [np.zeros(0)])
+        all_mrr_scores, all_ndcg_scores, all_ap_scores = ragged_ranking_metrics(
+            pred_scores, is_relevant, offsets, at_k=self.at_k
+        )
 
-            all_mrr_scores.append(mrr)
-            all_ndcg_scores.append(ndcg)
-            all_ap_scores.append(ap)
+        if base_is_relevant_per_query:
+            # The documents are ranked by their given order before reranking
+            base_offsets = np.concatenate(
+                [[0], np.cumsum([len(base_is_relevant) for base_is_relevant in base_is_relevant_per_query])]
+            )
+            base_pred_scores = np.repeat(base_offsets[1:], np.diff(base_offsets)) - np.arange(base_offsets[-1])
+            base_is_relevant = np.concatenate(
+                [np.array(base_is_relevant) for base_is_relevant in base_is_relevant_per_query]
+            )
+            base_mrr_scores, base_ndcg_scores, base_ap_scores = ragged_ranking_metrics(
+                base_pred_scores, base_is_relevant, base_offsets, at_k=self.at_k
+            )
 
         mean_mrr = np.mean(all_mrr_scores)
         mean_ndcg = np.mean(all_ndcg_scores)
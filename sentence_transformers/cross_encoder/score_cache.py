@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from sentence_transformers.util import fullname, get_model_fingerprint
+
+if TYPE_CHECKING:
+    from sentence_transformers.cross_encoder.CrossEncoder import CrossEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreCache:
+    """
+    A cache of CrossEncoder scores for (query, document) pairs, to avoid rescoring pairs that are predicted
+    repeatedly, e.g. across evaluation runs, hard negative mining and online reranking. Pass the cache to
+    :meth:`CrossEncoder.predict <sentence_transformers.cross_encoder.CrossEncoder.predict>` with ``score_cache``
+    and only the pairs that are not cached yet are tokenized and passed through the model.
+
+    Scores are cached under a key of the model fingerprint, i.e. a hash of the model configuration and weights,
+    the activation function, ``apply_softmax``, the maximum sequence length and the pair itself. Scores are therefore
+    never shared between different models, and updating the weights of a model (e.g. by training it) invalidates
+    its cached scores. The fingerprint of a model is only recomputed when its weights have been modified.
+
+    The cache has two tiers: the most recently used scores are kept in memory, up to ``max_size`` pairs, and if
+    ``cache_folder`` is set, all scores are also stored in a SQLite database in that folder, so they can be
+    reused across processes and sessions. The :attr:`hit_rate` and :meth:`get_stats` report how many pairs were
+    found in either tier. The cache can be shared between threads, e.g. between the request handlers of a reranking
+    service.
+
+    Args:
+        max_size (int, optional): The maximum number of pairs to keep in memory, after which the least recently used
+            pairs are evicted. If None, the in-memory cache is unbounded. Defaults to 100,000.
+        cache_folder (str, optional): A folder to also store the scores on disk. Defaults to None.
+
+    Example:
+        ::
+
+            from sentence_transformers.cross_encoder import CrossEncoder, ScoreCache
+
+            model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L6-v2")
+            score_cache = ScoreCache(cache_folder="score_cache")
+
+            pairs = [["How many people live in Berlin?", "Berlin has a population of 3,520,031 people."]]
+            scores = model.predict(pairs, score_cache=score_cache)
+            # The second time, the scores are taken from the cache
+            scores = model.predict(pairs, score_cache=score_cache)
+            print(score_cache.get_stats())
+            # => {'memory_hits': 1, 'disk_hits': 0, 'misses': 1, 'hit_rate': 0.5}
+    """
+
+    def __init__(self, max_size: int | None = 100_000, cache_folder: str | None = None) -> None:
+        self.max_size = max_size
+        self.cache_folder = cache_folder
+        self.scores: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._fingerprints: weakref.WeakKeyDictionary[CrossEncoder, tuple[tuple[int, ...], str]] = (
+            weakref.WeakKeyDictionary()
+        )
+        # Guards the in-memory cache, the database connection and the statistics, which are shared between threads
+        self._lock = threading.Lock()
+        self._connection = None
+        if cache_folder is not None:
+            os.makedirs(cache_folder, exist_ok=True)
+            self._connection = sqlite3.connect(os.path.join(cache_folder, "scores.sqlite"), check_same_thread=False)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, scores BLOB NOT NULL)")
+            self._connection.commit()
+        self.reset_stats()
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def fingerprint(self, model: CrossEncoder) -> str:
+        """
+        Returns a hash of the configuration and the weights of the model, where the weights are hashed with
+        :func:`~sentence_transformers.util.get_model_fingerprint`. The hash is memoized until any of the parameters of
+        the model is modified in-place, e.g. by an optimizer step. For the ONNX and OpenVINO backends, only the
+        configuration and the backend are hashed.
+
+        Args:
+            model (CrossEncoder): The model to fingerprint.
+
+        Returns:
+            str: The fingerprint of the model.
+        """
+        parameters = list(model.model.parameters()) if model.backend == "torch" else []
+        versions = tuple(parameter._version for parameter in parameters)
+        with self._lock:
+            memoized = self._fingerprints.get(model)
+        if memoized is not None and memoized[0] == versions:
+            return memoized[1]
+
+        hasher = hashlib.sha256()
+        hasher.update(model.config.to_json_string().encode())
+        hasher.update(model.backend.encode())
+        if model.backend == "torch":
+            hasher.update(get_model_fingerprint(model.model).encode())
+        fingerprint = hasher.hexdigest()
+        with self._lock:
+            self._fingerprints[model] = (versions, fingerprint)
+        return fingerprint
+
+    def pair_keys(
+        self, model: CrossEncoder, sentences: list[tuple[str, str]] | list[list[str]], apply_softmax: bool = False
+    ) -> list[str]:
+        """
+        Returns the cache keys of the pairs when they are scored by the model with its current activation function.
+
+        Args:
+            model (CrossEncoder): The model that scores the pairs.
+            sentences (Union[List[Tuple[str, str]], List[List[str]]]): The pairs to score.
+            apply_softmax (bool, optional): Whether a softmax is applied on the scores. Defaults to False.
+
+        Returns:
+            List[str]: The cache key of every pair.
+        """
+        prefix = json.dumps(
+            [self.fingerprint(model), fullname(model.activation_fn), bool(apply_softmax), model.max_length]
+        )
+        return [
+            hashlib.sha256((prefix + json.dumps(list(pair), default=str)).encode()).hexdigest() for pair in sentences
+        ]
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """
+        Looks up the scores of the keys, first in memory and then on disk, and updates the hit-rate statistics.
+
+        Args:
+            keys (List[str]): The keys to look up, e.g. from :meth:`pair_keys`.
+
+        Returns:
+            Dict[str, np.ndarray]: The scores of the keys that are cached.
+        """
+        with self._lock:
+            memory_scores = {}
+            for key in keys:
+                if key in self.scores:
+                    self.scores.move_to_end(key)
+                    memory_scores[key] = self.scores[key]
+
+            disk_scores = {}
+            missing_keys = [key for key in dict.fromkeys(keys) if key not in memory_scores]
+            if self._connection is not None and missing_keys:
+                # SQLite limits the number of variables in a query, so look the keys up in chunks
+                for start_idx in range(0, len(missing_keys), 500):
+                    chunk = missing_keys[start_idx : start_idx + 500]
+                    rows = self._connection.execute(
+                        f"SELECT key, scores FROM scores WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                    )
+                    disk_scores.update((key, np.frombuffer(scores, dtype=np.float32).copy()) for key, scores in rows)
+                self._store_in_memory(disk_scores)
+
+            for key in keys:
+                if key in memory_scores:
+                    self.memory_hits += 1
+                elif key in disk_scores:
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+        return {**memory_scores, **disk_scores}
+
+    def set_many(self, scores: dict[str, np.ndarray]) -> None:
+        """
+        Stores the scores in memory and, if a ``cache_folder`` was given, on disk.
+
+        Args:
+            scores (Dict[str, np.ndarray]): The scores to store, by key.
+        """
+        scores = {key: np.asarray(value, dtype=np.float32).reshape(-1) for key, value in scores.items()}
+        with self._lock:
+            self._store_in_memory(scores)
+            if self._connection is not None and scores:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO scores (key, scores) VALUES (?, ?)",
+                    ((key, value.tobytes()) for key, value in scores.items()),
+                )
+                self._connection.commit()
+
+    def _store_in_memory(self, scores: dict[str, np.ndarray]) -> None:
+        """Stores the scores in memory, evicting the least recently used scores. Must be called with the lock held."""
+        for key, value in scores.items():
+            self.scores[key] = value
+            self.scores.move_to_end(key)
+        if self.max_size is not None:
+            while len(self.scores) > self.max_size:
+                self.scores.popitem(last=False)
+
+    @property
+    def hits(self) -> int:
+        """The number of pairs that were found in the cache since the last :meth:`reset_stats`."""
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of pairs that were found in the cache since the last :meth:`reset_stats`."""
+        num_lookups = self.hits + self.misses
+        return self.hits / num_lookups if num_lookups else 0.0
+
+    def get_stats(self) -> dict[str, int | float]:
+        """Returns the number of memory hits, disk hits and misses, and the hit rate."""
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def reset_stats(self) -> None:
+        """Resets the hit-rate statistics."""
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        """Removes all scores from memory and from disk."""
+        with self._lock:
+            self.scores.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM scores")
+                self._connection.commit()
+
+    def close(self) -> None:
+        """Closes the connection to the database on disk, if any."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
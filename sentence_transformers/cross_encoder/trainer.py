@@ -267,6 +267,11 @@ class CrossEncoderTrainer(SentenceTransformerTrainer):
             evaluator = SequentialEvaluator(evaluator)
         self.evaluator = evaluator
 
+        self._async_executor = None
+        self._async_evaluations = []
+        if args.async_evaluation:
+            self._validate_async_evaluation()
+
         if self.train_dataset is not None:
             self.train_dataset = self.maybe_add_prompts_or_dataset_name_column(
                 train_dataset, args.prompts, dataset_name="train"
@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass, field
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable, Literal
 
 import torch
 
+if TYPE_CHECKING:
+    from datasets import Dataset
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,10 +23,16 @@ class SentenceTransformerDataCollator:
     "answer", "question" in that order, then the MultipleNegativesRankingLoss will consider
     "answer" as the anchor and "question" as the positive, and it will (unexpectedly) optimize for
     "given the answer, what is the question?".
+
+    Datasets can also be tokenized once upfront with :meth:`pretokenize_dataset`, which replaces every text column
+    with ``{column}_input_ids`` and ``{column}_length`` columns. For such columns, the collator only pads the token
+    ids with ``pad_token_id`` on the ``padding_side``, so no time is spent on tokenization during training.
     """
 
     tokenize_fn: Callable
     valid_label_columns: list[str] = field(default_factory=lambda: ["label", "score"])
+    pad_token_id: int | None = None
+    padding_side: Literal["right", "left"] = "right"
     _warned_columns: set[tuple[str]] = field(default_factory=set, init=False, repr=False)
 
     def __call__(self, features: list[dict[str, Any]]) -> dict[str, torch.Tensor]:
@@ -46,18 +55,164 @@ class SentenceTransformerDataCollator:
                 column_names.remove(label_column)
                 break
 
+        pretokenized_columns = [
+            column_name[: -len("_input_ids")] for column_name in column_names if column_name.endswith("_input_ids")
+        ]
         for column_name in column_names:
             # If the prompt length has been set, we should add it to the batch
             if column_name.endswith("_prompt_length") and column_name[: -len("_prompt_length")] in column_names:
                 batch[column_name] = torch.tensor([row[column_name] for row in features], dtype=torch.int)
                 continue
 
+            # Pre-tokenized columns only have to be padded
+            if column_name.endswith("_input_ids"):
+                column_name = column_name[: -len("_input_ids")]
+                batch.update(self.pad_pretokenized_column(features, column_name))
+                continue
+            if any(
+                column_name in (f"{pretokenized_column}_token_type_ids", f"{pretokenized_column}_length")
+                for pretokenized_column in pretokenized_columns
+            ):
+                continue
+
             tokenized = self.tokenize_fn([row[column_name] for row in features])
             for key, value in tokenized.items():
                 batch[f"{column_name}_{key}"] = value
 
         return batch
 
+    def pad_pretokenized_column(self, features: list[dict[str, Any]], column_name: str) -> dict[str, torch.Tensor]:
+        """
+        Pads the token ids of a column that was tokenized with :meth:`pretokenize_dataset`.
+
+        Args:
+            features (List[Dict[str, Any]]): The rows of the batch.
+            column_name (str): The name of the original text column.
+
+        Returns:
+            Dict[str, torch.Tensor]: The padded ``{column}_input_ids`` and ``{column}_attention_mask``, and the
+            ``{column}_token_type_ids`` if the column has token type ids.
+        """
+        if self.pad_token_id is None:
+            raise ValueError(
+                f"The {column_name!r} column is pre-tokenized, but the data collator has no `pad_token_id` to pad it with."
+            )
+        keys = [key for key in ("input_ids", "token_type_ids") if f"{column_name}_{key}" in features[0]]
+        max_length = max(len(row[f"{column_name}_input_ids"]) for row in features)
+        padded = {
+            key: torch.full((len(features), max_length), self.pad_token_id if key == "input_ids" else 0)
+            for key in keys
+        }
+        attention_mask = torch.zeros((len(features), max_length), dtype=torch.long)
+        for row_idx, row in enumerate(features):
+            length = len(row[f"{column_name}_input_ids"])
+            positions = slice(0, length) if self.padding_side == "right" else slice(max_length - length, max_length)
+            for key in keys:
+                padded[key][row_idx, positions] = torch.tensor(row[f"{column_name}_{key}"])
+            attention_mask[row_idx, positions] = 1
+        padded["attention_mask"] = attention_mask
+        return {f"{column_name}_{key}": value for key, value in padded.items()}
+
+    def pretokenize_dataset(
+        self,
+        dataset: Dataset,
+        columns: list[str] | None = None,
+        batch_size: int = 1000,
+        num_proc: int | None = None,
+        **map_kwargs,
+    ) -> Dataset:
+        """
+        Tokenizes the text columns of a dataset once with ``tokenize_fn``, so the collator only has to pad them.
+        Every text column ``{column}`` is replaced in-place by a ``{column}_input_ids`` column with the unpadded
+        token ids, a ``{column}_token_type_ids`` column if the tokenizer returns token type ids, and a
+        ``{column}_length`` column with the number of tokens, e.g. for the
+        :class:`~sentence_transformers.sampler.TokenBudgetBatchSampler`. The order of the columns is preserved.
+
+        The tokenization is done with :meth:`datasets.Dataset.map`, so the tokenized columns are stored in (cached)
+        Arrow files and can be reused across training runs.
+
+        .. note::
+            The ``prompts`` training argument is not applied to pre-tokenized columns. Instead, prepend the prompts
+            to the texts before pre-tokenizing the dataset.
+
+        Args:
+            dataset (Dataset): The dataset to tokenize.
+            columns (List[str], optional): The text columns to tokenize. Defaults to all string columns, except
+                for the label columns and the ``dataset_name`` column.
+            batch_size (int, optional): The number of rows to tokenize at once. Defaults to 1000.
+            num_proc (int, optional): The number of processes to tokenize with. Defaults to None.
+            **map_kwargs: Additional keyword arguments for :meth:`datasets.Dataset.map`, e.g. ``cache_file_name``.
+
+        Returns:
+            Dataset: The pre-tokenized dataset.
+
+        Example:
+            ::
+
+                from sentence_transformers import SentenceTransformer, SentenceTransformerTrainer
+                from sentence_transformers.data_collator import SentenceTransformerDataCollator
+
+                model = SentenceTransformer("microsoft/mpnet-base")
+                data_collator = SentenceTransformerDataCollator(
+                    tokenize_fn=model.tokenize,
+                    pad_token_id=model.tokenizer.pad_token_id,
+                    padding_side=model.tokenizer.padding_side,
+                )
+                train_dataset = data_collator.pretokenize_dataset(train_dataset, num_proc=4)
+                trainer = SentenceTransformerTrainer(
+                    model=model, train_dataset=train_dataset, loss=loss, data_collator=data_collator
+                )
+        """
+        if columns is None:
+            columns = [
+                column_name
+                for column_name, feature in dataset.features.items()
+                if getattr(feature, "dtype", None) in ("string", "large_string")
+                and column_name not in self.valid_label_columns
+                and column_name != "dataset_name"
+            ]
+
+        def tokenize_columns(batch: dict[str, list[Any]]) -> dict[str, list[Any]]:
+            output = {}
+            for column_name in columns:
+                tokenized = self.tokenize_fn(batch[column_name])
+                if "input_ids" not in tokenized or "attention_mask" not in tokenized:
+                    raise ValueError(
+                        "Only models whose tokenization returns `input_ids` and an `attention_mask` can be used "
+                        "with pre-tokenized datasets."
+                    )
+                # Remove the padding of the tokenized batch, so every row only stores its own tokens
+                attention_mask = tokenized["attention_mask"].bool()
+                for key in ("input_ids", "token_type_ids"):
+                    if key in tokenized:
+                        output[f"{column_name}_{key}"] = [
+                            ids[mask].tolist() for ids, mask in zip(tokenized[key], attention_mask)
+                        ]
+                output[f"{column_name}_length"] = attention_mask.sum(dim=1).tolist()
+            return output
+
+        tokenized_dataset = dataset.map(
+            tokenize_columns,
+            batched=True,
+            batch_size=batch_size,
+            num_proc=num_proc,
+            remove_columns=columns,
+            desc="Tokenizing",
+            **map_kwargs,
+        )
+        # Put the tokenized columns at the positions of the original text columns, as losses rely on the column order
+        column_order = []
+        for column_name in dataset.column_names:
+            if column_name in columns:
+                column_order.extend(
+                    f"{column_name}_{key}"
+                    for key in ("input_ids", "token_type_ids", "length")
+                    if f"{column_name}_{key}" in tokenized_dataset.column_names
+                )
+            else:
+                column_order.append(column_name)
+        return tokenized_dataset.select_columns(column_order)
+
     def maybe_warn_about_column_order(self, column_names: list[str]) -> None:
         """Warn the user if the columns are likely not in the expected order."""
         # A mapping from common column names to the expected index in the dataset
@@ -3,8 +3,7 @@ from __future__ import annotations
 import csv
 import logging
 import os
-from contextlib import nullcontext
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING, Any, Literal
 
 import numpy as np
 from sklearn.metrics import average_precision_score, matthews_corrcoef
@@ -216,35 +215,38 @@ class BinaryClassificationEvaluator(SentenceEvaluator):
         return metrics
 
     def compute_metrices(self, model: SentenceTransformer) -> dict[str, dict[str, float]]:
-        with nullcontext() if self.truncate_dim is None else model.truncate_sentence_embeddings(self.truncate_dim):
-            try:
-                # If the sentences are hashable, then we can use a set to avoid embedding the same sentences multiple
-                # times
-                sentences = list(set(self.sentences1 + self.sentences2))
-            except TypeError:
-                # Otherwise we just embed everything, e.g. if the sentences are images for evaluating a CLIP model
-                embeddings1 = model.encode(
-                    self.sentences1,
-                    batch_size=self.batch_size,
-                    show_progress_bar=self.show_progress_bar,
-                    convert_to_numpy=True,
-                )
-                embeddings2 = model.encode(
-                    self.sentences2,
-                    batch_size=self.batch_size,
-                    show_progress_bar=self.show_progress_bar,
-                    convert_to_numpy=True,
-                )
-            else:
-                embeddings = model.encode(
-                    sentences,
-                    batch_size=self.batch_size,
-                    show_progress_bar=self.show_progress_bar,
-                    convert_to_numpy=True,
-                )
-                emb_dict = {sent: emb for sent, emb in zip(sentences, embeddings)}
-                embeddings1 = [emb_dict[sent] for sent in self.sentences1]
-                embeddings2 = [emb_dict[sent] for sent in self.sentences2]
+        try:
+            # If the sentences are hashable, then we can use a set to avoid embedding the same sentences multiple
+            # times
+            sentences = list(set(self.sentences1 + self.sentences2))
+        except TypeError:
+            # Otherwise we just embed everything, e.g. if the sentences are images for evaluating a CLIP model
+            embeddings1 = self.embed_inputs(
+                model,
+                self.sentences1,
+                batch_size=self.batch_size,
+                show_progress_bar=self.show_progress_bar,
+                truncate_dim=self.truncate_dim,
+            )
+            embeddings2 = self.embed_inputs(
+                model,
+                self.sentences2,
+                batch_size=self.batch_size,
+                show_progress_bar=self.show_progress_bar,
+                truncate_dim=self.truncate_dim,
+            )
+        else:
+            embeddings = self.embed_inputs(
+                model,
+                sentences,
+                batch_size=self.batch_size,
+                show_progress_bar=self.show_progress_bar,
+                truncate_dim=self.truncate_dim,
+            )
+            # Gather the embeddings of all pairs once, so every similarity function works on the same arrays
+            sentence_to_idx = {sentence: idx for idx, sentence in enumerate(sentences)}
+            embeddings1 = embeddings[[sentence_to_idx[sentence] for sentence in self.sentences1]]
+            embeddings2 = embeddings[[sentence_to_idx[sentence] for sentence in self.sentences2]]
 
         similarity_fns = {
             SimilarityFunction.COSINE.value: {
@@ -253,7 +255,7 @@ class BinaryClassificationEvaluator(SentenceEvaluator):
                 "greater_is_better": True,
             },
             SimilarityFunction.DOT_PRODUCT.value: {
-                "score_fn": lambda x, y: np.sum(np.asarray(x) * np.asarray(y), axis=-1),
+                "score_fn": lambda x, y: np.einsum("ij,ij->i", x, y),
                 "name": "Dot-Product",
                 "greater_is_better": True,
             },
@@ -305,67 +307,71 @@ class BinaryClassificationEvaluator(SentenceEvaluator):
         return output_scores
 
     @staticmethod
-    def find_best_acc_and_threshold(scores, labels, high_score_more_similar: bool):
-        assert len(scores) == len(labels)
-        rows = list(zip(scores, labels))
-
-        rows = sorted(rows, key=lambda x: x[0], reverse=high_score_more_similar)
-
-        max_acc = 0
-        best_threshold = -1
-
-        positive_so_far = 0
-        remaining_negatives = sum(labels == 0)
-
-        for i in range(len(rows) - 1):
-            score, label = rows[i]
-            if label == 1:
-                positive_so_far += 1
-            else:
-                remaining_negatives -= 1
-
-            acc = (positive_so_far + remaining_negatives) / len(labels)
-            if acc > max_acc:
-                max_acc = acc
-                best_threshold = (rows[i][0] + rows[i + 1][0]) / 2
-
-        return max_acc, best_threshold
-
-    @staticmethod
-    def find_best_f1_and_threshold(scores, labels, high_score_more_similar: bool):
+    def _sort_for_threshold_search(
+        scores, labels, high_score_more_similar: bool
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sorts the scores from most to least similar, and returns the sorted scores, the number of positives among the
+        first ``i + 1`` sorted pairs, and a mask of the positions ``i`` at which a threshold can be placed between
+        the ``i``-th and ``i + 1``-th sorted score, i.e. where these scores are not tied.
+        """
         assert len(scores) == len(labels)
-
         scores = np.asarray(scores)
         labels = np.asarray(labels)
 
-        rows = list(zip(scores, labels))
-
-        rows = sorted(rows, key=lambda x: x[0], reverse=high_score_more_similar)
-
-        best_f1 = best_precision = best_recall = 0
-        threshold = 0
-        nextract = 0
-        ncorrect = 0
-        total_num_duplicates = sum(labels)
+        # A stable sort keeps tied scores in their original order, like ``sorted``
+        sorted_indices = np.argsort(-scores if high_score_more_similar else scores, kind="stable")
+        scores = scores[sorted_indices]
+        positives_so_far = np.cumsum(labels[sorted_indices] == 1)
+        is_split_point = scores[:-1] != scores[1:]
+        return scores, positives_so_far, is_split_point
 
-        for i in range(len(rows) - 1):
-            score, label = rows[i]
-            nextract += 1
-
-            if label == 1:
-                ncorrect += 1
-
-            if ncorrect > 0:
-                precision = ncorrect / nextract
-                recall = ncorrect / total_num_duplicates
-                f1 = 2 * precision * recall / (precision + recall)
-                if f1 > best_f1:
-                    best_f1 = f1
-                    best_precision = precision
-                    best_recall = recall
-                    threshold = (rows[i][0] + rows[i + 1][0]) / 2
+    @staticmethod
+    def find_best_acc_and_threshold(scores, labels, high_score_more_similar: bool):
+        scores, positives_so_far, is_split_point = BinaryClassificationEvaluator._sort_for_threshold_search(
+            scores, labels, high_score_more_similar
+        )
+        num_pairs = len(scores)
+        negatives_so_far = np.arange(1, num_pairs + 1) - positives_so_far
+        remaining_negatives = negatives_so_far[-1] - negatives_so_far if num_pairs else negatives_so_far
+
+        # The accuracy when predicting the first i + 1 sorted pairs as positive
+        accuracies = (positives_so_far[:-1] + remaining_negatives[:-1]) / num_pairs
+        accuracies = np.where(is_split_point, accuracies, 0)
+        if not len(accuracies) or accuracies.max() <= 0:
+            return 0, -1
+
+        best_idx = np.argmax(accuracies)
+        best_threshold = (scores[best_idx] + scores[best_idx + 1]) / 2
+        return accuracies[best_idx], best_threshold
 
-        return best_f1, best_precision, best_recall, threshold
+    @staticmethod
+    def find_best_f1_and_threshold(scores, labels, high_score_more_similar: bool):
+        scores, positives_so_far, is_split_point = BinaryClassificationEvaluator._sort_for_threshold_search(
+            scores, labels, high_score_more_similar
+        )
+        total_num_duplicates = positives_so_far[-1] if len(scores) else 0
+
+        # The precision, recall and F1 when predicting the first i + 1 sorted pairs as positive
+        ncorrect = positives_so_far[:-1]
+        nextract = np.arange(1, len(scores))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precisions = ncorrect / nextract
+            recalls = ncorrect / total_num_duplicates
+            f1_scores = 2 * precisions * recalls / (precisions + recalls)
+        f1_scores = np.where(is_split_point & (ncorrect > 0), f1_scores, 0)
+        if not len(f1_scores) or f1_scores.max() <= 0:
+            return 0, 0, 0, 0
+
+        best_idx = np.argmax(f1_scores)
+        threshold = (scores[best_idx] + scores[best_idx + 1]) / 2
+        return f1_scores[best_idx], precisions[best_idx], recalls[best_idx], threshold
+
+    def get_embedding_inputs(self) -> list[dict[str, Any]]:
+        return [
+            {"sentences": sentences, "batch_size": self.batch_size, "show_progress_bar": self.show_progress_bar}
+            for sentences in (self.sentences1, self.sentences2)
+        ]
 
     def get_config_dict(self):
         config_dict = {}
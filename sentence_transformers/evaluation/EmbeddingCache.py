@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from contextvars import ContextVar, Token
+from typing import TYPE_CHECKING
+
+import torch
+from torch import Tensor
+
+if TYPE_CHECKING:
+    from sentence_transformers.evaluation.SentenceEvaluator import SentenceEvaluator
+    from sentence_transformers.SentenceTransformer import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    An evaluation-scoped cache of full-dimensional sentence embeddings. While the cache is active, i.e. inside its
+    ``with`` block, evaluators encode every text at most once per model and prompt. Because the embeddings are stored
+    at full dimensionality, evaluators that only differ in their ``truncate_dim`` (e.g. when evaluating a Matryoshka
+    model at several dimensions) all score slices of the same embeddings.
+
+    The cache is used by :class:`~sentence_transformers.evaluation.SequentialEvaluator` and
+    :class:`~sentence_transformers.evaluation.NanoBEIREvaluator` if ``cache_embeddings=True``, which first
+    :meth:`prefetch` the deduplicated inputs of all of their sub-evaluators in one length-sorted encode. The cache
+    can also be used directly to share embeddings between evaluators that are called manually.
+
+    Example:
+        ::
+
+            from sentence_transformers.evaluation import EmbeddingCache, EmbeddingSimilarityEvaluator
+
+            evaluators = [
+                EmbeddingSimilarityEvaluator(sentences1, sentences2, scores, truncate_dim=dim, name=f"sts_dev_{dim}")
+                for dim in [768, 512, 256, 128, 64]
+            ]
+            with EmbeddingCache():
+                # The sentences are only encoded once, by the first evaluator
+                results = [evaluator(model) for evaluator in evaluators]
+    """
+
+    # The stack of active caches is tracked per thread and per asyncio task, so concurrent evaluations don't share
+    # each other's caches
+    _active: ContextVar[tuple[EmbeddingCache, ...]] = ContextVar("active_embedding_caches", default=())
+
+    def __init__(self) -> None:
+        # Maps (model, prompt) to the row of every cached sentence and a buffer with the embeddings of those rows,
+        # which may have more rows than there are cached sentences
+        self.indices: dict[tuple[SentenceTransformer, str | None], dict[str, int]] = {}
+        self.embeddings: dict[tuple[SentenceTransformer, str | None], Tensor] = {}
+        self._tokens: list[Token] = []
+
+    def __enter__(self) -> EmbeddingCache:
+        self._tokens.append(EmbeddingCache._active.set(EmbeddingCache._active.get() + (self,)))
+        return self
+
+    def __exit__(self, *args) -> None:
+        EmbeddingCache._active.reset(self._tokens.pop())
+        if not self._tokens:
+            self.indices.clear()
+            self.embeddings.clear()
+
+    @classmethod
+    def get_active(cls) -> EmbeddingCache | None:
+        """Returns the innermost active cache of the current thread or task, or None if no cache is active."""
+        active = cls._active.get()
+        return active[-1] if active else None
+
+    @staticmethod
+    def _resolve_prompt(model: SentenceTransformer, prompt_name: str | None, prompt: str | None) -> str | None:
+        """Returns the prompt that ``model.encode`` prepends for the given ``prompt_name`` and ``prompt``."""
+        if prompt is not None:
+            return prompt
+        if prompt_name is None:
+            prompt_name = model.default_prompt_name
+        return model.prompts.get(prompt_name) if prompt_name is not None else None
+
+    def _encode_missing(
+        self,
+        model: SentenceTransformer,
+        sentences: list[str],
+        prompt_name: str | None = None,
+        prompt: str | None = None,
+        batch_size: int = 32,
+        show_progress_bar: bool | None = None,
+    ) -> tuple[dict[str, int], Tensor | None]:
+        """
+        Encodes the sentences that are not cached yet, and returns the rows of the cached sentences and the cached
+        embeddings for the prompt.
+        """
+        key = (model, self._resolve_prompt(model, prompt_name, prompt))
+        cached_indices = self.indices.setdefault(key, {})
+        missing_sentences = list(dict.fromkeys(sentence for sentence in sentences if sentence not in cached_indices))
+        if missing_sentences:
+            with model.truncate_sentence_embeddings(None):
+                embeddings = model.encode(
+                    missing_sentences,
+                    prompt_name=prompt_name,
+                    prompt=prompt,
+                    batch_size=batch_size,
+                    show_progress_bar=show_progress_bar,
+                    convert_to_tensor=True,
+                )
+            num_cached = len(cached_indices)
+            buffer = self.embeddings.get(key)
+            if buffer is None or len(buffer) < num_cached + len(embeddings):
+                # Grow the buffer geometrically, so repeated small encodes don't copy all cached embeddings every time
+                new_buffer = embeddings.new_empty(
+                    (max(2 * num_cached, num_cached + len(embeddings)), *embeddings.shape[1:])
+                )
+                if buffer is not None:
+                    new_buffer[:num_cached] = buffer[:num_cached]
+                buffer = self.embeddings[key] = new_buffer
+            buffer[num_cached : num_cached + len(embeddings)] = embeddings.to(buffer.device)
+            cached_indices.update(zip(missing_sentences, range(num_cached, num_cached + len(embeddings))))
+        logger.debug(f"Embedded {len(sentences)} sentences, of which {len(missing_sentences)} were not cached yet.")
+        return cached_indices, self.embeddings.get(key)
+
+    def encode(
+        self,
+        model: SentenceTransformer,
+        sentences: list[str],
+        prompt_name: str | None = None,
+        prompt: str | None = None,
+        batch_size: int = 32,
+        show_progress_bar: bool | None = None,
+    ) -> Tensor:
+        """
+        Returns the full-dimensional embeddings of ``sentences`` as a tensor, only encoding the sentences that
+        are not cached yet.
+
+        Args:
+            model (SentenceTransformer): The model to encode the sentences with.
+            sentences (List[str]): The sentences to embed.
+            prompt_name (Optional[str], optional): The name of the prompt to use for encoding. Defaults to None.
+            prompt (Optional[str], optional): The prompt to use for encoding. Defaults to None.
+            batch_size (int, optional): The batch size for encoding the uncached sentences. Defaults to 32.
+            show_progress_bar (Optional[bool], optional): Whether to show a progress bar. Defaults to None.
+
+        Returns:
+            Tensor: The embeddings with shape (len(sentences), embedding_dim), not truncated to ``model.truncate_dim``.
+        """
+        cached_indices, cached_embeddings = self._encode_missing(
+            model, sentences, prompt_name, prompt, batch_size, show_progress_bar
+        )
+        rows = torch.tensor([cached_indices[sentence] for sentence in sentences], dtype=torch.long)
+        return cached_embeddings[rows.to(cached_embeddings.device)]
+
+    def prefetch(self, model: SentenceTransformer, evaluators: Iterable[SentenceEvaluator]) -> None:
+        """
+        Encodes the inputs of all ``evaluators`` at once, so the evaluators only have to look up their embeddings.
+        The inputs are deduplicated across the evaluators and grouped by prompt, after which each group is encoded
+        with a single ``model.encode`` call. As ``model.encode`` sorts its inputs by length, texts of similar lengths
+        end up in the same batches, regardless of the evaluator that they belong to.
+
+        Args:
+            model (SentenceTransformer): The model to encode the inputs with.
+            evaluators (Iterable[SentenceEvaluator]): The evaluators whose
+                :meth:`~sentence_transformers.evaluation.SentenceEvaluator.get_embedding_inputs` to encode.
+        """
+        evaluators = list(evaluators)
+        groups = {}
+        for evaluator in evaluators:
+            for inputs in evaluator.get_embedding_inputs():
+                if not all(isinstance(sentence, str) for sentence in inputs["sentences"]):
+                    continue
+                prompt_name = inputs.get("prompt_name")
+                prompt = inputs.get("prompt")
+                batch_size = inputs.get("batch_size", 32)
+                group = groups.setdefault(
+                    self._resolve_prompt(model, prompt_name, prompt),
+                    {"sentences": {}, "prompt_name": prompt_name, "prompt": prompt, "batch_size": batch_size},
+                )
+                group["sentences"].update(dict.fromkeys(inputs["sentences"]))
+                # Use the smallest batch size of the evaluators, as that one is known to fit all of their inputs
+                group["batch_size"] = min(group["batch_size"], batch_size)
+                group["show_progress_bar"] = group.get("show_progress_bar") or inputs.get("show_progress_bar")
+
+        for group in groups.values():
+            sentences = list(group.pop("sentences"))
+            logger.info(f"Encoding {len(sentences)} unique texts for {len(evaluators)} evaluators at once.")
+            self._encode_missing(model, sentences, **group)
@@ -3,12 +3,12 @@ from __future__ import annotations
 import csv
 import logging
 import os
-from contextlib import nullcontext
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING, Any, Literal
 
 import numpy as np
-from scipy.stats import pearsonr, spearmanr
-from sklearn.metrics.pairwise import paired_cosine_distances, paired_euclidean_distances, paired_manhattan_distances
+import torch
+from scipy.stats import rankdata
+from torch import Tensor
 
 from sentence_transformers.evaluation.SentenceEvaluator import SentenceEvaluator
 from sentence_transformers.readers import InputExample
@@ -158,50 +158,25 @@ class EmbeddingSimilarityEvaluator(SentenceEvaluator):
 
         logger.info(f"EmbeddingSimilarityEvaluator: Evaluating the model on the {self.name} dataset{out_txt}:")
 
-        with nullcontext() if self.truncate_dim is None else model.truncate_sentence_embeddings(self.truncate_dim):
-            embeddings1 = model.encode(
-                self.sentences1,
-                batch_size=self.batch_size,
-                show_progress_bar=self.show_progress_bar,
-                convert_to_numpy=True,
-                precision=self.precision,
-                normalize_embeddings=bool(self.precision),
-            )
-            embeddings2 = model.encode(
-                self.sentences2,
-                batch_size=self.batch_size,
-                show_progress_bar=self.show_progress_bar,
-                convert_to_numpy=True,
-                precision=self.precision,
-                normalize_embeddings=bool(self.precision),
-            )
-        # Binary and ubinary embeddings are packed, so we need to unpack them for the distance metrics
-        if self.precision == "binary":
-            embeddings1 = (embeddings1 + 128).astype(np.uint8)
-            embeddings2 = (embeddings2 + 128).astype(np.uint8)
-        if self.precision in ("ubinary", "binary"):
-            embeddings1 = np.unpackbits(embeddings1, axis=1)
-            embeddings2 = np.unpackbits(embeddings2, axis=1)
-
-        labels = self.scores
-
         if not self.similarity_fn_names:
             self.similarity_fn_names = [model.similarity_fn_name]
             self._append_csv_headers(self.similarity_fn_names)
 
+        embeddings1, embeddings2 = self.embed_pairs(model)
         similarity_functions = {
-            "cosine": lambda x, y: 1 - paired_cosine_distances(x, y),
-            "manhattan": lambda x, y: -paired_manhattan_distances(x, y),
-            "euclidean": lambda x, y: -paired_euclidean_distances(x, y),
-            "dot": lambda x, y: [np.dot(emb1, emb2) for emb1, emb2 in zip(x, y)],
+            "cosine": lambda x, y: (
+                torch.nn.functional.normalize(x, p=2, dim=1) * torch.nn.functional.normalize(y, p=2, dim=1)
+            ).sum(dim=1),
+            "manhattan": lambda x, y: -(x - y).abs().sum(dim=1),
+            "euclidean": lambda x, y: -torch.linalg.vector_norm(x - y, dim=1),
+            "dot": lambda x, y: (x * y).sum(dim=1),
         }
-
+        fn_names = [fn_name for fn_name in self.similarity_fn_names if fn_name in similarity_functions]
         metrics = {}
-        for fn_name in self.similarity_fn_names:
-            if fn_name in similarity_functions:
-                scores = similarity_functions[fn_name](embeddings1, embeddings2)
-                eval_pearson, _ = pearsonr(labels, scores)
-                eval_spearman, _ = spearmanr(labels, scores)
+        if fn_names:
+            scores = torch.stack([similarity_functions[fn_name](embeddings1, embeddings2) for fn_name in fn_names])
+            pearson, spearman = self.compute_correlations(self.scores, scores.cpu().double().numpy())
+            for fn_name, eval_pearson, eval_spearman in zip(fn_names, pearson.tolist(), spearman.tolist()):
                 metrics[f"pearson_{fn_name}"] = eval_pearson
                 metrics[f"spearman_{fn_name}"] = eval_spearman
                 logger.info(
@@ -249,6 +224,82 @@ class EmbeddingSimilarityEvaluator(SentenceEvaluator):
         self.store_metrics_in_model_card_data(model, metrics, epoch, steps)
         return metrics
 
+    def embed_pairs(self, model: SentenceTransformer) -> tuple[Tensor, Tensor]:
+        """
+        Embeds the sentence pairs as float tensors on the model device. Sentences that occur several times, in either
+        ``sentences1`` or ``sentences2``, are only encoded once.
+
+        Args:
+            model (SentenceTransformer): The model to embed the sentences with.
+
+        Returns:
+            Tuple[Tensor, Tensor]: The embeddings of ``sentences1`` and ``sentences2``, with binary embeddings unpacked.
+        """
+        # The sentences may also be e.g. tuples or dataset columns, which don't concatenate like lists
+        all_sentences = list(self.sentences1) + list(self.sentences2)
+        try:
+            # If the sentences are hashable, then we can deduplicate them across both lists
+            sentences = list(dict.fromkeys(all_sentences))
+        except TypeError:
+            # Otherwise we just embed everything, e.g. if the sentences are images for evaluating a CLIP model
+            sentences = all_sentences
+            indices1 = torch.arange(len(self.sentences1))
+            indices2 = torch.arange(len(self.sentences1), len(sentences))
+        else:
+            sentence_to_idx = {sentence: idx for idx, sentence in enumerate(sentences)}
+            indices1 = torch.tensor([sentence_to_idx[sentence] for sentence in self.sentences1], dtype=torch.long)
+            indices2 = torch.tensor([sentence_to_idx[sentence] for sentence in self.sentences2], dtype=torch.long)
+
+        embeddings = self.embed_inputs(
+            model,
+            sentences,
+            batch_size=self.batch_size,
+            show_progress_bar=self.show_progress_bar,
+            convert_to_tensor=True,
+            precision=self.precision,
+            normalize_embeddings=bool(self.precision),
+            truncate_dim=self.truncate_dim,
+        )
+        # Binary and ubinary embeddings are packed, so we need to unpack them for the distance metrics
+        if self.precision in ("ubinary", "binary"):
+            embeddings = embeddings.numpy()
+            if self.precision == "binary":
+                embeddings = (embeddings.astype(np.int16) + 128).astype(np.uint8)
+            embeddings = torch.from_numpy(np.unpackbits(embeddings, axis=1))
+        embeddings = embeddings.to(model.device, dtype=torch.float32)
+        return embeddings[indices1.to(embeddings.device)], embeddings[indices2.to(embeddings.device)]
+
+    @staticmethod
+    def compute_correlations(labels: list[float] | np.ndarray, scores: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Computes the Pearson and Spearman correlation between the labels and each row of scores at once.
+
+        Args:
+            labels (Union[List[float], np.ndarray]): The gold scores, with shape (num_pairs,).
+            scores (np.ndarray): The predicted scores of each similarity function, with shape
+                (num_functions, num_pairs).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The Pearson and Spearman correlations, each with shape (num_functions,).
+        """
+
+        def pearson(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+            x = x - x.mean(axis=-1, keepdims=True)
+            y = y - y.mean()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.clip((x @ y) / (np.linalg.norm(x, axis=-1) * np.linalg.norm(y)), -1.0, 1.0)
+
+        labels = np.asarray(labels, dtype=np.float64)
+        scores = np.asarray(scores, dtype=np.float64)
+        # Spearman's correlation is Pearson's correlation between the ranks, where ties get their average rank
+        return pearson(scores, labels), pearson(rankdata(scores, axis=1), rankdata(labels))
+
+    def get_embedding_inputs(self) -> list[dict[str, Any]]:
+        return [
+            {"sentences": sentences, "batch_size": self.batch_size, "show_progress_bar": self.show_progress_bar}
+            for sentences in (self.sentences1, self.sentences2)
+        ]
+
     @property
     def description(self) -> str:
         return "Semantic Similarity"
@@ -1,18 +1,20 @@
 from __future__ import annotations
 
-import heapq
+import hashlib
 import logging
 import os
-from contextlib import nullcontext
-from typing import TYPE_CHECKING, Callable
+import weakref
+from typing import TYPE_CHECKING, Any, Callable
 
 import numpy as np
 import torch
+from sklearn.feature_extraction.text import TfidfVectorizer
 from torch import Tensor
 from tqdm import trange
 
 from sentence_transformers.evaluation.SentenceEvaluator import SentenceEvaluator
 from sentence_transformers.similarity_functions import SimilarityFunction
+from sentence_transformers.util import get_model_fingerprint, truncate_embeddings
 
 if TYPE_CHECKING:
     from sentence_transformers.SentenceTransformer import SentenceTransformer
@@ -48,6 +50,26 @@ class InformationRetrievalEvaluator(SentenceEvaluator):
         query_prompt_name (str, optional): The name of the prompt to be used when encoding the corpus. Defaults to None.
         corpus_prompt (str, optional): The prompt to be used when encoding the corpus. Defaults to None.
         corpus_prompt_name (str, optional): The name of the prompt to be used when encoding the corpus. Defaults to None.
+        cache_corpus_embeddings (bool): Whether to cache the full-dimensional corpus embeddings between evaluations.
+            The cache is keyed on a fingerprint of the weights of the model that encodes the corpus (i.e. the
+            ``corpus_model`` if provided), so the corpus is only re-encoded if those weights have changed, e.g. not at
+            all for a frozen corpus model. The cache is shared between all evaluators with the same corpus and corpus
+            prompt, so evaluators that only differ in ``truncate_dim`` encode the corpus only once and evaluate
+            their dimension on a slice of the cached embeddings. The cached embeddings are kept until the corpus
+            model is garbage collected. Defaults to False.
+        fast_eval_num_queries (int, optional): If set, evaluate in "fast eval" mode, which is meant for frequent
+            evaluations during training: the metrics are computed for a deterministic subsample of this many queries,
+            stratified by their number of relevant documents, against a corpus that is restricted to the relevant
+            documents of these queries and a fixed pool of hard distractors. The subsample and the distractors are
+            selected once, when the evaluator is created. Besides the metrics, the half-widths of their 95%
+            confidence intervals are reported with a ``_ci95`` suffix. These intervals only account for the
+            subsampling of the queries; the restricted corpus makes the metrics somewhat optimistic compared to a
+            full evaluation. Defaults to None, i.e. evaluate on all queries and the full corpus.
+        fast_eval_num_distractors (int): The number of hard distractors in the restricted corpus of the fast eval
+            mode. The distractors are the non-relevant documents with the highest TF-IDF similarity to the sampled
+            queries, topped up with random documents if needed. Defaults to 1000.
+        fast_eval_seed (int): The seed for sampling the queries and random distractors of the fast eval mode.
+            Defaults to 42.
 
     Example:
         ::
@@ -120,6 +142,13 @@ class InformationRetrievalEvaluator(SentenceEvaluator):
             # => 0.29335196224364596
     """
 
+    # Maps every corpus model to a mapping of (corpus hash, corpus prompt name, corpus prompt) to (corpus model
+    # fingerprint, full-dimensional embeddings), shared between all instances that use ``cache_corpus_embeddings=True``.
+    # The cached embeddings of a corpus model are released together with the model.
+    _corpus_embeddings_cache: weakref.WeakKeyDictionary[
+        SentenceTransformer, dict[tuple[str, str | None, str | None], tuple[tuple, Tensor]]
+    ] = weakref.WeakKeyDictionary()
+
     def __init__(
         self,
         queries: dict[str, str],  # qid => query
@@ -142,6 +171,10 @@ class InformationRetrievalEvaluator(SentenceEvaluator):
         query_prompt_name: str | None = None,
         corpus_prompt: str | None = None,
         corpus_prompt_name: str | None = None,
+        cache_corpus_embeddings: bool = False,
+        fast_eval_num_queries: int | None = None,
+        fast_eval_num_distractors: int = 1000,
+        fast_eval_seed: int = 42,
     ) -> None:
         super().__init__()
         self.queries_ids = []
@@ -153,6 +186,7 @@ class InformationRetrievalEvaluator(SentenceEvaluator):
 
         self.corpus_ids = list(corpus.keys())
         self.corpus = [corpus[cid] for cid in self.corpus_ids]
+        self._corpus_index = {corpus_id: idx for idx, corpus_id in enumerate(self.corpus_ids)}
 
         self.query_prompt = query_prompt
         self.query_prompt_name = query_prompt_name
@@ -175,6 +209,15 @@ class InformationRetrievalEvaluator(SentenceEvaluator):
         self.score_function_names = sorted(list(self.score_functions.keys())) if score_functions else []
         self.main_score_function = SimilarityFunction(main_score_function) if main_score_function else None
         self.truncate_dim = truncate_dim
+        self.cache_corpus_embeddings = cache_corpus_embeddings
+        self._corpus_hash = None
+
+        self.fast_eval_num_queries = fast_eval_num_queries
+        self.fast_eval_num_distractors = fast_eval_num_distractors
+        self.fast_eval_seed = fast_eval_seed
+        self._fast_eval_evaluator = None
+        if fast_eval_num_queries is not None:
+            self._prepare_fast_eval()
 
         if name:
             name = "_" + name
@@ -280,31 +323,60 @@ class InformationRetrievalEvaluator(SentenceEvaluator):
     def compute_metrices(
         self, model: SentenceTransformer, corpus_model=None, corpus_embeddings: Tensor | None = None
     ) -> dict[str, float]:
+        if self._fast_eval_evaluator is not None:
+            return self._compute_fast_eval_metrices(model, corpus_model, corpus_embeddings)
+
+        ranked_indices = self._rank_corpus(model, corpus_model, corpus_embeddings)
+
+        logger.info(f"Queries: {len(self.queries)}")
+        logger.info(f"Corpus: {len(self.corpus)}\n")
+
+        # Compute scores
+        # NOTE: TREC/BEIR/MTEB skips cases where the corpus_id is the same as the query_id. This is not done here,
+        # as this might be unexpected behaviour if the user just uses sets of integers from 0 as query_ids and corpus_ids.
+        num_relevant = np.array([len(self.relevant_docs[query_id]) for query_id in self.queries_ids])
+        scores = {}
+        for name in self.score_functions:
+            relevance = self._relevance_matrix(ranked_indices[name])
+            scores[name] = self.compute_metrics_from_relevance(relevance, num_relevant)
+
+        # Output
+        for name in self.score_function_names:
+            logger.info(f"Score-Function: {name}")
+            self.output_scores(scores[name])
+
+        return scores
+
+    def _rank_corpus(
+        self, model: SentenceTransformer, corpus_model=None, corpus_embeddings: Tensor | None = None
+    ) -> dict[str, np.ndarray]:
+        """
+        Retrieves the top-k corpus documents for every query, and returns per score function a (num_queries, <= k)
+        matrix of corpus indices, sorted by decreasing score.
+        """
         if corpus_model is None:
             corpus_model = model
 
-        max_k = max(
-            max(self.mrr_at_k),
-            max(self.ndcg_at_k),
-            max(self.accuracy_at_k),
-            max(self.precision_recall_at_k),
-            max(self.map_at_k),
-        )
+        max_k = self._get_max_k()
 
         # Compute embedding for the queries
-        with nullcontext() if self.truncate_dim is None else model.truncate_sentence_embeddings(self.truncate_dim):
-            query_embeddings = model.encode(
-                self.queries,
-                prompt_name=self.query_prompt_name,
-                prompt=self.query_prompt,
-                batch_size=self.batch_size,
-                show_progress_bar=self.show_progress_bar,
-                convert_to_tensor=True,
-            )
+        query_embeddings = self.embed_inputs(
+            model,
+            self.queries,
+            prompt_name=self.query_prompt_name,
+            prompt=self.query_prompt,
+            batch_size=self.batch_size,
+            show_progress_bar=self.show_progress_bar,
+            convert_to_tensor=True,
+            truncate_dim=self.truncate_dim,
+        )
 
-        queries_result_list = {}
-        for name in self.score_functions:
-            queries_result_list[name] = [[] for _ in range(len(query_embeddings))]
+        if corpus_embeddings is None and self.cache_corpus_embeddings:
+            corpus_embeddings = self._get_cached_corpus_embeddings(corpus_model)
+
+        # The running top-k corpus indices and scores per score function, each with shape (num_queries, <= max_k)
+        top_k_values = {}
+        top_k_indices = {}
 
         # Iterate over chunks of the corpus
         for corpus_start_idx in trange(
@@ -314,19 +386,16 @@ class InformationRetrievalEvaluator(SentenceEvaluator):
 
             # Encode chunk of corpus
             if corpus_embeddings is None:
-                with (
-                    nullcontext()
-                    if self.truncate_dim is None
-                    else corpus_model.truncate_sentence_embeddings(self.truncate_dim)
-                ):
-                    sub_corpus_embeddings = corpus_model.encode(
-                        self.corpus[corpus_start_idx:corpus_end_idx],
-                        prompt_name=self.corpus_prompt_name,
-                        prompt=self.corpus_prompt,
-                        batch_size=self.batch_size,
-                        show_progress_bar=self.show_progress_bar,
-                        convert_to_tensor=True,
-                    )
+                sub_corpus_embeddings = self.embed_inputs(
+                    corpus_model,
+                    self.corpus[corpus_start_idx:corpus_end_idx],
+                    prompt_name=self.corpus_prompt_name,
+                    prompt=self.corpus_prompt,
+                    batch_size=self.batch_size,
+                    show_progress_bar=self.show_progress_bar,
+                    convert_to_tensor=True,
+                    truncate_dim=self.truncate_dim,
+                )
             else:
                 sub_corpus_embeddings = corpus_embeddings[corpus_start_idx:corpus_end_idx]
 
@@ -338,128 +407,365 @@ class InformationRetrievalEvaluator(SentenceEvaluator):
                 pair_scores_top_k_values, pair_scores_top_k_idx = torch.topk(
                     pair_scores, min(max_k, len(pair_scores[0])), dim=1, largest=True, sorted=False
                 )
-                pair_scores_top_k_values = pair_scores_top_k_values.cpu().tolist()
-                pair_scores_top_k_idx = pair_scores_top_k_idx.cpu().tolist()
-
-                for query_itr in range(len(query_embeddings)):
-                    for sub_corpus_id, score in zip(
-                        pair_scores_top_k_idx[query_itr], pair_scores_top_k_values[query_itr]
-                    ):
-                        corpus_id = self.corpus_ids[corpus_start_idx + sub_corpus_id]
-                        # NOTE: TREC/BEIR/MTEB skips cases where the corpus_id is the same as the query_id, e.g.:
-                        # if corpus_id == self.queries_ids[query_itr]:
-                        #     continue
-                        # This is not done here, as this might be unexpected behaviour if the user just uses
-                        # sets of integers from 0 as query_ids and corpus_ids.
-                        if len(queries_result_list[name][query_itr]) < max_k:
-                            # heaqp tracks the quantity of the first element in the tuple
-                            heapq.heappush(queries_result_list[name][query_itr], (score, corpus_id))
-                        else:
-                            heapq.heappushpop(queries_result_list[name][query_itr], (score, corpus_id))
-
-        for name in queries_result_list:
-            for query_itr in range(len(queries_result_list[name])):
-                for doc_itr in range(len(queries_result_list[name][query_itr])):
-                    score, corpus_id = queries_result_list[name][query_itr][doc_itr]
-                    queries_result_list[name][query_itr][doc_itr] = {"corpus_id": corpus_id, "score": score}
+                pair_scores_top_k_idx += corpus_start_idx
+
+                # Merge the top-k of this chunk with the top-k of the previous chunks
+                if name in top_k_values:
+                    pair_scores_top_k_values = torch.cat([top_k_values[name], pair_scores_top_k_values], dim=1)
+                    pair_scores_top_k_idx = torch.cat([top_k_indices[name], pair_scores_top_k_idx], dim=1)
+                    pair_scores_top_k_values, local_idx = torch.topk(
+                        pair_scores_top_k_values,
+                        min(max_k, pair_scores_top_k_values.size(1)),
+                        dim=1,
+                        largest=True,
+                        sorted=False,
+                    )
+                    pair_scores_top_k_idx = torch.gather(pair_scores_top_k_idx, 1, local_idx)
+                top_k_values[name] = pair_scores_top_k_values
+                top_k_indices[name] = pair_scores_top_k_idx
 
-        logger.info(f"Queries: {len(self.queries)}")
-        logger.info(f"Corpus: {len(self.corpus)}\n")
+        # Sort the hits of each query by decreasing score
+        ranked_indices = {}
+        for name in self.score_functions:
+            local_idx = torch.argsort(top_k_values[name], dim=1, descending=True)
+            ranked_indices[name] = torch.gather(top_k_indices[name], 1, local_idx).cpu().numpy()
+        return ranked_indices
+
+    def _prepare_fast_eval(self) -> None:
+        """
+        Selects the stratified query subsample and the restricted corpus of the fast eval mode, and creates the
+        evaluator that evaluates them. Queries are stratified by the base-2 logarithm of their number of relevant
+        documents, and every stratum contributes queries in proportion to its size.
+        """
+        rng = np.random.default_rng(self.fast_eval_seed)
+        num_relevant = np.array([len(self.relevant_docs[query_id]) for query_id in self.queries_ids])
+        strata = np.floor(np.log2(num_relevant)).astype(np.int64)
+        stratum_ids, stratum_sizes = np.unique(strata, return_counts=True)
+
+        # Allocate the queries proportionally to the strata, rounding with the largest remainder method
+        num_queries = min(self.fast_eval_num_queries, len(self.queries_ids))
+        quotas = stratum_sizes * num_queries / len(self.queries_ids)
+        allocation = np.floor(quotas).astype(np.int64)
+        remainder_order = np.argsort(-(quotas - allocation), kind="stable")
+        allocation[remainder_order[: num_queries - allocation.sum()]] += 1
+
+        query_indices = []
+        for stratum_id, num_samples in zip(stratum_ids, allocation):
+            stratum_indices = np.flatnonzero(strata == stratum_id)
+            query_indices.extend(rng.choice(stratum_indices, size=num_samples, replace=False).tolist())
+        query_indices = np.sort(np.array(query_indices, dtype=np.int64))
+
+        # The stratum of every sampled query, and the number of queries per stratum in the full set of queries
+        self._fast_eval_strata = strata[query_indices]
+        self._fast_eval_stratum_sizes = dict(zip(stratum_ids.tolist(), stratum_sizes.tolist()))
+
+        sampled_query_ids = [self.queries_ids[idx] for idx in query_indices]
+        relevant_indices = {
+            self._corpus_index[corpus_id]
+            for query_id in sampled_query_ids
+            for corpus_id in self.relevant_docs[query_id]
+            if corpus_id in self._corpus_index
+        }
+        distractor_indices = self._select_hard_distractors(
+            [self.queries[idx] for idx in query_indices], relevant_indices, rng
+        )
+        self._fast_eval_corpus_indices = np.array(sorted(relevant_indices | set(distractor_indices)), dtype=np.int64)
+
+        self._fast_eval_evaluator = InformationRetrievalEvaluator(
+            queries={self.queries_ids[idx]: self.queries[idx] for idx in query_indices},
+            corpus={self.corpus_ids[idx]: self.corpus[idx] for idx in self._fast_eval_corpus_indices},
+            relevant_docs={query_id: self.relevant_docs[query_id] for query_id in sampled_query_ids},
+            corpus_chunk_size=self.corpus_chunk_size,
+            mrr_at_k=self.mrr_at_k,
+            ndcg_at_k=self.ndcg_at_k,
+            accuracy_at_k=self.accuracy_at_k,
+            precision_recall_at_k=self.precision_recall_at_k,
+            map_at_k=self.map_at_k,
+            show_progress_bar=self.show_progress_bar,
+            batch_size=self.batch_size,
+            name=self.name,
+            write_csv=False,
+            truncate_dim=self.truncate_dim,
+            score_functions=self.score_functions,
+            main_score_function=self.main_score_function,
+            query_prompt=self.query_prompt,
+            query_prompt_name=self.query_prompt_name,
+            corpus_prompt=self.corpus_prompt,
+            corpus_prompt_name=self.corpus_prompt_name,
+            cache_corpus_embeddings=self.cache_corpus_embeddings,
+        )
+        logger.info(
+            f"Fast eval mode: evaluating {len(query_indices)} of {len(self.queries_ids)} queries against "
+            f"{len(self._fast_eval_corpus_indices)} of {len(self.corpus_ids)} documents."
+        )
 
-        # Compute scores
-        scores = {name: self.compute_metrics(queries_result_list[name]) for name in self.score_functions}
+    def _select_hard_distractors(
+        self, queries: list[str], relevant_indices: set[int], rng: np.random.Generator
+    ) -> list[int]:
+        """
+        Returns the corpus indices of ``fast_eval_num_distractors`` non-relevant documents. The documents with the
+        highest TF-IDF similarity to each query are taken in turns, and random documents are added if there are not
+        enough lexically similar documents, e.g. if the corpus does not consist of texts.
+        """
+        num_distractors = min(self.fast_eval_num_distractors, len(self.corpus) - len(relevant_indices))
+        distractor_indices = {}
+        if num_distractors > 0 and all(isinstance(text, str) for text in self.corpus + queries):
+            try:
+                vectorizer = TfidfVectorizer(sublinear_tf=True)
+                corpus_matrix = vectorizer.fit_transform(self.corpus)
+            except ValueError:
+                # E.g. if the corpus does not contain any words
+                corpus_matrix = None
+            if corpus_matrix is not None:
+                similarities = (vectorizer.transform(queries) @ corpus_matrix.T).tocsr()
+                num_per_query = -(-num_distractors // len(queries))
+                ranked_per_query = []
+                for query_idx in range(len(queries)):
+                    row = similarities.getrow(query_idx)
+                    order = np.argsort(-row.data, kind="stable")
+                    candidates = [idx for idx in row.indices[order].tolist() if idx not in relevant_indices]
+                    ranked_per_query.append(candidates[:num_per_query])
+                # Take the best remaining distractor of every query in turns, so all queries get hard distractors
+                for rank in range(num_per_query):
+                    for candidates in ranked_per_query:
+                        if rank < len(candidates):
+                            distractor_indices.setdefault(candidates[rank])
+        distractor_indices = list(distractor_indices)[:num_distractors]
+
+        if len(distractor_indices) < num_distractors:
+            excluded = relevant_indices | set(distractor_indices)
+            remaining = np.array([idx for idx in range(len(self.corpus)) if idx not in excluded], dtype=np.int64)
+            distractor_indices += rng.choice(
+                remaining, size=num_distractors - len(distractor_indices), replace=False
+            ).tolist()
+        return distractor_indices
+
+    def _compute_fast_eval_metrices(
+        self, model: SentenceTransformer, corpus_model=None, corpus_embeddings: Tensor | None = None
+    ) -> dict[str, dict[str, dict[int, float]]]:
+        evaluator = self._fast_eval_evaluator
+        evaluator.score_functions = self.score_functions
+        evaluator.score_function_names = self.score_function_names
+        if corpus_embeddings is not None:
+            corpus_embeddings = corpus_embeddings[
+                torch.from_numpy(self._fast_eval_corpus_indices).to(corpus_embeddings.device)
+            ]
+        ranked_indices = evaluator._rank_corpus(model, corpus_model, corpus_embeddings)
+
+        logger.info(f"Queries: {len(evaluator.queries)} of {len(self.queries)} (fast eval)")
+        logger.info(f"Corpus: {len(evaluator.corpus)} of {len(self.corpus)} (fast eval)\n")
+
+        num_relevant = np.array([len(evaluator.relevant_docs[query_id]) for query_id in evaluator.queries_ids])
+        scores = {}
+        for name in self.score_functions:
+            relevance = evaluator._relevance_matrix(ranked_indices[name])
+            per_query_metrics = evaluator.compute_per_query_metrics_from_relevance(relevance, num_relevant)
+            scores[name] = {}
+            for metric_name, values in per_query_metrics.items():
+                estimates = {k: self._stratified_estimate(per_query_values) for k, per_query_values in values.items()}
+                scores[name][metric_name] = {k: estimate for k, (estimate, _) in estimates.items()}
+                scores[name][f"{metric_name}_ci95"] = {k: half_width for k, (_, half_width) in estimates.items()}
 
-        # Output
         for name in self.score_function_names:
             logger.info(f"Score-Function: {name}")
             self.output_scores(scores[name])
 
         return scores
 
-    def compute_metrics(self, queries_result_list: list[object]):
-        # Init score computation values
-        num_hits_at_k = {k: 0 for k in self.accuracy_at_k}
-        precisions_at_k = {k: [] for k in self.precision_recall_at_k}
-        recall_at_k = {k: [] for k in self.precision_recall_at_k}
-        MRR = {k: 0 for k in self.mrr_at_k}
-        ndcg = {k: [] for k in self.ndcg_at_k}
-        AveP_at_k = {k: [] for k in self.map_at_k}
-
-        # Compute scores on results
-        for query_itr in range(len(queries_result_list)):
-            query_id = self.queries_ids[query_itr]
-
-            # Sort scores
-            top_hits = sorted(queries_result_list[query_itr], key=lambda x: x["score"], reverse=True)
-            query_relevant_docs = self.relevant_docs[query_id]
-
-            # Accuracy@k - We count the result correct, if at least one relevant doc is across the top-k documents
-            for k_val in self.accuracy_at_k:
-                for hit in top_hits[0:k_val]:
-                    if hit["corpus_id"] in query_relevant_docs:
-                        num_hits_at_k[k_val] += 1
-                        break
-
-            # Precision and Recall@k
-            for k_val in self.precision_recall_at_k:
-                num_correct = 0
-                for hit in top_hits[0:k_val]:
-                    if hit["corpus_id"] in query_relevant_docs:
-                        num_correct += 1
-
-                precisions_at_k[k_val].append(num_correct / k_val)
-                recall_at_k[k_val].append(num_correct / len(query_relevant_docs))
-
-            # MRR@k
-            for k_val in self.mrr_at_k:
-                for rank, hit in enumerate(top_hits[0:k_val]):
-                    if hit["corpus_id"] in query_relevant_docs:
-                        MRR[k_val] += 1.0 / (rank + 1)
-                        break
-
-            # NDCG@k
-            for k_val in self.ndcg_at_k:
-                predicted_relevance = [
-                    1 if top_hit["corpus_id"] in query_relevant_docs else 0 for top_hit in top_hits[0:k_val]
-                ]
-                true_relevances = [1] * len(query_relevant_docs)
-
-                ndcg_value = self.compute_dcg_at_k(predicted_relevance, k_val) / self.compute_dcg_at_k(
-                    true_relevances, k_val
+    def _stratified_estimate(self, values: np.ndarray) -> tuple[float, float]:
+        """
+        Estimates the mean of a per-query metric over all queries from the values of the sampled queries, and returns
+        the estimate and the half-width of its 95% confidence interval, using the stratified sampling variance with a
+        finite population correction.
+        """
+        # Strata without sampled queries are skipped, and the weights of the other strata are renormalized
+        sampled_total = sum(
+            size
+            for stratum, size in self._fast_eval_stratum_sizes.items()
+            if np.any(self._fast_eval_strata == stratum)
+        )
+        overall_variance = np.var(values, ddof=1) if len(values) > 1 else 0.0
+        estimate = 0.0
+        variance = 0.0
+        for stratum, size in self._fast_eval_stratum_sizes.items():
+            stratum_values = values[self._fast_eval_strata == stratum]
+            if len(stratum_values) == 0:
+                continue
+            weight = size / sampled_total
+            # A single sampled query gives no variance estimate, so fall back to the variance of all sampled queries
+            stratum_variance = np.var(stratum_values, ddof=1) if len(stratum_values) > 1 else overall_variance
+            estimate += weight * stratum_values.mean()
+            variance += weight**2 * (1 - len(stratum_values) / size) * stratum_variance / len(stratum_values)
+        return float(estimate), float(1.96 * np.sqrt(variance))
+
+    def _get_cached_corpus_embeddings(self, corpus_model: SentenceTransformer) -> Tensor:
+        """
+        Returns the corpus embeddings, truncated to ``truncate_dim``, from the shared cache. The full-dimensional
+        corpus embeddings are (re-)encoded if the corpus model has changed since they were cached.
+        """
+        if self._corpus_hash is None:
+            hasher = hashlib.sha256()
+            for document in self.corpus:
+                hasher.update(str(document).encode())
+                hasher.update(b"\0")
+            self._corpus_hash = hasher.hexdigest()
+
+        cache_key = (self._corpus_hash, self.corpus_prompt_name, self.corpus_prompt)
+        fingerprint = (
+            get_model_fingerprint(corpus_model),
+            getattr(corpus_model, "max_seq_length", None),
+            getattr(corpus_model, "default_prompt_name", None),
+        )
+        model_cache = self._corpus_embeddings_cache.setdefault(corpus_model, {})
+        cached_fingerprint, corpus_embeddings = model_cache.get(cache_key, (None, None))
+        if cached_fingerprint == fingerprint:
+            logger.info("Reusing the cached corpus embeddings, as the corpus model has not changed.")
+        else:
+            # Remove the outdated embeddings before encoding to lower the peak memory usage
+            model_cache.pop(cache_key, None)
+            corpus_embeddings = None
+            with corpus_model.truncate_sentence_embeddings(None):
+                corpus_embeddings = corpus_model.encode(
+                    self.corpus,
+                    prompt_name=self.corpus_prompt_name,
+                    prompt=self.corpus_prompt,
+                    batch_size=self.batch_size,
+                    show_progress_bar=self.show_progress_bar,
+                    convert_to_tensor=True,
                 )
-                ndcg[k_val].append(ndcg_value)
-
-            # MAP@k
-            for k_val in self.map_at_k:
-                num_correct = 0
-                sum_precisions = 0
-
-                for rank, hit in enumerate(top_hits[0:k_val]):
-                    if hit["corpus_id"] in query_relevant_docs:
-                        num_correct += 1
-                        sum_precisions += num_correct / (rank + 1)
-
-                avg_precision = sum_precisions / min(k_val, len(query_relevant_docs))
-                AveP_at_k[k_val].append(avg_precision)
-
-        # Compute averages
-        for k in num_hits_at_k:
-            num_hits_at_k[k] /= len(self.queries)
+            model_cache[cache_key] = (fingerprint, corpus_embeddings)
+        return truncate_embeddings(
+            corpus_embeddings, corpus_model.truncate_dim if self.truncate_dim is None else self.truncate_dim
+        )
 
-        for k in precisions_at_k:
-            precisions_at_k[k] = np.mean(precisions_at_k[k])
+    def get_embedding_inputs(self) -> list[dict[str, Any]]:
+        if self._fast_eval_evaluator is not None:
+            return self._fast_eval_evaluator.get_embedding_inputs()
+
+        inputs = [
+            {
+                "sentences": self.queries,
+                "prompt_name": self.query_prompt_name,
+                "prompt": self.query_prompt,
+                "batch_size": self.batch_size,
+                "show_progress_bar": self.show_progress_bar,
+            }
+        ]
+        # Cached corpus embeddings are reused across evaluations, so they don't have to be prefetched
+        if not self.cache_corpus_embeddings:
+            inputs.append(
+                {
+                    "sentences": self.corpus,
+                    "prompt_name": self.corpus_prompt_name,
+                    "prompt": self.corpus_prompt,
+                    "batch_size": self.batch_size,
+                    "show_progress_bar": self.show_progress_bar,
+                }
+            )
+        return inputs
 
-        for k in recall_at_k:
-            recall_at_k[k] = np.mean(recall_at_k[k])
+    def _get_max_k(self) -> int:
+        """Returns the largest k over all metrics, i.e. the number of documents to retrieve per query."""
+        return max(
+            max(self.mrr_at_k),
+            max(self.ndcg_at_k),
+            max(self.accuracy_at_k),
+            max(self.precision_recall_at_k),
+            max(self.map_at_k),
+        )
 
-        for k in ndcg:
-            ndcg[k] = np.mean(ndcg[k])
+    def _relevance_matrix(self, ranked_indices: np.ndarray) -> np.ndarray:
+        """
+        Converts a (num_queries, k) matrix of ranked corpus indices into a boolean (num_queries, k) matrix denoting
+        whether each hit is relevant for its query.
+        """
+        # Every relevant (query, corpus document) pair is encoded as a single integer
+        relevant_keys = np.array(
+            [
+                query_idx * len(self.corpus_ids) + self._corpus_index[corpus_id]
+                for query_idx, query_id in enumerate(self.queries_ids)
+                for corpus_id in self.relevant_docs[query_id]
+                if corpus_id in self._corpus_index
+            ],
+            dtype=np.int64,
+        )
+        query_idx = np.arange(len(ranked_indices), dtype=np.int64)[:, None]
+        return np.isin(query_idx * len(self.corpus_ids) + ranked_indices, relevant_keys)
 
-        for k in MRR:
-            MRR[k] /= len(self.queries)
+    def compute_metrics(self, queries_result_list: list[object]):
+        """
+        Computes the metrics from a list with, for every query, a list of ``{"corpus_id": ..., "score": ...}`` hits.
+        """
+        max_k = self._get_max_k()
+        relevance = np.zeros((len(queries_result_list), max_k), dtype=bool)
+        for query_itr, query_results in enumerate(queries_result_list):
+            query_relevant_docs = self.relevant_docs[self.queries_ids[query_itr]]
+            top_hits = sorted(query_results, key=lambda x: x["score"], reverse=True)[:max_k]
+            relevance[query_itr, : len(top_hits)] = [hit["corpus_id"] in query_relevant_docs for hit in top_hits]
+        num_relevant = np.array([len(self.relevant_docs[query_id]) for query_id in self.queries_ids])
+        return self.compute_metrics_from_relevance(relevance, num_relevant)
+
+    def compute_metrics_from_relevance(self, relevance: np.ndarray, num_relevant: np.ndarray):
+        """
+        Computes the metrics for all queries at once from a relevance matrix.
+
+        Args:
+            relevance (np.ndarray): A boolean (num_queries, k) matrix denoting for the top-k hits of each query, sorted
+                by decreasing score, whether the hit is relevant.
+            num_relevant (np.ndarray): A (num_queries,) array with the number of relevant documents per query.
+
+        Returns:
+            Dict[str, Dict[int, float]]: A mapping of metric names to a mapping of k values to scores.
+        """
+        per_query_metrics = self.compute_per_query_metrics_from_relevance(relevance, num_relevant)
+        return {
+            metric_name: {k: float(np.mean(per_query_values)) for k, per_query_values in values.items()}
+            for metric_name, values in per_query_metrics.items()
+        }
 
-        for k in AveP_at_k:
-            AveP_at_k[k] = np.mean(AveP_at_k[k])
+    def compute_per_query_metrics_from_relevance(
+        self, relevance: np.ndarray, num_relevant: np.ndarray
+    ) -> dict[str, dict[int, np.ndarray]]:
+        """
+        Computes the metrics of every query at once from a relevance matrix, see :meth:`compute_metrics_from_relevance`.
+
+        Returns:
+            Dict[str, Dict[int, np.ndarray]]: A mapping of metric names to a mapping of k values to (num_queries,)
+            arrays with the score of every query.
+        """
+        # Pad the relevance matrix if fewer than max_k documents were retrieved, e.g. due to a tiny corpus
+        max_k = self._get_max_k()
+        relevance = np.asarray(relevance, dtype=bool)
+        if relevance.shape[1] < max_k:
+            relevance = np.pad(relevance, ((0, 0), (0, max_k - relevance.shape[1])))
+        num_relevant = np.asarray(num_relevant)
+
+        # num_correct[:, k - 1] is the number of relevant documents in the top-k
+        num_correct = np.cumsum(relevance, axis=1)
+        ranks = np.arange(1, max_k + 1)
+        # The rank of the first relevant document, or 0 if there is none
+        first_relevant_rank = np.where(relevance.any(axis=1), relevance.argmax(axis=1) + 1, 0)
+        discounts = 1 / np.log2(ranks + 1)
+        dcg = np.cumsum(relevance * discounts, axis=1)
+        ideal_dcg = np.cumsum(discounts)
+        precision_sums = np.cumsum(relevance * num_correct / ranks, axis=1)
+
+        # Accuracy@k - We count the result correct, if at least one relevant doc is across the top-k documents
+        num_hits_at_k = {k: (num_correct[:, k - 1] > 0).astype(float) for k in self.accuracy_at_k}
+
+        # Precision and Recall@k
+        precisions_at_k = {k: num_correct[:, k - 1] / k for k in self.precision_recall_at_k}
+        recall_at_k = {k: num_correct[:, k - 1] / num_relevant for k in self.precision_recall_at_k}
+
+        # MRR@k
+        reciprocal_ranks = np.where(first_relevant_rank > 0, 1 / np.maximum(first_relevant_rank, 1), 0)
+        MRR = {k: np.where(first_relevant_rank <= k, reciprocal_ranks, 0) for k in self.mrr_at_k}
+
+        # NDCG@k
+        ndcg = {k: dcg[:, k - 1] / ideal_dcg[np.minimum(num_relevant, k) - 1] for k in self.ndcg_at_k}
+
+        # MAP@k
+        AveP_at_k = {k: precision_sums[:, k - 1] / np.minimum(k, num_relevant) for k in self.map_at_k}
 
         return {
             "accuracy@k": num_hits_at_k,
@@ -471,23 +777,37 @@ class InformationRetrievalEvaluator(SentenceEvaluator):
         }
 
     def output_scores(self, scores):
+        def format_ci(metric_name: str, k: int, scale: float = 1.0, precision: int = 4) -> str:
+            # The half-width of the confidence interval is only reported in the fast eval mode
+            if f"{metric_name}_ci95" not in scores:
+                return ""
+            return f" ± {scores[f'{metric_name}_ci95'][k] * scale:.{precision}f}"
+
         for k in scores["accuracy@k"]:
-            logger.info("Accuracy@{}: {:.2f}%".format(k, scores["accuracy@k"][k] * 100))
+            logger.info(
+                "Accuracy@{}: {:.2f}%{}".format(k, scores["accuracy@k"][k] * 100, format_ci("accuracy@k", k, 100, 2))
+            )
 
         for k in scores["precision@k"]:
-            logger.info("Precision@{}: {:.2f}%".format(k, scores["precision@k"][k] * 100))
+            logger.info(
+                "Precision@{}: {:.2f}%{}".format(
+                    k, scores["precision@k"][k] * 100, format_ci("precision@k", k, 100, 2)
+                )
+            )
 
         for k in scores["recall@k"]:
-            logger.info("Recall@{}: {:.2f}%".format(k, scores["recall@k"][k] * 100))
+            logger.info(
+                "Recall@{}: {:.2f}%{}".format(k, scores["recall@k"][k] * 100, format_ci("recall@k", k, 100, 2))
+            )
 
         for k in scores["mrr@k"]:
-            logger.info("MRR@{}: {:.4f}".format(k, scores["mrr@k"][k]))
+            logger.info("MRR@{}: {:.4f}{}".format(k, scores["mrr@k"][k], format_ci("mrr@k", k)))
 
         for k in scores["ndcg@k"]:
-            logger.info("NDCG@{}: {:.4f}".format(k, scores["ndcg@k"][k]))
+            logger.info("NDCG@{}: {:.4f}{}".format(k, scores["ndcg@k"][k], format_ci("ndcg@k", k)))
 
         for k in scores["map@k"]:
-            logger.info("MAP@{}: {:.4f}".format(k, scores["map@k"][k]))
+            logger.info("MAP@{}: {:.4f}{}".format(k, scores["map@k"][k], format_ci("map@k", k)))
 
     @staticmethod
     def compute_dcg_at_k(relevances, k):
@@ -504,6 +824,7 @@ class InformationRetrievalEvaluator(SentenceEvaluator):
             "query_prompt_name",
             "corpus_prompt",
             "corpus_prompt_name",
+            "fast_eval_num_queries",
         ]
         for key in config_dict_candidate_keys:
             if getattr(self, key) is not None:
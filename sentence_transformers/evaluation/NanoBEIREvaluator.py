@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from typing import TYPE_CHECKING, Any, Callable, Literal
 
 import numpy as np
@@ -9,10 +11,11 @@ from torch import Tensor
 from tqdm import tqdm
 
 from sentence_transformers import SentenceTransformer
+from sentence_transformers.evaluation.EmbeddingCache import EmbeddingCache
 from sentence_transformers.evaluation.InformationRetrievalEvaluator import InformationRetrievalEvaluator
 from sentence_transformers.evaluation.SentenceEvaluator import SentenceEvaluator
 from sentence_transformers.similarity_functions import SimilarityFunction
-from sentence_transformers.util import is_datasets_available
+from sentence_transformers.util import _load_dataset_columns, is_datasets_available
 
 if TYPE_CHECKING:
     from sentence_transformers.SentenceTransformer import SentenceTransformer
@@ -95,6 +98,11 @@ class NanoBEIREvaluator(SentenceEvaluator):
         aggregate_key (str): The key to use for the aggregated score. Defaults to "mean".
         query_prompts (str | dict[str, str], optional): The prompts to add to the queries. If a string, will add the same prompt to all queries. If a dict, expects that all datasets in dataset_names are keys.
         corpus_prompts (str | dict[str, str], optional): The prompts to add to the corpus. If a string, will add the same prompt to all corpus. If a dict, expects that all datasets in dataset_names are keys.
+        cache_embeddings (bool): Whether to deduplicate the queries and documents of all datasets and encode them together in one length-sorted pass with an :class:`~sentence_transformers.evaluation.EmbeddingCache`, instead of encoding each dataset separately. Defaults to False.
+        cache_folder (str, optional): Directory in which the prepared datasets are stored as Arrow files, so that subsequent evaluators load them without going through ``datasets``. Defaults to None, i.e. a directory in the ``datasets`` cache.
+        fast_eval_num_queries (int, optional): If set, evaluate every dataset in the "fast eval" mode of the :class:`~sentence_transformers.evaluation.InformationRetrievalEvaluator` on a deterministic stratified subsample of this many queries, against a corpus restricted to their relevant documents and a fixed pool of hard distractors. The half-widths of the 95% confidence intervals of the metrics are reported with a ``_ci95`` suffix, also for the mean over the datasets. Defaults to None, i.e. evaluate on all queries and the full corpora.
+        fast_eval_num_distractors (int): The number of hard distractors per dataset in the fast eval mode. Defaults to 1000.
+        fast_eval_seed (int): The seed for the subsampling of the fast eval mode. Defaults to 42.
 
     Example:
         ::
@@ -204,6 +212,11 @@ class NanoBEIREvaluator(SentenceEvaluator):
         aggregate_key: str = "mean",
         query_prompts: str | dict[str, str] | None = None,
         corpus_prompts: str | dict[str, str] | None = None,
+        cache_embeddings: bool = False,
+        cache_folder: str | None = None,
+        fast_eval_num_queries: int | None = None,
+        fast_eval_num_distractors: int = 1000,
+        fast_eval_seed: int = 42,
     ):
         super().__init__()
         if dataset_names is None:
@@ -220,6 +233,9 @@ class NanoBEIREvaluator(SentenceEvaluator):
         self.score_function_names = sorted(list(self.score_functions.keys())) if score_functions else []
         self.main_score_function = main_score_function
         self.truncate_dim = truncate_dim
+        self.cache_embeddings = cache_embeddings
+        self.cache_folder = cache_folder
+        self.fast_eval_num_queries = fast_eval_num_queries
         self.name = f"NanoBEIR_{aggregate_key}"
         if self.truncate_dim:
             self.name += f"_{self.truncate_dim}"
@@ -245,12 +261,21 @@ class NanoBEIREvaluator(SentenceEvaluator):
             "truncate_dim": truncate_dim,
             "score_functions": score_functions,
             "main_score_function": main_score_function,
+            "fast_eval_num_queries": fast_eval_num_queries,
+            "fast_eval_num_distractors": fast_eval_num_distractors,
+            "fast_eval_seed": fast_eval_seed,
         }
 
-        self.evaluators = [
-            self._load_dataset(name, **ir_evaluator_kwargs)
-            for name in tqdm(self.dataset_names, desc="Loading NanoBEIR datasets", leave=False)
-        ]
+        # Load the datasets concurrently, as loading them is mostly I/O bound
+        with ThreadPoolExecutor(max_workers=min(len(self.dataset_names), 8)) as executor:
+            self.evaluators = list(
+                tqdm(
+                    executor.map(lambda name: self._load_dataset(name, **ir_evaluator_kwargs), self.dataset_names),
+                    total=len(self.dataset_names),
+                    desc="Loading NanoBEIR datasets",
+                    leave=False,
+                )
+            )
 
         self.csv_file: str = f"NanoBEIR_evaluation_{aggregate_key}_results.csv"
         self.csv_headers = ["epoch", "steps"]
@@ -296,21 +321,33 @@ class NanoBEIREvaluator(SentenceEvaluator):
             self.score_function_names = [model.similarity_fn_name]
             self._append_csv_headers(self.score_function_names)
 
-        for evaluator in tqdm(self.evaluators, desc="Evaluating datasets", disable=not self.show_progress_bar):
-            logger.info(f"Evaluating {evaluator.name}")
-            evaluation = evaluator(model, output_path, epoch, steps)
-            for k in evaluation:
-                if self.truncate_dim:
-                    dataset, _, metric = k.split("_", maxsplit=2)
-                else:
-                    dataset, metric = k.split("_", maxsplit=1)
-                if metric not in per_metric_results:
-                    per_metric_results[metric] = []
-                per_dataset_results[dataset + "_" + metric] = evaluation[k]
-                per_metric_results[metric].append(evaluation[k])
+        # Reuse the cache of an enclosing evaluator, e.g. a SequentialEvaluator with cache_embeddings=True
+        use_cache = self.cache_embeddings and EmbeddingCache.get_active() is None
+        with EmbeddingCache() if use_cache else nullcontext() as cache:
+            if use_cache:
+                cache.prefetch(model, self.evaluators)
+            for evaluator in tqdm(self.evaluators, desc="Evaluating datasets", disable=not self.show_progress_bar):
+                logger.info(f"Evaluating {evaluator.name}")
+                evaluation = evaluator(model, output_path, epoch, steps)
+                for k in evaluation:
+                    if self.truncate_dim:
+                        dataset, _, metric = k.split("_", maxsplit=2)
+                    else:
+                        dataset, metric = k.split("_", maxsplit=1)
+                    if metric not in per_metric_results:
+                        per_metric_results[metric] = []
+                    per_dataset_results[dataset + "_" + metric] = evaluation[k]
+                    per_metric_results[metric].append(evaluation[k])
 
         agg_results = {}
         for metric in per_metric_results:
+            if metric.endswith("_ci95"):
+                # The datasets are sampled independently, so the half-widths of the confidence intervals of the
+                # mean over the datasets combine like standard errors. Other aggregates get no confidence interval.
+                if self.aggregate_fn is np.mean:
+                    half_widths = np.array(per_metric_results[metric])
+                    agg_results[metric] = float(np.sqrt(np.sum(half_widths**2)) / len(half_widths))
+                continue
             agg_results[metric] = self.aggregate_fn(per_metric_results[metric])
 
         if output_path is not None and self.write_csv:
@@ -355,8 +392,10 @@ class NanoBEIREvaluator(SentenceEvaluator):
             else:
                 self.primary_metric = f"{self.main_score_function.value}_ndcg@{max(self.ndcg_at_k)}"
 
-        avg_queries = np.mean([len(evaluator.queries) for evaluator in self.evaluators])
-        avg_corpus = np.mean([len(evaluator.corpus) for evaluator in self.evaluators])
+        # In the fast eval mode, only a subset of the queries and the corpus of each dataset is evaluated
+        evaluated = [evaluator._fast_eval_evaluator or evaluator for evaluator in self.evaluators]
+        avg_queries = np.mean([len(evaluator.queries) for evaluator in evaluated])
+        avg_corpus = np.mean([len(evaluator.corpus) for evaluator in evaluated])
         logger.info(f"Average Queries: {avg_queries}")
         logger.info(f"Average Corpus: {avg_corpus}\n")
 
@@ -393,19 +432,20 @@ class NanoBEIREvaluator(SentenceEvaluator):
             raise ValueError(
                 "datasets is not available. Please install it to use the NanoBEIREvaluator via `pip install datasets`."
             )
-        from datasets import load_dataset
 
         dataset_path = dataset_name_to_id[dataset_name.lower()]
-        corpus = load_dataset(dataset_path, "corpus", split="train")
-        queries = load_dataset(dataset_path, "queries", split="train")
-        qrels = load_dataset(dataset_path, "qrels", split="train")
-        corpus_dict = {sample["_id"]: sample["text"] for sample in corpus if len(sample["text"]) > 0}
-        queries_dict = {sample["_id"]: sample["text"] for sample in queries if len(sample["text"]) > 0}
+        corpus = _load_dataset_columns(
+            dataset_path, "corpus", ["_id", "text"], filter_empty="text", cache_folder=self.cache_folder
+        )
+        queries = _load_dataset_columns(
+            dataset_path, "queries", ["_id", "text"], filter_empty="text", cache_folder=self.cache_folder
+        )
+        qrels = _load_dataset_columns(dataset_path, "qrels", ["query-id", "corpus-id"], cache_folder=self.cache_folder)
+        corpus_dict = dict(zip(corpus["_id"], corpus["text"]))
+        queries_dict = dict(zip(queries["_id"], queries["text"]))
         qrels_dict = {}
-        for sample in qrels:
-            if sample["query-id"] not in qrels_dict:
-                qrels_dict[sample["query-id"]] = set()
-            qrels_dict[sample["query-id"]].add(sample["corpus-id"])
+        for query_id, corpus_id in zip(qrels["query-id"], qrels["corpus-id"]):
+            qrels_dict.setdefault(query_id, set()).add(corpus_id)
 
         if self.query_prompts is not None:
             ir_evaluator_kwargs["query_prompt"] = self.query_prompts.get(dataset_name, None)
@@ -452,9 +492,12 @@ class NanoBEIREvaluator(SentenceEvaluator):
         if error_msg:
             raise ValueError(error_msg.strip())
 
+    def get_embedding_inputs(self) -> list[dict[str, Any]]:
+        return [inputs for evaluator in self.evaluators for inputs in evaluator.get_embedding_inputs()]
+
     def get_config_dict(self) -> dict[str, Any]:
         config_dict = {"dataset_names": self.dataset_names}
-        config_dict_candidate_keys = ["truncate_dim", "query_prompts", "corpus_prompts"]
+        config_dict_candidate_keys = ["truncate_dim", "query_prompts", "corpus_prompts", "fast_eval_num_queries"]
         for key in config_dict_candidate_keys:
             if getattr(self, key) is not None:
                 config_dict[key] = getattr(self, key)
@@ -12,7 +12,17 @@ import tqdm
 from sklearn.metrics import average_precision_score, ndcg_score
 
 from sentence_transformers.evaluation.SentenceEvaluator import SentenceEvaluator
-from sentence_transformers.util import cos_sim
+from sentence_transformers.util import (
+    cos_sim,
+    dot_score,
+    euclidean_sim,
+    manhattan_sim,
+    pairwise_cos_sim,
+    pairwise_dot_score,
+    pairwise_euclidean_sim,
+    pairwise_manhattan_sim,
+    ragged_ranking_metrics,
+)
 
 if TYPE_CHECKING:
     from sentence_transformers.SentenceTransformer import SentenceTransformer
@@ -213,6 +223,8 @@ class RerankingEvaluator(SentenceEvaluator):
     def compute_metrices_batched(self, model):
         """
         Computes the evaluation metrics in a batched way, by batching all queries and all documents together.
+        Documents that occur in multiple samples are only encoded once, and the metrics of all samples are
+        computed at once with :func:`~sentence_transformers.util.ragged_ranking_metrics`.
 
         Args:
             model (SentenceTransformer): The SentenceTransformer model to compute metrics for.
@@ -220,63 +232,78 @@ class RerankingEvaluator(SentenceEvaluator):
         Returns:
             Dict[str, float]: A dictionary containing the evaluation metrics.
         """
-        all_mrr_scores = []
-        all_ndcg_scores = []
-        all_ap_scores = []
-
-        with nullcontext() if self.truncate_dim is None else model.truncate_sentence_embeddings(self.truncate_dim):
-            all_query_embs = model.encode(
-                [sample["query"] for sample in self.samples],
-                convert_to_tensor=True,
-                batch_size=self.batch_size,
-                show_progress_bar=self.show_progress_bar,
-            )
-
-            all_docs = []
-
-            for sample in self.samples:
-                all_docs.extend(sample["positive"])
-                all_docs.extend(sample["negative"])
-
-            all_docs_embs = model.encode(
-                all_docs, convert_to_tensor=True, batch_size=self.batch_size, show_progress_bar=self.show_progress_bar
-            )
-
-        # Compute scores
-        query_idx, docs_idx = 0, 0
-        for instance in self.samples:
-            query_emb = all_query_embs[query_idx]
-            query_idx += 1
-
-            num_pos = len(instance["positive"])
-            num_neg = len(instance["negative"])
-            docs_emb = all_docs_embs[docs_idx : docs_idx + num_pos + num_neg]
-            docs_idx += num_pos + num_neg
-
-            if num_pos == 0 or num_neg == 0:
-                continue
-
-            pred_scores = self.similarity_fct(query_emb, docs_emb)
-            if len(pred_scores.shape) > 1:
-                pred_scores = pred_scores[0]
+        num_positives = np.array([len(sample["positive"]) for sample in self.samples])
+        num_documents = num_positives + np.array([len(sample["negative"]) for sample in self.samples])
+        offsets = np.concatenate([[0], np.cumsum(num_documents)])
+        # The positives come before the negatives in the documents of each sample
+        is_relevant = np.arange(offsets[-1]) - np.repeat(offsets[:-1], num_documents) < np.repeat(
+            num_positives, num_documents
+        )
 
-            pred_scores_argsort = torch.argsort(-pred_scores)  # Sort in decreasing order
-            pred_scores = pred_scores.cpu().tolist()
+        # Map every query and document to its index in the deduplicated texts
+        query_to_idx = {}
+        query_ids = np.array([query_to_idx.setdefault(sample["query"], len(query_to_idx)) for sample in self.samples])
+        document_to_idx = {}
+        document_ids = np.array(
+            [
+                document_to_idx.setdefault(document, len(document_to_idx))
+                for sample in self.samples
+                for documents in (sample["positive"], sample["negative"])
+                for document in documents
+            ],
+            dtype=np.int64,
+        )
 
-            # Compute MRR score
-            is_relevant = [1] * num_pos + [0] * num_neg
-            mrr_score = 0
-            for rank, index in enumerate(pred_scores_argsort[0 : self.at_k]):
-                if is_relevant[index]:
-                    mrr_score = 1 / (rank + 1)
-                    break
-            all_mrr_scores.append(mrr_score)
+        all_query_embs = self.embed_inputs(
+            model,
+            list(query_to_idx),
+            batch_size=self.batch_size,
+            show_progress_bar=self.show_progress_bar,
+            convert_to_tensor=True,
+            truncate_dim=self.truncate_dim,
+        )
+        all_docs_embs = self.embed_inputs(
+            model,
+            list(document_to_idx),
+            batch_size=self.batch_size,
+            show_progress_bar=self.show_progress_bar,
+            convert_to_tensor=True,
+            truncate_dim=self.truncate_dim,
+        )
 
-            # Compute NDCG score
-            all_ndcg_scores.append(ndcg_score([is_relevant], [pred_scores], k=self.at_k))
+        # Compute the scores of all (query, document) pairs in one segmented pass
+        pair_query_ids = torch.from_numpy(np.repeat(query_ids, num_documents)).to(all_query_embs.device)
+        pair_document_ids = torch.from_numpy(document_ids).to(all_docs_embs.device)
+        pairwise_similarity_fct = {
+            cos_sim: pairwise_cos_sim,
+            dot_score: pairwise_dot_score,
+            euclidean_sim: pairwise_euclidean_sim,
+            manhattan_sim: pairwise_manhattan_sim,
+        }.get(self.similarity_fct)
+        pred_scores = []
+        if pairwise_similarity_fct is not None:
+            # Gather the embeddings of the pairs in chunks, to bound the memory usage
+            chunk_size = 16384
+            for start_idx in range(0, len(pair_document_ids), chunk_size):
+                end_idx = start_idx + chunk_size
+                pred_scores.append(
+                    pairwise_similarity_fct(
+                        all_query_embs[pair_query_ids[start_idx:end_idx]],
+                        all_docs_embs[pair_document_ids[start_idx:end_idx]],
+                    )
+                )
+        else:
+            # Custom similarity functions are only known to compute (query, documents) similarity matrices
+            for query_idx, start_idx, end_idx in zip(query_ids, offsets[:-1], offsets[1:]):
+                sample_scores = self.similarity_fct(
+                    all_query_embs[query_idx], all_docs_embs[pair_document_ids[start_idx:end_idx]]
+                )
+                pred_scores.append(sample_scores.reshape(-1))
+        pred_scores = torch.cat(pred_scores).float().cpu().numpy()
 
-            # Compute AP
-            all_ap_scores.append(average_precision_score(is_relevant, pred_scores))
+        all_mrr_scores, all_ndcg_scores, all_ap_scores = ragged_ranking_metrics(
+            pred_scores, is_relevant, offsets, at_k=self.at_k
+        )
 
         mean_ap = np.mean(all_ap_scores)
         mean_mrr = np.mean(all_mrr_scores)
@@ -1,7 +1,16 @@
 from __future__ import annotations
 
 import re
-from typing import TYPE_CHECKING, Any
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Any, Literal
+
+import numpy as np
+import torch
+from torch import Tensor
+
+from sentence_transformers.evaluation.EmbeddingCache import EmbeddingCache
+from sentence_transformers.quantization import quantize_embeddings
+from sentence_transformers.util import truncate_embeddings
 
 if TYPE_CHECKING:
     from sentence_transformers.SentenceTransformer import SentenceTransformer
@@ -65,6 +74,92 @@ class SentenceEvaluator:
             self.primary_metric = name + "_" + self.primary_metric
         return metrics
 
+    def embed_inputs(
+        self,
+        model: SentenceTransformer,
+        sentences: list[str],
+        prompt_name: str | None = None,
+        prompt: str | None = None,
+        batch_size: int = 32,
+        show_progress_bar: bool | None = None,
+        convert_to_tensor: bool = False,
+        precision: Literal["float32", "int8", "uint8", "binary", "ubinary"] | None = None,
+        normalize_embeddings: bool = False,
+        truncate_dim: int | None = None,
+    ) -> np.ndarray | Tensor:
+        """
+        Embeds the sentences like ``model.encode`` inside ``model.truncate_sentence_embeddings(truncate_dim)``.
+
+        If an :class:`~sentence_transformers.evaluation.EmbeddingCache` is active, the full-dimensional embeddings
+        are taken from the cache instead, so sentences are only encoded once during an evaluation, regardless of
+        how many evaluators or truncation dimensions use them.
+
+        Args:
+            model (SentenceTransformer): The model to embed the sentences with.
+            sentences (List[str]): The sentences to embed.
+            prompt_name (Optional[str], optional): The name of the prompt to use for encoding. Defaults to None.
+            prompt (Optional[str], optional): The prompt to use for encoding. Defaults to None.
+            batch_size (int, optional): The batch size for encoding. Defaults to 32.
+            show_progress_bar (Optional[bool], optional): Whether to show a progress bar. Defaults to None.
+            convert_to_tensor (bool, optional): Whether to return a tensor instead of a numpy array. Defaults to False.
+            precision (Optional[Literal["float32", "int8", "uint8", "binary", "ubinary"]], optional): The precision
+                of the embeddings. Defaults to None.
+            normalize_embeddings (bool, optional): Whether to normalize the (truncated) embeddings to unit length.
+                Defaults to False.
+            truncate_dim (Optional[int], optional): The dimension to truncate the embeddings to. `None` uses the
+                model's current truncation dimension. Defaults to None.
+
+        Returns:
+            Union[np.ndarray, Tensor]: The embeddings with shape (len(sentences), embedding_dim).
+        """
+        cache = EmbeddingCache.get_active()
+        if cache is None or not sentences or not all(isinstance(sentence, str) for sentence in sentences):
+            with nullcontext() if truncate_dim is None else model.truncate_sentence_embeddings(truncate_dim):
+                return model.encode(
+                    sentences,
+                    prompt_name=prompt_name,
+                    prompt=prompt,
+                    batch_size=batch_size,
+                    show_progress_bar=show_progress_bar,
+                    convert_to_numpy=not convert_to_tensor,
+                    convert_to_tensor=convert_to_tensor,
+                    precision=precision,
+                    normalize_embeddings=normalize_embeddings,
+                )
+
+        embeddings = cache.encode(
+            model,
+            sentences,
+            prompt_name=prompt_name,
+            prompt=prompt,
+            batch_size=batch_size,
+            show_progress_bar=show_progress_bar,
+        )
+        embeddings = truncate_embeddings(embeddings, model.truncate_dim if truncate_dim is None else truncate_dim)
+        if normalize_embeddings:
+            embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        if precision and precision != "float32":
+            embeddings = quantize_embeddings(embeddings, precision=precision)
+            return torch.from_numpy(embeddings) if convert_to_tensor else embeddings
+        if convert_to_tensor:
+            return embeddings
+        embeddings = embeddings.cpu()
+        if embeddings.dtype == torch.bfloat16:
+            embeddings = embeddings.float()
+        return embeddings.numpy()
+
+    def get_embedding_inputs(self) -> list[dict[str, Any]]:
+        """
+        Returns the inputs that this evaluator embeds with :meth:`embed_inputs`, so an
+        :class:`~sentence_transformers.evaluation.EmbeddingCache` can encode the inputs of several evaluators at once.
+        Each input is a dictionary with a ``sentences`` list, and optionally the ``prompt_name``, ``prompt``,
+        ``batch_size`` and ``show_progress_bar`` that are used to embed them.
+
+        Returns:
+            List[Dict[str, Any]]: The inputs of this evaluator, or an empty list if they are not known in advance.
+        """
+        return []
+
     def store_metrics_in_model_card_data(
         self, model: SentenceTransformer, metrics: dict[str, Any], epoch: int = 0, step: int = 0
     ) -> None:
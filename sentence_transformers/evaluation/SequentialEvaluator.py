@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from collections.abc import Iterable
-from typing import TYPE_CHECKING
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Any
 
+from sentence_transformers.evaluation.EmbeddingCache import EmbeddingCache
 from sentence_transformers.evaluation.SentenceEvaluator import SentenceEvaluator
 
 if TYPE_CHECKING:
@@ -20,6 +22,15 @@ class SequentialEvaluator(SentenceEvaluator):
         evaluators (Iterable[SentenceEvaluator]): A collection of SentenceEvaluator objects.
         main_score_function (function, optional): A function that takes a list of scores and returns the main score.
             Defaults to selecting the last score in the list.
+        cache_embeddings (bool, optional): Whether to share an :class:`~sentence_transformers.evaluation.EmbeddingCache`
+            between the sub-evaluators. The texts of all sub-evaluators are then deduplicated and encoded together
+            once per evaluation, and sub-evaluators that only differ in ``truncate_dim`` score slices of the same
+            full-dimensional embeddings. Supported by the
+            :class:`~sentence_transformers.evaluation.EmbeddingSimilarityEvaluator`,
+            :class:`~sentence_transformers.evaluation.InformationRetrievalEvaluator`,
+            :class:`~sentence_transformers.evaluation.TripletEvaluator`,
+            :class:`~sentence_transformers.evaluation.BinaryClassificationEvaluator` and
+            :class:`~sentence_transformers.evaluation.NanoBEIREvaluator`. Defaults to False.
 
     Example:
         ::
@@ -28,34 +39,54 @@ class SequentialEvaluator(SentenceEvaluator):
             evaluator2 = InformationRetrievalEvaluator(...)
             evaluator3 = MSEEvaluator(...)
             seq_evaluator = SequentialEvaluator([evaluator1, evaluator2, evaluator3])
+
+            # Evaluate a Matryoshka model at several dimensions, while only encoding the texts once
+            matryoshka_evaluator = SequentialEvaluator(
+                [EmbeddingSimilarityEvaluator(..., truncate_dim=dim, name=f"sts_dev_{dim}") for dim in [768, 256, 64]],
+                cache_embeddings=True,
+            )
     """
 
-    def __init__(self, evaluators: Iterable[SentenceEvaluator], main_score_function=lambda scores: scores[-1]):
+    def __init__(
+        self,
+        evaluators: Iterable[SentenceEvaluator],
+        main_score_function=lambda scores: scores[-1],
+        cache_embeddings: bool = False,
+    ):
         super().__init__()
         self.evaluators = evaluators
         self.main_score_function = main_score_function
+        self.cache_embeddings = cache_embeddings
 
     def __call__(
         self, model: SentenceTransformer, output_path: str = None, epoch: int = -1, steps: int = -1
     ) -> dict[str, float]:
         evaluations = []
         scores = []
-        for evaluator_idx, evaluator in enumerate(self.evaluators):
-            evaluation = evaluator(model, output_path, epoch, steps)
-
-            if not isinstance(evaluation, dict):
-                scores.append(evaluation)
-                evaluation = {f"evaluator_{evaluator_idx}": evaluation}
-            else:
-                if hasattr(evaluator, "primary_metric"):
-                    scores.append(evaluation[evaluator.primary_metric])
+        # Reuse the cache of an enclosing evaluator, e.g. a SequentialEvaluator of SequentialEvaluators
+        use_cache = self.cache_embeddings and EmbeddingCache.get_active() is None
+        with EmbeddingCache() if use_cache else nullcontext() as cache:
+            if use_cache:
+                cache.prefetch(model, self.evaluators)
+            for evaluator_idx, evaluator in enumerate(self.evaluators):
+                evaluation = evaluator(model, output_path, epoch, steps)
+
+                if not isinstance(evaluation, dict):
+                    scores.append(evaluation)
+                    evaluation = {f"evaluator_{evaluator_idx}": evaluation}
                 else:
-                    scores.append(evaluation[list(evaluation.keys())[0]])
+                    if hasattr(evaluator, "primary_metric"):
+                        scores.append(evaluation[evaluator.primary_metric])
+                    else:
+                        scores.append(evaluation[list(evaluation.keys())[0]])
 
-            evaluations.append(evaluation)
+                evaluations.append(evaluation)
 
         self.primary_metric = "sequential_score"
         main_score = self.main_score_function(scores)
         results = {key: value for evaluation in evaluations for key, value in evaluation.items()}
         results["sequential_score"] = main_score
         return results
+
+    def get_embedding_inputs(self) -> list[dict[str, Any]]:
+        return [inputs for evaluator in self.evaluators for inputs in evaluator.get_embedding_inputs()]
@@ -3,14 +3,12 @@ from __future__ import annotations
 import csv
 import logging
 import os
-from contextlib import nullcontext
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-import numpy as np
 import torch
 
 from sentence_transformers.evaluation.SentenceEvaluator import SentenceEvaluator
-from sentence_transformers.util import pytorch_cos_sim
+from sentence_transformers.util import nearest_neighbors, pairwise_dot_score
 
 if TYPE_CHECKING:
     from sentence_transformers.SentenceTransformer import SentenceTransformer
@@ -113,53 +111,51 @@ class TranslationEvaluator(SentenceEvaluator):
 
         logger.info(f"Evaluating translation matching Accuracy of the model on the {self.name} dataset{out_txt}:")
 
-        with nullcontext() if self.truncate_dim is None else model.truncate_sentence_embeddings(self.truncate_dim):
-            embeddings1 = torch.stack(
-                model.encode(
-                    self.source_sentences,
-                    show_progress_bar=self.show_progress_bar,
-                    batch_size=self.batch_size,
-                    convert_to_numpy=False,
-                )
-            )
-            embeddings2 = torch.stack(
-                model.encode(
-                    self.target_sentences,
-                    show_progress_bar=self.show_progress_bar,
-                    batch_size=self.batch_size,
-                    convert_to_numpy=False,
-                )
-            )
-
-        cos_sims = pytorch_cos_sim(embeddings1, embeddings2).detach().cpu().numpy()
-
-        correct_src2trg = 0
-        correct_trg2src = 0
-
-        for i in range(len(cos_sims)):
-            max_idx = np.argmax(cos_sims[i])
-
-            if i == max_idx:
-                correct_src2trg += 1
-            elif self.print_wrong_matches:
+        embeddings1 = self.embed_inputs(
+            model,
+            self.source_sentences,
+            batch_size=self.batch_size,
+            show_progress_bar=self.show_progress_bar,
+            convert_to_tensor=True,
+            normalize_embeddings=True,
+            truncate_dim=self.truncate_dim,
+        )
+        embeddings2 = self.embed_inputs(
+            model,
+            self.target_sentences,
+            batch_size=self.batch_size,
+            show_progress_bar=self.show_progress_bar,
+            convert_to_tensor=True,
+            normalize_embeddings=True,
+            truncate_dim=self.truncate_dim,
+        )
+
+        # The embeddings are normalized, so the dot product is the cosine similarity. Rather than computing the full
+        # similarity matrix, both directions are scored in chunks while only keeping a running top-k.
+        top_k = 5 if self.print_wrong_matches else 1
+        src2trg_scores, src2trg_indices = nearest_neighbors(embeddings1, embeddings2, top_k=top_k)
+        _, trg2src_indices = nearest_neighbors(embeddings2, embeddings1, top_k=1)
+        labels = torch.arange(len(embeddings1), device=embeddings1.device)
+        src2trg_correct = src2trg_indices[:, 0] == labels
+        trg2src_correct = trg2src_indices[:, 0] == labels
+
+        if self.print_wrong_matches:
+            true_scores = pairwise_dot_score(embeddings1, embeddings2).tolist()
+            src2trg_scores = src2trg_scores.tolist()
+            src2trg_indices = src2trg_indices.tolist()
+            for i in torch.nonzero(~src2trg_correct).flatten().tolist():
+                max_idx = src2trg_indices[i][0]
                 print("\nIncorrect  : Source", i, "is most similar to target", max_idx, "instead of target", i)
                 print("Source     :", self.source_sentences[i])
-                print("Pred Target:", self.target_sentences[max_idx], f"(Score: {cos_sims[i][max_idx]:.4f})")
-                print("True Target:", self.target_sentences[i], f"(Score: {cos_sims[i][i]:.4f})")
+                print("Pred Target:", self.target_sentences[max_idx], f"(Score: {src2trg_scores[i][0]:.4f})")
+                print("True Target:", self.target_sentences[i], f"(Score: {true_scores[i]:.4f})")
 
-                results = enumerate(cos_sims[i])
-                results = sorted(results, key=lambda x: x[1], reverse=True)
-                for idx, score in results[:5]:
-                    print("\t", idx, f"(Score: {score:.4f})", self.target_sentences[idx])
+                for idx, score in zip(src2trg_indices[i], src2trg_scores[i]):
+                    if idx >= 0:
+                        print("\t", idx, f"(Score: {score:.4f})", self.target_sentences[idx])
 
-        cos_sims = cos_sims.T
-        for i in range(len(cos_sims)):
-            max_idx = np.argmax(cos_sims[i])
-            if i == max_idx:
-                correct_trg2src += 1
-
-        acc_src2trg = correct_src2trg / len(cos_sims)
-        acc_trg2src = correct_trg2src / len(cos_sims)
+        acc_src2trg = src2trg_correct.sum().item() / len(src2trg_correct)
+        acc_trg2src = trg2src_correct.sum().item() / len(trg2src_correct)
 
         logger.info(f"Accuracy src2trg: {acc_src2trg * 100:.2f}")
         logger.info(f"Accuracy trg2src: {acc_trg2src * 100:.2f}")
@@ -183,6 +179,12 @@ class TranslationEvaluator(SentenceEvaluator):
         self.store_metrics_in_model_card_data(model, metrics, epoch, steps)
         return metrics
 
+    def get_embedding_inputs(self) -> list[dict[str, Any]]:
+        return [
+            {"sentences": sentences, "batch_size": self.batch_size, "show_progress_bar": self.show_progress_bar}
+            for sentences in (self.source_sentences, self.target_sentences)
+        ]
+
     def get_config_dict(self):
         config_dict = {}
         if self.truncate_dim is not None:
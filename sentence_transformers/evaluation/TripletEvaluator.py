@@ -3,14 +3,16 @@ from __future__ import annotations
 import csv
 import logging
 import os
-from contextlib import nullcontext
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING, Any, Literal
+
+import torch
+from torch import Tensor
 
 from sentence_transformers.evaluation.SentenceEvaluator import SentenceEvaluator
 from sentence_transformers.readers import InputExample
 from sentence_transformers.similarity_functions import SimilarityFunction
 from sentence_transformers.util import (
-    pairwise_cos_sim,
+    normalize_embeddings,
     pairwise_dot_score,
     pairwise_euclidean_sim,
     pairwise_manhattan_sim,
@@ -175,55 +177,27 @@ class TripletEvaluator(SentenceEvaluator):
 
         logger.info(f"TripletEvaluator: Evaluating the model on the {self.name} dataset{out_txt}:")
 
-        with nullcontext() if self.truncate_dim is None else model.truncate_sentence_embeddings(self.truncate_dim):
-            embeddings_anchors = model.encode(
-                self.anchors,
-                batch_size=self.batch_size,
-                show_progress_bar=self.show_progress_bar,
-                convert_to_numpy=True,
-            )
-            embeddings_positives = model.encode(
-                self.positives,
-                batch_size=self.batch_size,
-                show_progress_bar=self.show_progress_bar,
-                convert_to_numpy=True,
-            )
-            embeddings_negatives = model.encode(
-                self.negatives,
-                batch_size=self.batch_size,
-                show_progress_bar=self.show_progress_bar,
-                convert_to_numpy=True,
-            )
-
         if not self.similarity_fn_names:
             self.similarity_fn_names = [model.similarity_fn_name]
             self._append_csv_headers(self.similarity_fn_names)
 
-        similarity_functions = {
-            "cosine": lambda anchors, positives, negatives: (
-                pairwise_cos_sim(anchors, positives),
-                pairwise_cos_sim(anchors, negatives),
-            ),
-            "dot": lambda anchors, positives, negatives: (
-                pairwise_dot_score(anchors, positives),
-                pairwise_dot_score(anchors, negatives),
-            ),
-            "manhattan": lambda anchors, positives, negatives: (
-                pairwise_manhattan_sim(anchors, positives),
-                pairwise_manhattan_sim(anchors, negatives),
-            ),
-            "euclidean": lambda anchors, positives, negatives: (
-                pairwise_euclidean_sim(anchors, positives),
-                pairwise_euclidean_sim(anchors, negatives),
-            ),
+        embeddings, anchor_indices, candidate_indices = self.embed_triplets(model)
+        # Cosine similarity is the dot product of the normalized embeddings, which are normalized only once
+        pairwise_functions = {
+            "cosine": pairwise_dot_score,
+            "dot": pairwise_dot_score,
+            "manhattan": pairwise_manhattan_sim,
+            "euclidean": pairwise_euclidean_sim,
         }
+        normalized_embeddings = normalize_embeddings(embeddings) if "cosine" in self.similarity_fn_names else None
 
         metrics = {}
         for fn_name in self.similarity_fn_names:
-            if fn_name in similarity_functions:
-                positive_scores, negative_scores = similarity_functions[fn_name](
-                    embeddings_anchors, embeddings_positives, embeddings_negatives
-                )
+            if fn_name in pairwise_functions:
+                fn_embeddings = normalized_embeddings if fn_name == "cosine" else embeddings
+                # Score every anchor against its positive and its negative at once
+                scores = pairwise_functions[fn_name](fn_embeddings[anchor_indices], fn_embeddings[candidate_indices])
+                positive_scores, negative_scores = scores.view(2, -1)
                 accuracy = (positive_scores > negative_scores + self.margin[fn_name]).float().mean().item()
                 metrics[f"{fn_name}_accuracy"] = accuracy
                 logger.info(f"Accuracy {fn_name.capitalize()} Similarity:\t{accuracy:.2%}")
@@ -261,6 +235,49 @@ class TripletEvaluator(SentenceEvaluator):
         self.store_metrics_in_model_card_data(model, metrics, epoch, steps)
         return metrics
 
+    def embed_triplets(self, model: SentenceTransformer) -> tuple[Tensor, Tensor, Tensor]:
+        """
+        Embeds the anchors, positives and negatives with a single (length-sorted) encode. Texts that occur several
+        times, in any of the three columns, are only encoded once.
+
+        Args:
+            model (SentenceTransformer): The model to embed the texts with.
+
+        Returns:
+            Tuple[Tensor, Tensor, Tensor]: The embeddings of the unique texts, the indices of the anchors in these
+            embeddings repeated twice, and the indices of the positives followed by the indices of the negatives.
+        """
+        # The texts may also be e.g. tuples or dataset columns, which don't concatenate like lists
+        texts = list(self.anchors) + list(self.positives) + list(self.negatives)
+        num_triplets = len(self.anchors)
+        try:
+            # If the texts are hashable, then we can deduplicate them across all columns
+            unique_texts = list(dict.fromkeys(texts))
+        except TypeError:
+            # Otherwise we just embed everything, e.g. if the texts are images for evaluating a CLIP model
+            unique_texts = texts
+            indices = torch.arange(len(texts))
+        else:
+            text_to_idx = {text: idx for idx, text in enumerate(unique_texts)}
+            indices = torch.tensor([text_to_idx[text] for text in texts], dtype=torch.long)
+
+        embeddings = self.embed_inputs(
+            model,
+            unique_texts,
+            batch_size=self.batch_size,
+            show_progress_bar=self.show_progress_bar,
+            convert_to_tensor=True,
+            truncate_dim=self.truncate_dim,
+        )
+        indices = indices.to(embeddings.device)
+        return embeddings, indices[:num_triplets].repeat(2), indices[num_triplets:]
+
+    def get_embedding_inputs(self) -> list[dict[str, Any]]:
+        return [
+            {"sentences": sentences, "batch_size": self.batch_size, "show_progress_bar": self.show_progress_bar}
+            for sentences in (self.anchors, self.positives, self.negatives)
+        ]
+
     def get_config_dict(self):
         config_dict = {}
         if self.margin != {"cosine": 0, "dot": 0, "manhattan": 0, "euclidean": 0}:
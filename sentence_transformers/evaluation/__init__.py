@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from .BinaryClassificationEvaluator import BinaryClassificationEvaluator
+from .EmbeddingCache import EmbeddingCache
 from .EmbeddingSimilarityEvaluator import EmbeddingSimilarityEvaluator
 from .InformationRetrievalEvaluator import InformationRetrievalEvaluator
 from .LabelAccuracyEvaluator import LabelAccuracyEvaluator
@@ -19,6 +20,7 @@ __all__ = [
     "SentenceEvaluator",
     "SimilarityFunction",
     "BinaryClassificationEvaluator",
+    "EmbeddingCache",
     "EmbeddingSimilarityEvaluator",
     "InformationRetrievalEvaluator",
     "LabelAccuracyEvaluator",
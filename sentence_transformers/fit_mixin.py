@@ -50,6 +50,8 @@ class SaveModelCallback(TrainerCallback):
         according to the evaluator.
     2. If evaluator is not defined:
         We save after the model has been trained.
+
+    With asynchronous evaluation, the evaluated snapshot of the model is saved rather than the current model.
     """
 
     def __init__(self, output_dir: str, evaluator: SentenceEvaluator | None, save_best_model: bool) -> None:
@@ -71,6 +73,7 @@ class SaveModelCallback(TrainerCallback):
         control: TrainerControl,
         metrics: dict[str, Any],
         model: SentenceTransformer,
+        evaluated_model: SentenceTransformer | None = None,
         **kwargs,
     ) -> None:
         if self.evaluator is not None and self.save_best_model:
@@ -79,7 +82,7 @@ class SaveModelCallback(TrainerCallback):
                 if key.endswith(metric_key):
                     if self.best_metric is None or self.is_better(value):
                         self.best_metric = value
-                        model.save(self.output_dir)
+                        (model if evaluated_model is None else evaluated_model).save(self.output_dir)
 
     def on_train_end(
         self,
@@ -119,6 +122,10 @@ class EvaluatorCallback(TrainerCallback):
         model: SentenceTransformer,
         **kwargs,
     ) -> None:
+        if self.trainer is not None and self.trainer.args.async_evaluation:
+            self.trainer._submit_async_evaluation(self.evaluator, self.output_path, self.metric_key_prefix)
+            return
+
         evaluator_metrics = self.evaluator(
             model, output_path=self.output_path, epoch=state.epoch, steps=state.global_step
         )
@@ -184,6 +191,7 @@ class FitMixin:
         checkpoint_save_steps: int = 500,
         checkpoint_save_total_limit: int = 0,
         resume_from_checkpoint: bool = False,
+        async_evaluation: bool = False,
     ) -> None:
         """
         Deprecated training method from before Sentence Transformers v3.0, it is recommended to use
@@ -241,6 +249,10 @@ class FitMixin:
                 store
             resume_from_checkpoint: If true, searches for checkpoints
                 to continue training from.
+            async_evaluation: If true, the evaluator runs on a CPU
+                snapshot of the model in a background process, so the
+                training continues during the evaluation. Requires a
+                picklable evaluator.
         """
         if not is_datasets_available():
             raise ImportError("Please install `datasets` to use this function: `pip install datasets`.")
@@ -336,6 +348,7 @@ class FitMixin:
             save_strategy="steps" if checkpoint_path is not None else "no",
             save_steps=checkpoint_save_steps,
             save_total_limit=checkpoint_save_total_limit,
+            async_evaluation=async_evaluation,
         )
 
         if steps_per_epoch is None or steps_per_epoch == 0:
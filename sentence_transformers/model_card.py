@@ -514,8 +514,10 @@ class SentenceTransformerModelCardData(CardData):
 
             training_log_metrics = {key: value for key, value in metrics.items() if key in primary_metrics}
 
-            if self.training_logs and self.training_logs[-1]["Step"] == step:
-                self.training_logs[-1].update(training_log_metrics)
+            # Asynchronous evaluations may finish after later steps were already logged
+            step_logs = next((logs for logs in reversed(self.training_logs) if logs["Step"] == step), None)
+            if step_logs is not None:
+                step_logs.update(training_log_metrics)
             else:
                 self.training_logs.append(
                     {
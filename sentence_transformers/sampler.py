@@ -7,12 +7,15 @@ from collections.abc import Iterator
 from itertools import accumulate, cycle
 from typing import Any
 
+import numpy as np
 import torch
 from torch.utils.data import BatchSampler, ConcatDataset, SubsetRandomSampler
 
 from sentence_transformers.util import is_datasets_available
 
 if is_datasets_available():
+    import pyarrow as pa
+    import pyarrow.compute as pc
     from datasets import Dataset
 
 logger = logging.getLogger(__name__)
@@ -200,46 +203,103 @@ class NoDuplicatesBatchSampler(DefaultBatchSampler):
         if label_columns := set(dataset.column_names) & set(self.valid_label_columns or []):
             dataset = dataset.remove_columns(list(label_columns))
         self.dataset = dataset
+        self._value_ids = None
+
+    def _compute_value_ids(self) -> np.ndarray:
+        """
+        Maps every value in the dataset to an integer id, such that two values get the same id if and only if their
+        string representations are equal. String and integer columns are mapped per Arrow chunk with dictionary
+        encoding, so only their unique values are converted to Python strings.
+
+        Returns:
+            np.ndarray: The value ids with shape (num_rows, num_columns).
+        """
+        columns = [
+            column
+            for column in self.dataset.column_names
+            if not column.endswith("_prompt_length") and column != "dataset_name"
+        ]
+        table = self.dataset.select_columns(columns).with_format("arrow")[:]
+        value_to_id = {}
+        value_ids = np.empty((len(self.dataset), len(columns)), dtype=np.int64)
+        for column_idx, column in enumerate(columns):
+            array = table.column(column)
+            if (
+                pa.types.is_string(array.type)
+                or pa.types.is_large_string(array.type)
+                or pa.types.is_integer(array.type)
+            ):
+                offset = 0
+                for chunk in array.chunks:
+                    # Casting integers to strings matches str(value), and missing values are represented by "None"
+                    chunk = pc.fill_null(pc.cast(chunk, pa.large_string()), "None")
+                    encoded = pc.dictionary_encode(chunk)
+                    dictionary_ids = np.array(
+                        [value_to_id.setdefault(value, len(value_to_id)) for value in encoded.dictionary.to_pylist()],
+                        dtype=np.int64,
+                    )
+                    indices = encoded.indices.to_numpy(zero_copy_only=False)
+                    value_ids[offset : offset + len(chunk), column_idx] = dictionary_ids[indices]
+                    offset += len(chunk)
+            else:
+                value_ids[:, column_idx] = [
+                    value_to_id.setdefault(str(value), len(value_to_id)) for value in self.dataset[column]
+                ]
+        return value_ids
 
     def __iter__(self) -> Iterator[list[int]]:
         """
         Iterate over the remaining non-yielded indices. For each index, check if the sample values are already in the
         batch. If not, add the sample values to the batch keep going until the batch is full. If the batch is full, yield
         the batch indices and continue with the next batch.
+
+        The values of every sample are compared via integer ids, which are computed once for the whole dataset.
+        Rather than scanning all remaining indices from the start for every batch, only the indices that were skipped
+        by earlier batches are scanned again, followed by the indices that were not scanned yet.
         """
         if self.generator and self.seed is not None:
             self.generator.manual_seed(self.seed + self.epoch)
 
-        # We create a dictionary to None because we need a data structure that:
-        # 1. Allows for cheap removal of elements
-        # 2. Preserves the order of elements, i.e. remains random
-        remaining_indices = dict.fromkeys(torch.randperm(len(self.dataset), generator=self.generator).tolist())
-        while remaining_indices:
+        if self._value_ids is None:
+            self._value_ids = self._compute_value_ids()
+
+        indices = torch.randperm(len(self.dataset), generator=self.generator).numpy()
+        # The remaining indices are the skipped indices, followed by the unscanned indices[next_position:], both
+        # in the order of the permutation
+        skipped_indices = []
+        next_position = 0
+        while skipped_indices or next_position < len(indices):
             batch_values = set()
             batch_indices = []
-            for index in remaining_indices:
-                sample_values = {
-                    str(value)
-                    for key, value in self.dataset[index].items()
-                    if not key.endswith("_prompt_length") and key != "dataset_name"
-                }
+            still_skipped_indices = []
+            is_full = False
+            for index in skipped_indices:
+                if is_full:
+                    still_skipped_indices.append(index)
+                    continue
+                sample_values = set(self._value_ids[index].tolist())
                 if sample_values & batch_values:
+                    still_skipped_indices.append(index)
                     continue
-
                 batch_indices.append(index)
-                if len(batch_indices) == self.batch_size:
-                    yield batch_indices
-                    break
-
+                is_full = len(batch_indices) == self.batch_size
                 batch_values.update(sample_values)
 
-            else:
-                # NOTE: some indices might still have been ignored here
-                if not self.drop_last:
-                    yield batch_indices
+            while not is_full and next_position < len(indices):
+                index = int(indices[next_position])
+                next_position += 1
+                sample_values = set(self._value_ids[index].tolist())
+                if sample_values & batch_values:
+                    still_skipped_indices.append(index)
+                    continue
+                batch_indices.append(index)
+                is_full = len(batch_indices) == self.batch_size
+                batch_values.update(sample_values)
 
-            for index in batch_indices:
-                del remaining_indices[index]
+            skipped_indices = still_skipped_indices
+            # NOTE: some indices might still have been ignored in an incomplete batch
+            if is_full or not self.drop_last:
+                yield batch_indices
 
     def __len__(self) -> int:
         if self.drop_last:
@@ -248,6 +308,107 @@ class NoDuplicatesBatchSampler(DefaultBatchSampler):
             return (len(self.dataset) + self.batch_size - 1) // self.batch_size
 
 
+class TokenBudgetBatchSampler(DefaultBatchSampler):
+    def __init__(
+        self,
+        dataset: Dataset,
+        batch_size: int,
+        drop_last: bool,
+        valid_label_columns: list[str] | None = None,
+        generator: torch.Generator | None = None,
+        seed: int = 0,
+        max_tokens_per_batch: int = 16384,
+    ) -> None:
+        """
+        This sampler creates random batches that fit in a budget of (padded) tokens, rather than batches with a fixed
+        number of samples. A batch of ``n`` samples costs ``n`` times the sum over the text columns of the longest
+        sequence in that column, i.e. the number of tokens after padding. Samples are added to a batch in a random
+        order until the next sample would exceed ``max_tokens_per_batch`` or the batch holds ``batch_size`` samples.
+        Batches of short texts therefore hold more samples than batches of long texts, while the memory usage of
+        every training step is bounded.
+
+        The sampler requires a dataset that was pre-tokenized with
+        :meth:`SentenceTransformerDataCollator.pretokenize_dataset <sentence_transformers.data_collator.SentenceTransformerDataCollator.pretokenize_dataset>`,
+        as it uses the ``{column}_length`` columns. As it is not a :class:`~sentence_transformers.training_args.BatchSamplers`
+        option, pass it to the training arguments with e.g.
+        ``batch_sampler=functools.partial(TokenBudgetBatchSampler, max_tokens_per_batch=32768)``.
+
+        Args:
+            dataset (Dataset): The pre-tokenized dataset to sample from.
+            batch_size (int): The maximum number of samples per batch.
+            drop_last (bool): If True, drop the last batch, which is usually incomplete.
+            valid_label_columns (List[str], optional): List of column names to check for labels.
+                The first column name from ``valid_label_columns`` found in the dataset will
+                be used as the label column.
+            generator (torch.Generator, optional): Optional random number generator for shuffling
+                the indices.
+            seed (int): Seed for the random number generator to ensure reproducibility. Defaults to 0.
+            max_tokens_per_batch (int): The maximum number of (padded) tokens per batch. A sample that exceeds the
+                budget on its own is put in a batch by itself. Defaults to 16384.
+        """
+        super().__init__(
+            dataset,
+            batch_size=batch_size,
+            drop_last=drop_last,
+            valid_label_columns=valid_label_columns,
+            generator=generator,
+            seed=seed,
+        )
+        self.dataset = dataset
+        self.max_tokens_per_batch = max_tokens_per_batch
+
+        length_columns = [
+            column_name
+            for column_name in dataset.column_names
+            if column_name.endswith("_length")
+            and f"{column_name[: -len('_length')]}_input_ids" in dataset.column_names
+        ]
+        if not length_columns:
+            raise ValueError(
+                "The `TokenBudgetBatchSampler` requires a dataset that was pre-tokenized with "
+                "`SentenceTransformerDataCollator.pretokenize_dataset`, but the dataset has no `{column}_length` "
+                f"columns. It only has these columns: {dataset.column_names}."
+            )
+        self.lengths = np.stack(
+            [np.asarray(dataset[column_name], dtype=np.int64) for column_name in length_columns], 1
+        )
+        self._batches = None
+
+    def _compute_batches(self) -> list[list[int]]:
+        if self.generator and self.seed is not None:
+            self.generator.manual_seed(self.seed + self.epoch)
+
+        batches = []
+        batch_indices = []
+        max_lengths = np.zeros(self.lengths.shape[1], dtype=np.int64)
+        for index in torch.randperm(len(self.dataset), generator=self.generator).tolist():
+            new_max_lengths = np.maximum(max_lengths, self.lengths[index])
+            if batch_indices and (
+                len(batch_indices) == self.batch_size
+                or (len(batch_indices) + 1) * int(new_max_lengths.sum()) > self.max_tokens_per_batch
+            ):
+                batches.append(batch_indices)
+                batch_indices = []
+                new_max_lengths = self.lengths[index]
+            batch_indices.append(index)
+            max_lengths = new_max_lengths
+
+        if batch_indices and not self.drop_last:
+            batches.append(batch_indices)
+        return batches
+
+    def __iter__(self) -> Iterator[list[int]]:
+        # The batches of an epoch are computed at most once, as __len__ also needs them
+        if self._batches is None or self._batches[0] != self.epoch:
+            self._batches = (self.epoch, self._compute_batches())
+        yield from self._batches[1]
+
+    def __len__(self) -> int:
+        if self._batches is None or self._batches[0] != self.epoch:
+            self._batches = (self.epoch, self._compute_batches())
+        return len(self._batches[1])
+
+
 class MultiDatasetDefaultBatchSampler(SetEpochMixin, BatchSampler, ABC):
     """
     Abstract base batch sampler that yields batches from multiple batch samplers.
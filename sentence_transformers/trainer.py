@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import copy
 import inspect
 import logging
 import os
+import pickle
 from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
 from contextlib import nullcontext
 from functools import partial
 from typing import TYPE_CHECKING, Any, Callable
@@ -12,12 +15,12 @@ import torch
 from packaging.version import parse as parse_version
 from torch import nn
 from torch.utils.data import BatchSampler, ConcatDataset, DataLoader, RandomSampler
-from transformers import EvalPrediction, PreTrainedTokenizerBase, Trainer, TrainerCallback
+from transformers import EvalPrediction, PreTrainedTokenizerBase, Trainer, TrainerCallback, TrainerState
 from transformers import __version__ as transformers_version
 from transformers.data.data_collator import DataCollator
 from transformers.integrations import WandbCallback
-from transformers.trainer import TRAINING_ARGS_NAME
-from transformers.trainer_utils import EvalLoopOutput
+from transformers.trainer import TRAINER_STATE_NAME, TRAINING_ARGS_NAME
+from transformers.trainer_utils import PREFIX_CHECKPOINT_DIR, EvalLoopOutput
 
 from sentence_transformers.data_collator import SentenceTransformerDataCollator
 from sentence_transformers.evaluation import SentenceEvaluator, SequentialEvaluator
@@ -48,6 +51,33 @@ if TYPE_CHECKING:
     from sentence_transformers.SentenceTransformer import SentenceTransformer
 
 
+def _flatten_evaluators(evaluator: SentenceEvaluator) -> list[SentenceEvaluator]:
+    """Returns the evaluator followed by all of its (nested) sub-evaluators, in a deterministic order."""
+    evaluators = [evaluator]
+    for sub_evaluator in getattr(evaluator, "evaluators", []):
+        evaluators.extend(_flatten_evaluators(sub_evaluator))
+    return evaluators
+
+
+def _evaluate_snapshot(
+    evaluator: SentenceEvaluator, model: SentenceTransformer, output_path: str | None, epoch: float, steps: int
+) -> tuple[dict[str, float] | float, list[tuple[int, dict[str, Any], str | None]]]:
+    """
+    Runs the evaluator on a model snapshot in a background process, see ``args.async_evaluation``. Besides the
+    metrics, it returns the metrics and primary metric names that the (sub-)evaluators stored in the model card data of
+    the snapshot, keyed by their position in :func:`_flatten_evaluators`, so the trainer can store them in the model
+    card data of the model.
+    """
+    metrics = evaluator(model, output_path=output_path, epoch=epoch, steps=steps)
+    positions = {id(sub_evaluator): idx for idx, sub_evaluator in enumerate(_flatten_evaluators(evaluator))}
+    model_card_metrics = [
+        (positions[id(sub_evaluator)], sub_metrics, getattr(sub_evaluator, "primary_metric", None))
+        for sub_evaluator, sub_metrics in model.model_card_data.eval_results_dict.items()
+        if id(sub_evaluator) in positions
+    ]
+    return metrics, model_card_metrics
+
+
 class SentenceTransformerTrainer(Trainer):
     """
     SentenceTransformerTrainer is a simple but feature-complete training and eval loop for PyTorch
@@ -188,7 +218,12 @@ class SentenceTransformerTrainer(Trainer):
             tokenizer = model.tokenizer
 
         if data_collator is None:
-            data_collator = SentenceTransformerDataCollator(tokenize_fn=model.tokenize)
+            # The padding settings are only used for datasets that were pre-tokenized with the data collator
+            data_collator = SentenceTransformerDataCollator(
+                tokenize_fn=model.tokenize,
+                pad_token_id=getattr(tokenizer, "pad_token_id", None),
+                padding_side=getattr(tokenizer, "padding_side", "right"),
+            )
 
         for dataset_name, dataset in zip(["train", "eval"], [train_dataset, eval_dataset]):
             if isinstance(dataset, IterableDataset) and dataset.column_names is None:
@@ -284,6 +319,11 @@ class SentenceTransformerTrainer(Trainer):
             evaluator = SequentialEvaluator(evaluator)
         self.evaluator = evaluator
 
+        self._async_executor: ProcessPoolExecutor | None = None
+        self._async_evaluations: list[tuple[Future, SentenceEvaluator, SentenceTransformer, float, int, str]] = []
+        if args.async_evaluation:
+            self._validate_async_evaluation()
+
         if self.train_dataset is not None:
             self.train_dataset = self.maybe_add_prompts_or_dataset_name_column(
                 train_dataset, args.prompts, dataset_name="train"
@@ -491,11 +531,17 @@ class SentenceTransformerTrainer(Trainer):
             else:
                 return output
 
+        output_path = self.args.output_dir
+        if output_path is not None:
+            output_path = os.path.join(output_path, "eval")
+            os.makedirs(output_path, exist_ok=True)
+
+        # The evaluator metrics are reported once the asynchronous evaluation finishes
+        if self.args.async_evaluation and self.is_in_train:
+            self._submit_async_evaluation(self.evaluator, output_path, metric_key_prefix)
+            return output
+
         with nullcontext() if self.is_local_process_zero() else disable_logging(logging.INFO):
-            output_path = self.args.output_dir
-            if output_path is not None:
-                output_path = os.path.join(output_path, "eval")
-                os.makedirs(output_path, exist_ok=True)
             evaluator_metrics = self.evaluator(
                 self.model, output_path=output_path, epoch=self.state.epoch, steps=self.state.global_step
             )
@@ -511,6 +557,200 @@ class SentenceTransformerTrainer(Trainer):
 
         return output
 
+    def _validate_async_evaluation(self) -> None:
+        if self.args.world_size > 1:
+            raise ValueError("`async_evaluation=True` is not supported with multi-process training.")
+        if self.args.save_strategy == "best":
+            raise ValueError(
+                "`async_evaluation=True` is not supported with `save_strategy='best'`, as whether to save a "
+                "checkpoint can only be determined once its asynchronous evaluation has finished."
+            )
+        if self.args.load_best_model_at_end and not hasattr(Trainer, "_determine_best_metric"):
+            raise ValueError(
+                "`async_evaluation=True` with `load_best_model_at_end=True` requires a more recent version of "
+                "transformers. Please update transformers with `pip install -U transformers`."
+            )
+        if self.evaluator is not None:
+            try:
+                pickle.dumps(self.evaluator)
+            except Exception as exc:
+                raise ValueError(
+                    "`async_evaluation=True` requires a picklable evaluator, as it is sent to a background process. "
+                    "Avoid e.g. lambda functions as score functions."
+                ) from exc
+
+    def _snapshot_model(self) -> SentenceTransformer:
+        """
+        Returns a copy of the model with all parameters and buffers detached and copied to the CPU, such that it is
+        unaffected by further training. The copy gets empty model card data, which does not reference the trainer.
+        """
+        model_card_data = self.model.model_card_data
+        memo = {id(model_card_data): type(model_card_data)()}
+        for parameter in self.model.parameters():
+            memo[id(parameter)] = nn.Parameter(parameter.detach().to("cpu", copy=True), requires_grad=False)
+        for buffer in self.model.buffers():
+            memo[id(buffer)] = buffer.detach().to("cpu", copy=True)
+        return copy.deepcopy(self.model, memo)
+
+    def _submit_async_evaluation(
+        self, evaluator: SentenceEvaluator, output_path: str | None, metric_key_prefix: str = "eval"
+    ) -> None:
+        """Starts evaluating a snapshot of the current model in a background process."""
+        if self._async_executor is None:
+            self._async_executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=torch.multiprocessing.get_context("spawn")
+            )
+        # Keep at most one evaluation waiting for the running one, to bound the memory used by the snapshots
+        if len(self._async_evaluations) >= 2:
+            logger.warning("The asynchronous evaluations are falling behind, waiting for the oldest one to finish.")
+            self._process_async_evaluation(*self._async_evaluations.pop(0))
+
+        epoch, steps = self.state.epoch, self.state.global_step
+        snapshot = self._snapshot_model()
+        future = self._async_executor.submit(_evaluate_snapshot, evaluator, snapshot, output_path, epoch, steps)
+        self._async_evaluations.append((future, evaluator, snapshot, epoch, steps, metric_key_prefix))
+        logger.info(f"Started the asynchronous evaluation of step {steps}.")
+
+    def _collect_async_evaluations(self, wait: bool = False) -> None:
+        """Reports the finished asynchronous evaluations in order, or all of them if ``wait`` is True."""
+        while self._async_evaluations and (wait or self._async_evaluations[0][0].done()):
+            self._process_async_evaluation(*self._async_evaluations.pop(0))
+
+    def _process_async_evaluation(
+        self,
+        future: Future,
+        evaluator: SentenceEvaluator,
+        snapshot: SentenceTransformer,
+        epoch: float,
+        steps: int,
+        metric_key_prefix: str,
+    ) -> None:
+        try:
+            evaluator_metrics, model_card_metrics = future.result()
+        except Exception as exc:
+            logger.error(f"The asynchronous evaluation of step {steps} failed. Error: {str(exc)}")
+            return
+
+        # The (sub-)evaluators stored their metrics in the model card data of the snapshot, not of the model
+        evaluators = _flatten_evaluators(evaluator)
+        for position, metrics, primary_metric in model_card_metrics:
+            # Evaluators typically only set their (prefixed) primary metric when they are called
+            if primary_metric is not None:
+                evaluators[position].primary_metric = primary_metric
+            evaluators[position].store_metrics_in_model_card_data(self.model, metrics, epoch, steps)
+
+        if not isinstance(evaluator_metrics, dict):
+            evaluator_metrics = {"evaluator": evaluator_metrics}
+        for key in list(evaluator_metrics.keys()):
+            if not key.startswith(f"{metric_key_prefix}_"):
+                evaluator_metrics[f"{metric_key_prefix}_{key}"] = evaluator_metrics.pop(key)
+        logger.info(f"Finished the asynchronous evaluation of step {steps}.")
+
+        # Track the best model like `_determine_best_metric`, but for the step that was evaluated
+        metric_to_check = self.args.metric_for_best_model
+        if metric_to_check is not None and not metric_to_check.startswith("eval_"):
+            metric_to_check = f"eval_{metric_to_check}"
+        if metric_to_check in evaluator_metrics:
+            metric_value = evaluator_metrics[metric_to_check]
+            best_metric = self.state.best_metric
+            if (
+                best_metric is None
+                or (self.args.greater_is_better and metric_value > best_metric)
+                or (not self.args.greater_is_better and metric_value < best_metric)
+            ):
+                self.state.best_metric = metric_value
+                if hasattr(self.state, "best_global_step"):
+                    self.state.best_global_step = steps
+                checkpoint_dir = os.path.join(self.args.output_dir, f"{PREFIX_CHECKPOINT_DIR}-{steps}")
+                if os.path.exists(checkpoint_dir):
+                    self.state.best_model_checkpoint = checkpoint_dir
+
+        self._log_async_evaluation(evaluator_metrics, epoch, steps)
+        # Callbacks can use the `evaluated_model` keyword argument to e.g. save the snapshot that was evaluated
+        snapshot.model_card_data = self.model.model_card_data
+        self.control = self.callback_handler.call_event(
+            "on_evaluate", self.args, self.state, self.control, metrics=evaluator_metrics, evaluated_model=snapshot
+        )
+
+    def _log_async_evaluation(self, metrics: dict[str, float], epoch: float, steps: int) -> None:
+        """
+        Logs the metrics of an asynchronous evaluation at the step that was evaluated rather than at the current step,
+        and adds them to the trainer states of the checkpoints that were saved before the evaluation finished.
+        """
+        logs = {**metrics, "epoch": epoch} if epoch is not None else dict(metrics)
+        log_entry = {**logs, "step": steps}
+        self.state.log_history.append(log_entry)
+
+        # The reporting callbacks (e.g. W&B, TensorBoard) log at `state.global_step`
+        global_step, current_epoch = self.state.global_step, self.state.epoch
+        self.state.global_step, self.state.epoch = steps, epoch
+        try:
+            self.control = self.callback_handler.on_log(self.args, self.state, self.control, logs)
+        finally:
+            self.state.global_step, self.state.epoch = global_step, current_epoch
+
+        if not self.args.should_save or not os.path.isdir(self.args.output_dir):
+            return
+        for checkpoint in os.listdir(self.args.output_dir):
+            checkpoint_step = checkpoint[len(PREFIX_CHECKPOINT_DIR) + 1 :]
+            state_path = os.path.join(self.args.output_dir, checkpoint, TRAINER_STATE_NAME)
+            if (
+                not checkpoint.startswith(f"{PREFIX_CHECKPOINT_DIR}-")
+                or not checkpoint_step.isdigit()
+                or int(checkpoint_step) < steps
+                or not os.path.isfile(state_path)
+            ):
+                continue
+            checkpoint_state = TrainerState.load_from_json(state_path)
+            checkpoint_state.log_history.append(log_entry)
+            checkpoint_state.best_metric = self.state.best_metric
+            checkpoint_state.best_model_checkpoint = self.state.best_model_checkpoint
+            if hasattr(self.state, "best_global_step"):
+                checkpoint_state.best_global_step = self.state.best_global_step
+            checkpoint_state.save_to_json(state_path)
+
+    def _determine_best_metric(self, metrics: dict[str, float], trial) -> bool:
+        # With asynchronous evaluation, the evaluator metrics are not available yet when the checkpoint is saved,
+        # so the best metric is updated once the evaluation finishes instead
+        if self.args.async_evaluation and self.args.metric_for_best_model is not None:
+            metric_to_check = self.args.metric_for_best_model
+            if not metric_to_check.startswith("eval_"):
+                metric_to_check = f"eval_{metric_to_check}"
+            if metric_to_check not in metrics:
+                return False
+        return super()._determine_best_metric(metrics, trial)
+
+    def _maybe_log_save_evaluate(self, *args, **kwargs):
+        output = super()._maybe_log_save_evaluate(*args, **kwargs)
+        if self._async_evaluations:
+            # Wait for all evaluations once the training stops, so the best model is known before it's loaded
+            self._collect_async_evaluations(
+                wait=self.control.should_training_stop or self.state.global_step >= self.state.max_steps
+            )
+        return output
+
+    def _sorted_checkpoints(self, *args, **kwargs) -> list[str]:
+        checkpoints = super()._sorted_checkpoints(*args, **kwargs)
+        # A checkpoint that is still being evaluated may become the best checkpoint, so it is left out of the
+        # checkpoint rotation until its evaluation has finished
+        if self._async_evaluations and self.args.metric_for_best_model is not None:
+            pending_checkpoints = {
+                f"{PREFIX_CHECKPOINT_DIR}-{steps}" for _, _, _, _, steps, _ in self._async_evaluations
+            }
+            checkpoints = [
+                checkpoint for checkpoint in checkpoints if os.path.basename(checkpoint) not in pending_checkpoints
+            ]
+        return checkpoints
+
+    def train(self, *args, **kwargs):
+        try:
+            return super().train(*args, **kwargs)
+        finally:
+            if self._async_executor is not None:
+                self._async_executor.shutdown(wait=False, cancel_futures=True)
+                self._async_executor = None
+                self._async_evaluations = []
+
     def _load_best_model(self) -> None:
         # Attempt to load the model from self.state.best_model_checkpoint
         logger.info(f"Loading best model from {self.state.best_model_checkpoint} (score: {self.state.best_metric}).")
@@ -179,6 +179,13 @@ class SentenceTransformerTrainingArguments(TransformersTrainingArguments):
         multi_dataset_batch_sampler (Union[:class:`~sentence_transformers.training_args.MultiDatasetBatchSamplers`, `str`, :class:`~sentence_transformers.sampler.MultiDatasetDefaultBatchSampler`, Callable[[...], :class:`~sentence_transformers.sampler.MultiDatasetDefaultBatchSampler`]], *optional*):
             The multi-dataset batch sampler to use. See :class:`~sentence_transformers.training_args.MultiDatasetBatchSamplers`
             for valid options. Defaults to ``MultiDatasetBatchSamplers.PROPORTIONAL``.
+        async_evaluation (`bool`, *optional*):
+            Whether to run the evaluator during training on a detached CPU snapshot of the model in a background
+            process, rather than pausing the training until the evaluation is done. The evaluator metrics are logged,
+            passed to the callbacks and used to track the best model once the evaluation finishes. Until then, the
+            checkpoint of the evaluated step is not deleted by ``save_total_limit``. The evaluator must be picklable,
+            and the training script must be guarded with ``if __name__ == "__main__":``.
+            Not supported with multi-process (e.g. DDP) training. Defaults to ``False``.
     """
 
     prompts: Optional[str] = field(  # noqa: UP007
@@ -195,6 +202,13 @@ class SentenceTransformerTrainingArguments(TransformersTrainingArguments):
     multi_dataset_batch_sampler: Union[MultiDatasetBatchSamplers, str] = field(  # noqa: UP007
         default=MultiDatasetBatchSamplers.PROPORTIONAL, metadata={"help": "The multi-dataset batch sampler to use."}
     )
+    async_evaluation: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to run the evaluator on a CPU snapshot of the model in a background process, "
+            "so the training does not pause during evaluation."
+        },
+    )
 
     def __post_init__(self):
         super().__post_init__()
@@ -9,6 +9,7 @@ import os
 import queue
 import random
 import sys
+import weakref
 from contextlib import contextmanager
 from importlib.metadata import PackageNotFoundError, metadata
 from pathlib import Path
@@ -17,7 +18,7 @@ from typing import TYPE_CHECKING, Any, Callable, Literal, overload
 import numpy as np
 import requests
 import torch
-from huggingface_hub import hf_hub_download, snapshot_download
+from huggingface_hub import dataset_info, hf_hub_download, snapshot_download
 from torch import Tensor, device
 from tqdm import trange
 from tqdm.autonotebook import tqdm
@@ -316,6 +317,58 @@ def truncate_embeddings(embeddings: np.ndarray | torch.Tensor, truncate_dim: int
     return embeddings[..., :truncate_dim]
 
 
+def _self_nearest_neighbors(
+    embeddings: Tensor | np.ndarray,
+    top_k: int,
+    neighbor_backend: str | Callable[..., tuple[Tensor, Tensor]],
+    score_function: Callable[[Tensor, Tensor], Tensor] = cos_sim,
+    **kwargs,
+) -> tuple[Tensor, Tensor]:
+    """
+    Retrieves the ``top_k`` nearest neighbors of every embedding among the embeddings themselves with the given
+    backend, see :func:`nearest_neighbors`.
+    """
+    embeddings = _convert_to_batch_tensor(embeddings)
+    if neighbor_backend == "exact":
+        return nearest_neighbors(embeddings, top_k=top_k, backend="exact", score_function=score_function, **kwargs)
+
+    if score_function is cos_sim:
+        embeddings = normalize_embeddings(embeddings)
+    elif score_function is not dot_score:
+        raise ValueError(
+            "Approximate nearest neighbor backends only support `cos_sim` and `dot_score` as the score function."
+        )
+
+    if callable(neighbor_backend):
+        return neighbor_backend(embeddings, top_k=top_k)
+    return nearest_neighbors(embeddings, top_k=top_k, backend=neighbor_backend, **kwargs)
+
+
+def _neighbors_to_pairs(scores: Tensor, indices: Tensor, max_pairs: int) -> list[list[float | int]]:
+    """
+    Converts ``(num_embeddings, top_k)`` neighbor scores and indices into a list of distinct [score, id1, id2] pairs
+    with id1 < id2, sorted by decreasing score and limited to ``max_pairs`` pairs.
+    """
+    num_embeddings, top_k = indices.shape
+    scores = scores.flatten().cpu()
+    first = torch.arange(num_embeddings).repeat_interleave(top_k)
+    second = indices.flatten().cpu()
+    valid = (second >= 0) & (first != second)
+    scores, first, second = scores[valid], first[valid], second[valid]
+    first, second = torch.minimum(first, second), torch.maximum(first, second)
+
+    # Keep the highest score of each pair, i.e. the first occurrence after sorting by decreasing score
+    order = torch.argsort(scores, descending=True, stable=True)
+    scores, first, second = scores[order], first[order], second[order]
+    _, unique_idx = np.unique((first * num_embeddings + second).numpy(), return_index=True)
+    unique_idx = torch.from_numpy(np.sort(unique_idx))[:max_pairs]
+
+    return [
+        [score, i, j]
+        for score, i, j in zip(scores[unique_idx].tolist(), first[unique_idx].tolist(), second[unique_idx].tolist())
+    ]
+
+
 def paraphrase_mining(
     model,
     sentences: list[str],
@@ -326,6 +379,7 @@ def paraphrase_mining(
     max_pairs: int = 500000,
     top_k: int = 100,
     score_function: Callable[[Tensor, Tensor], Tensor] = cos_sim,
+    neighbor_backend: Literal["exact", "ivf", "faiss", "usearch"] | Callable[..., tuple[Tensor, Tensor]] | None = None,
 ) -> list[list[float | int]]:
     """
     Given a list of sentences / texts, this function performs paraphrase mining. It compares all sentences against all
@@ -341,6 +395,8 @@ def paraphrase_mining(
         max_pairs (int, optional): Maximal number of text pairs returned. Defaults to 500000.
         top_k (int, optional): For each sentence, we retrieve up to top_k other sentences. Defaults to 100.
         score_function (Callable[[Tensor, Tensor], Tensor], optional): Function for computing scores. By default, cosine similarity. Defaults to cos_sim.
+        neighbor_backend (str | Callable, optional): Backend for retrieving the ``top_k`` neighbors per sentence, see
+            :func:`paraphrase_mining_embeddings`. Defaults to None, i.e. the brute-force search.
 
     Returns:
         List[List[Union[float, int]]]: Returns a list of triplets with the format [score, id1, id2]
@@ -358,6 +414,7 @@ def paraphrase_mining(
         max_pairs=max_pairs,
         top_k=top_k,
         score_function=score_function,
+        neighbor_backend=neighbor_backend,
     )
 
 
@@ -368,6 +425,7 @@ def paraphrase_mining_embeddings(
     max_pairs: int = 500000,
     top_k: int = 100,
     score_function: Callable[[Tensor, Tensor], Tensor] = cos_sim,
+    neighbor_backend: Literal["exact", "ivf", "faiss", "usearch"] | Callable[..., tuple[Tensor, Tensor]] | None = None,
 ) -> list[list[float | int]]:
     """
     Given a list of sentences / texts, this function performs paraphrase mining. It compares all sentences against all
@@ -380,6 +438,11 @@ def paraphrase_mining_embeddings(
         max_pairs (int): Maximal number of text pairs returned.
         top_k (int): For each sentence, we retrieve up to top_k other sentences
         score_function (Callable[[Tensor, Tensor], Tensor]): Function for computing scores. By default, cosine similarity.
+        neighbor_backend (str | Callable, optional): Backend for retrieving the ``top_k`` neighbors per sentence
+            instead of the quadratic brute-force search. One of the :func:`nearest_neighbors` backends ("exact",
+            "ivf", "faiss" or "usearch"), or a callable with the signature of :func:`nearest_neighbors`. The approximate
+            backends only support ``cos_sim`` and ``dot_score`` as ``score_function``. Defaults to None, i.e. the
+            brute-force search.
 
     Returns:
         List[List[Union[float, int]]]: Returns a list of triplets with the format [score, id1, id2]
@@ -387,6 +450,17 @@ def paraphrase_mining_embeddings(
 
     top_k += 1  # A sentence has the highest similarity to itself. Increase +1 as we are interest in distinct pairs
 
+    if neighbor_backend is not None:
+        scores, indices = _self_nearest_neighbors(
+            embeddings,
+            top_k=top_k,
+            neighbor_backend=neighbor_backend,
+            score_function=score_function,
+            query_chunk_size=query_chunk_size,
+            corpus_chunk_size=corpus_chunk_size,
+        )
+        return _neighbors_to_pairs(scores, indices, max_pairs=max_pairs)
+
     # Mine for duplicates
     pairs = queue.PriorityQueue()
     min_score = -1
@@ -519,6 +593,551 @@ def semantic_search(
     return queries_result_list
 
 
+def ragged_ranking_metrics(
+    scores: np.ndarray, is_relevant: np.ndarray, offsets: np.ndarray, at_k: int = 10
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes MRR@k, NDCG@k and (non-truncated) Average Precision for many rankings at once. The rankings are ragged,
+    i.e. every query can have a different number of documents: the scores and labels of all queries are concatenated,
+    and ``offsets`` marks where the documents of each query start.
+
+    The results are identical to computing the metrics per query with ``sklearn.metrics.ndcg_score`` and
+    ``sklearn.metrics.average_precision_score``, including their averaging over tied scores. For MRR@k, tied
+    documents are ranked by decreasing position. Queries without relevant documents get a score of 0 for all metrics.
+
+    Args:
+        scores (np.ndarray): The predicted scores of all documents, with shape (num_documents,).
+        is_relevant (np.ndarray): Whether each document is relevant for its query, with shape (num_documents,).
+        offsets (np.ndarray): The start index of the documents of each query in ``scores``, followed by
+            ``num_documents``, i.e. with shape (num_queries + 1,).
+        at_k (int, optional): The cutoff for MRR and NDCG. Defaults to 10.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The MRR@k, NDCG@k and AP of each query, each with shape
+        (num_queries,).
+
+    Example:
+        ::
+
+            >>> scores = np.array([0.9, 0.1, 0.5, 0.2, 0.8])
+            >>> is_relevant = np.array([0, 1, 1, 0, 0])
+            >>> offsets = np.array([0, 2, 5])  # Two queries, with 2 and 3 documents
+            >>> mrr, ndcg, ap = ragged_ranking_metrics(scores, is_relevant, offsets, at_k=10)
+            >>> mrr
+            array([0.5, 0.5])
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    is_relevant = np.asarray(is_relevant, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    num_queries = len(offsets) - 1
+    num_documents = np.diff(offsets)
+    query_ids = np.repeat(np.arange(num_queries), num_documents)
+    if len(scores) == 0:
+        return np.zeros(num_queries), np.zeros(num_queries), np.zeros(num_queries)
+
+    # Sort by query, then by decreasing score, then by decreasing position
+    order = np.lexsort((-np.arange(len(scores)), -scores, query_ids))
+    scores = scores[order]
+    is_relevant = is_relevant[order]
+    ranks = np.arange(len(scores)) - offsets[query_ids]
+    num_relevant = np.bincount(query_ids, weights=is_relevant, minlength=num_queries)
+
+    # MRR@k: the reciprocal rank of the first relevant document in the top k
+    first_relevant_rank = np.full(num_queries, np.inf)
+    relevant_in_top_k = (is_relevant > 0) & (ranks < at_k)
+    np.minimum.at(first_relevant_rank, query_ids[relevant_in_top_k], ranks[relevant_in_top_k])
+    mrr = 1 / (first_relevant_rank + 1)
+
+    # Documents with the same score are grouped, and share the gain and precision of their group
+    group_starts = np.flatnonzero(
+        np.concatenate([[True], (query_ids[1:] != query_ids[:-1]) | (scores[1:] != scores[:-1])])
+    )
+    group_ends = np.append(group_starts[1:], len(scores)) - 1
+    group_query_ids = query_ids[group_starts]
+    group_sizes = group_ends - group_starts + 1
+    group_relevant = np.add.reduceat(is_relevant, group_starts)
+
+    # NDCG@k with tie-averaged DCG, like sklearn
+    discounts = np.where(ranks < at_k, 1 / np.log2(ranks + 2), 0.0)
+    group_discounts = np.add.reduceat(discounts, group_starts)
+    dcg = np.bincount(group_query_ids, weights=group_relevant / group_sizes * group_discounts, minlength=num_queries)
+    ideal_discount_cumsum = np.concatenate([[0.0], np.cumsum(1 / np.log2(np.arange(max(at_k, 0)) + 2))])
+    idcg = ideal_discount_cumsum[np.minimum(num_relevant, at_k).astype(np.int64)]
+
+    # AP: the precision at every distinct score threshold, weighted by the recall gained at that threshold
+    relevant_cumsum = np.concatenate([[0.0], np.cumsum(is_relevant)])
+    group_query_starts = offsets[group_query_ids]
+    group_precision = (relevant_cumsum[group_ends + 1] - relevant_cumsum[group_query_starts]) / (
+        group_ends + 1 - group_query_starts
+    )
+    ap = np.bincount(group_query_ids, weights=group_relevant * group_precision, minlength=num_queries)
+
+    has_relevant = num_relevant > 0
+    ndcg = np.divide(dcg, idcg, out=np.zeros(num_queries), where=has_relevant)
+    ap = np.divide(ap, num_relevant, out=np.zeros(num_queries), where=has_relevant)
+    return mrr, ndcg, ap
+
+
+def _kmeans(
+    embeddings: Tensor,
+    num_clusters: int,
+    num_iterations: int = 10,
+    max_training_points: int = 256,
+    batch_size: int = 16384,
+    seed: int = 12345,
+) -> Tensor:
+    """
+    Spherical k-means on (a sample of) normalized embeddings, used to partition the corpus for the "ivf" backend of
+    :func:`nearest_neighbors`.
+
+    Args:
+        embeddings (Tensor): A 2 dimensional tensor with normalized embeddings.
+        num_clusters (int): The number of centroids to compute.
+        num_iterations (int): The number of Lloyd iterations. Defaults to 10.
+        max_training_points (int): The maximum number of training points per centroid. Defaults to 256.
+        batch_size (int): The number of embeddings to assign to centroids at a time. Defaults to 16384.
+        seed (int): The seed used to sample the training points and the initial centroids. Defaults to 12345.
+
+    Returns:
+        Tensor: A ``(num_clusters, embedding_dim)`` tensor with the normalized centroids.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    num_training_points = min(len(embeddings), num_clusters * max_training_points)
+    sample_idx = torch.randperm(len(embeddings), generator=generator)[:num_training_points].to(embeddings.device)
+    sample = embeddings[sample_idx]
+    centroids = sample[:num_clusters].clone()
+
+    for _ in range(num_iterations):
+        assignments = torch.cat(
+            [
+                (sample[start : start + batch_size] @ centroids.T).argmax(dim=1)
+                for start in range(0, len(sample), batch_size)
+            ]
+        )
+        new_centroids = torch.zeros_like(centroids).index_add_(0, assignments, sample)
+        counts = torch.bincount(assignments, minlength=num_clusters)
+        # Keep the previous centroid for clusters that lost all of their points
+        empty = counts == 0
+        new_centroids[empty] = centroids[empty]
+        centroids = normalize_embeddings(new_centroids)
+
+    return centroids
+
+
+def _merge_top_k(
+    top_k_scores: Tensor, top_k_indices: Tensor, scores: Tensor, indices: Tensor, top_k: int
+) -> tuple[Tensor, Tensor]:
+    """Merges a running top-k with a new block of candidate scores and indices for the same rows."""
+    scores = torch.cat([top_k_scores, scores], dim=1)
+    indices = torch.cat([top_k_indices, indices], dim=1)
+    top_k_scores, local_idx = torch.topk(scores, min(top_k, scores.size(1)), dim=1, largest=True, sorted=False)
+    return top_k_scores, torch.gather(indices, 1, local_idx)
+
+
+def nearest_neighbors(
+    query_embeddings: Tensor | np.ndarray,
+    corpus_embeddings: Tensor | np.ndarray | None = None,
+    top_k: int = 10,
+    backend: Literal["exact", "ivf", "faiss", "usearch"] = "exact",
+    score_function: Callable[[Tensor, Tensor], Tensor] = dot_score,
+    query_chunk_size: int = 1024,
+    corpus_chunk_size: int = 100000,
+    num_clusters: int | None = None,
+    num_probes: int = 8,
+    show_progress_bar: bool = False,
+) -> tuple[Tensor, Tensor]:
+    """
+    Retrieves the ``top_k`` nearest neighbors in ``corpus_embeddings`` for every query embedding, either exactly or
+    approximately. Unlike :func:`semantic_search`, the results are returned as two ``(num_queries, top_k)`` tensors
+    rather than as lists of dictionaries, which keeps this function usable for millions of queries.
+
+    The following backends are supported:
+
+    - ``"exact"``: Brute-force search in chunks of ``query_chunk_size x corpus_chunk_size`` scores, keeping a running
+      top-k. Quadratic, but only requires memory for a single chunk of scores.
+    - ``"ivf"``: Built-in inverted file index: the corpus is partitioned with spherical k-means into ``num_clusters``
+      clusters, and every query is only compared against the corpus embeddings in its ``num_probes`` closest clusters.
+      Requires no additional dependencies and runs on the device of the embeddings.
+    - ``"faiss"``: Approximate search with a `FAISS <https://github.com/facebookresearch/faiss>`_ HNSW index.
+    - ``"usearch"``: Approximate search with a `usearch <https://github.com/unum-cloud/usearch>`_ HNSW index.
+
+    The approximate backends score with the dot product, so the embeddings should be normalized if cosine similarity
+    is desired.
+
+    Args:
+        query_embeddings (Tensor | np.ndarray): A 2 dimensional tensor with the query embeddings.
+        corpus_embeddings (Tensor | np.ndarray, optional): A 2 dimensional tensor with the corpus embeddings. Defaults
+            to None, in which case the query embeddings are also used as the corpus, i.e. a self-search in which every
+            embedding is (normally) its own nearest neighbor.
+        top_k (int, optional): Number of neighbors to retrieve per query. Defaults to 10.
+        backend (Literal["exact", "ivf", "faiss", "usearch"], optional): The neighbor search backend. Defaults to "exact".
+        score_function (Callable[[Tensor, Tensor], Tensor], optional): Function for computing scores with the "exact"
+            backend. The other backends always use the dot product. Defaults to dot_score.
+        query_chunk_size (int, optional): Number of queries that are scored simultaneously. Defaults to 1024.
+        corpus_chunk_size (int, optional): Number of corpus embeddings that are scored simultaneously with the "exact"
+            backend. Defaults to 100000.
+        num_clusters (int, optional): Number of k-means clusters for the "ivf" backend. Defaults to None, i.e. roughly
+            ``4 * sqrt(len(corpus_embeddings))``.
+        num_probes (int, optional): Number of clusters to search per query with the "ivf" backend. Higher values
+            improve the recall at the cost of speed. Defaults to 8.
+        show_progress_bar (bool, optional): Whether to show a progress bar. Defaults to False.
+
+    Returns:
+        Tuple[Tensor, Tensor]: The scores and the corpus indices of the neighbors, both with shape
+        ``(num_queries, top_k)`` and sorted by decreasing score. If fewer than ``top_k`` neighbors were found for a
+        query, e.g. because the corpus is too small, the remaining scores are ``-inf`` and the indices are ``-1``.
+
+    Example:
+        ::
+
+            from sentence_transformers import SentenceTransformer
+            from sentence_transformers.util import nearest_neighbors
+
+            model = SentenceTransformer("all-MiniLM-L6-v2")
+            embeddings = model.encode(sentences, normalize_embeddings=True, convert_to_tensor=True)
+            scores, indices = nearest_neighbors(embeddings, top_k=10, backend="ivf")
+    """
+    query_embeddings = _convert_to_batch_tensor(query_embeddings)
+    if corpus_embeddings is None:
+        corpus_embeddings = query_embeddings
+    else:
+        corpus_embeddings = _convert_to_batch_tensor(corpus_embeddings).to(query_embeddings.device)
+
+    num_queries = len(query_embeddings)
+    device = query_embeddings.device
+    top_k_scores = torch.full((num_queries, 0), -float("inf"), device=device)
+    top_k_indices = torch.full((num_queries, 0), -1, dtype=torch.long, device=device)
+
+    if backend == "exact":
+        scores_list, indices_list = [], []
+        for query_start_idx in tqdm(
+            range(0, num_queries, query_chunk_size), desc="Nearest neighbors", disable=not show_progress_bar
+        ):
+            query_chunk = query_embeddings[query_start_idx : query_start_idx + query_chunk_size]
+            chunk_scores = top_k_scores[query_start_idx : query_start_idx + query_chunk_size]
+            chunk_indices = top_k_indices[query_start_idx : query_start_idx + query_chunk_size]
+            for corpus_start_idx in range(0, len(corpus_embeddings), corpus_chunk_size):
+                scores = score_function(
+                    query_chunk, corpus_embeddings[corpus_start_idx : corpus_start_idx + corpus_chunk_size]
+                )
+                indices = torch.arange(corpus_start_idx, corpus_start_idx + scores.size(1), device=device)
+                chunk_scores, chunk_indices = _merge_top_k(
+                    chunk_scores, chunk_indices, scores, indices.expand_as(scores), top_k
+                )
+            scores_list.append(chunk_scores)
+            indices_list.append(chunk_indices)
+        top_k_scores = torch.cat(scores_list)
+        top_k_indices = torch.cat(indices_list)
+
+    elif backend == "ivf":
+        query_embeddings = query_embeddings.float()
+        corpus_embeddings = corpus_embeddings.float()
+        if num_clusters is None:
+            num_clusters = max(1, int(4 * len(corpus_embeddings) ** 0.5))
+        num_clusters = min(num_clusters, len(corpus_embeddings))
+        num_probes = min(num_probes, num_clusters)
+
+        # Train the coarse quantizer and build the inverted lists, i.e. the corpus indices per cluster
+        centroids = _kmeans(normalize_embeddings(corpus_embeddings), num_clusters)
+        assignments = torch.cat(
+            [
+                (corpus_embeddings[start : start + corpus_chunk_size] @ centroids.T).argmax(dim=1)
+                for start in range(0, len(corpus_embeddings), corpus_chunk_size)
+            ]
+        )
+        corpus_order = torch.argsort(assignments, stable=True)
+        corpus_offsets = torch.zeros(num_clusters + 1, dtype=torch.long, device=device)
+        corpus_offsets[1:] = torch.cumsum(torch.bincount(assignments, minlength=num_clusters), dim=0)
+
+        # Invert the probes: for every cluster, which queries have to be compared against its inverted list
+        probes = torch.cat(
+            [
+                torch.topk(query_embeddings[start : start + query_chunk_size] @ centroids.T, num_probes, dim=1).indices
+                for start in range(0, num_queries, query_chunk_size)
+            ]
+        ).flatten()
+        query_order = torch.argsort(probes, stable=True) // num_probes
+        query_offsets = torch.zeros(num_clusters + 1, dtype=torch.long, device=device)
+        query_offsets[1:] = torch.cumsum(torch.bincount(probes, minlength=num_clusters), dim=0)
+
+        top_k_scores = torch.full((num_queries, top_k), -float("inf"), device=device)
+        top_k_indices = torch.full((num_queries, top_k), -1, dtype=torch.long, device=device)
+        corpus_offsets = corpus_offsets.tolist()
+        query_offsets = query_offsets.tolist()
+        for cluster_idx in tqdm(range(num_clusters), desc="Nearest neighbors", disable=not show_progress_bar):
+            member_indices = corpus_order[corpus_offsets[cluster_idx] : corpus_offsets[cluster_idx + 1]]
+            if len(member_indices) == 0:
+                continue
+            members = corpus_embeddings[member_indices]
+            probing_queries = query_order[query_offsets[cluster_idx] : query_offsets[cluster_idx + 1]]
+            for start in range(0, len(probing_queries), query_chunk_size):
+                query_indices = probing_queries[start : start + query_chunk_size]
+                scores = query_embeddings[query_indices] @ members.T
+                top_k_scores[query_indices], top_k_indices[query_indices] = _merge_top_k(
+                    top_k_scores[query_indices],
+                    top_k_indices[query_indices],
+                    scores,
+                    member_indices.expand_as(scores),
+                    top_k,
+                )
+
+    elif backend in ("faiss", "usearch"):
+        query_array = query_embeddings.detach().cpu().float().numpy()
+        corpus_array = corpus_embeddings.detach().cpu().float().numpy()
+        k = min(top_k, len(corpus_array))
+        if backend == "faiss":
+            import faiss
+
+            index = faiss.IndexHNSWFlat(corpus_array.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+            index.add(np.ascontiguousarray(corpus_array))
+            scores_list, indices_list = [], []
+            for start in tqdm(
+                range(0, num_queries, query_chunk_size), desc="Nearest neighbors", disable=not show_progress_bar
+            ):
+                scores, indices = index.search(np.ascontiguousarray(query_array[start : start + query_chunk_size]), k)
+                scores_list.append(scores)
+                indices_list.append(indices)
+            scores = np.concatenate(scores_list)
+            indices = np.concatenate(indices_list).astype(np.int64)
+        else:
+            from usearch.index import Index
+
+            index = Index(ndim=corpus_array.shape[1], metric="ip", dtype="f32")
+            index.add(np.arange(len(corpus_array)), corpus_array)
+            matches = index.search(query_array, count=k)
+            # usearch reports the inner product distance, i.e. 1 - score
+            scores = np.atleast_2d(1 - matches.distances).astype(np.float32)
+            indices = np.atleast_2d(matches.keys).astype(np.int64)
+            found = np.arange(indices.shape[1])[None, :] < np.atleast_1d(matches.counts)[:, None]
+            scores[~found] = -np.inf
+            indices[~found] = -1
+        scores[indices < 0] = -np.inf
+        top_k_scores = torch.from_numpy(scores).to(device)
+        top_k_indices = torch.from_numpy(indices).to(device)
+
+    else:
+        raise ValueError(f'Unknown nearest neighbor backend "{backend}". Use "exact", "ivf", "faiss" or "usearch".')
+
+    # Sort the neighbors by decreasing score and pad up to top_k
+    top_k_scores, local_idx = torch.sort(top_k_scores, dim=1, descending=True)
+    top_k_indices = torch.gather(top_k_indices, 1, local_idx)
+    if top_k_scores.size(1) < top_k:
+        padding = top_k - top_k_scores.size(1)
+        top_k_scores = torch.nn.functional.pad(top_k_scores, (0, padding), value=-float("inf"))
+        top_k_indices = torch.nn.functional.pad(top_k_indices, (0, padding), value=-1)
+    return top_k_scores, top_k_indices
+
+
+def _margin_neighbor_stats(
+    source_embeddings: Tensor,
+    target_embeddings: Tensor,
+    top_k: int,
+    cache_folder: str | None,
+    show_progress_bar: bool = False,
+    **kwargs,
+) -> dict[str, Tensor]:
+    """
+    Computes the ``top_k`` nearest neighbors of the source embeddings among the target embeddings and vice versa,
+    optionally loading them from or saving them to ``cache_folder``.
+    """
+    cache_file = None
+    if cache_folder:
+        os.makedirs(cache_folder, exist_ok=True)
+        neighbor_hash = hashlib.md5()
+        for embeddings in (source_embeddings, target_embeddings):
+            neighbor_hash.update(str(tuple(embeddings.shape)).encode())
+            neighbor_hash.update(embeddings.detach().cpu().float().numpy().tobytes())
+        neighbor_hash.update(repr((top_k, sorted(kwargs.items()))).encode())
+        cache_file = os.path.join(cache_folder, f"margin_neighbors_{neighbor_hash.hexdigest()}.npz")
+        if os.path.exists(cache_file):
+            logger.info(f"Loading the margin neighbor statistics from {cache_file}")
+            with np.load(cache_file) as cached:
+                return {key: torch.from_numpy(value).to(source_embeddings.device) for key, value in cached.items()}
+
+    forward_scores, forward_indices = nearest_neighbors(
+        source_embeddings, target_embeddings, top_k=top_k, show_progress_bar=show_progress_bar, **kwargs
+    )
+    backward_scores, backward_indices = nearest_neighbors(
+        target_embeddings, source_embeddings, top_k=top_k, show_progress_bar=show_progress_bar, **kwargs
+    )
+    stats = {
+        "forward_scores": forward_scores,
+        "forward_indices": forward_indices,
+        "backward_scores": backward_scores,
+        "backward_indices": backward_indices,
+    }
+
+    if cache_file:
+        np.savez(cache_file, **{key: value.cpu().numpy() for key, value in stats.items()})
+        logger.info(f"Saved the margin neighbor statistics to {cache_file}")
+    return stats
+
+
+def margin_mining(
+    source_embeddings: Tensor | np.ndarray,
+    target_embeddings: Tensor | np.ndarray,
+    top_k: int = 4,
+    margin: Literal["ratio", "distance", "csls", "absolute"] = "ratio",
+    mode: Literal["max", "intersect", "forward", "backward"] = "max",
+    min_score: float | None = None,
+    backend: Literal["exact", "ivf", "faiss", "usearch"] = "exact",
+    query_chunk_size: int = 1024,
+    corpus_chunk_size: int = 100000,
+    num_clusters: int | None = None,
+    num_probes: int = 8,
+    cache_folder: str | None = None,
+    show_progress_bar: bool = False,
+) -> tuple[Tensor, Tensor, Tensor]:
+    """
+    Mines parallel (e.g. translated) pairs between two sets of embeddings with margin-based scoring, as described in
+    `Artetxe and Schwenk, 2019 <https://arxiv.org/abs/1811.01136>`_. Rather than using the cosine similarity of a
+    pair directly, it is compared against the average similarity of both texts to their ``top_k`` nearest neighbors,
+    which penalizes "hub" texts that are similar to many other texts.
+
+    For every source text, the candidates are its ``top_k`` nearest targets, and vice versa. The neighbors are
+    retrieved with :func:`nearest_neighbors` in both directions, i.e. in chunks with a running top-k for the "exact"
+    backend, so the full similarity matrix is never materialized. The neighbor similarities double as the candidate
+    similarities, so scoring the candidates requires no additional similarity computations. The neighbor statistics
+    can be stored in ``cache_folder``, such that mining the same embeddings again, e.g. with another ``margin``,
+    ``mode`` or ``min_score``, skips the neighbor search.
+
+    The following margins are supported, with ``cos(x, y)`` the cosine similarity of the pair and ``m(x)`` and
+    ``m(y)`` the average cosine similarity of ``x`` and ``y`` to their ``top_k`` nearest neighbors:
+
+    - ``"ratio"``: ``cos(x, y) / ((m(x) + m(y)) / 2)``
+    - ``"distance"``: ``cos(x, y) - (m(x) + m(y)) / 2``
+    - ``"csls"``: ``2 * cos(x, y) - m(x) - m(y)``, i.e. Cross-domain Similarity Local Scaling
+    - ``"absolute"``: ``cos(x, y)``, i.e. no margin
+
+    Args:
+        source_embeddings (Tensor | np.ndarray): A 2 dimensional tensor with the source embeddings.
+        target_embeddings (Tensor | np.ndarray): A 2 dimensional tensor with the target embeddings.
+        top_k (int, optional): Number of nearest neighbors that are used both as candidates and to compute the
+            average neighbor similarities. Defaults to 4.
+        margin (Literal["ratio", "distance", "csls", "absolute"], optional): The margin function. Defaults to "ratio".
+        mode (Literal["max", "intersect", "forward", "backward"], optional): Which candidates to return. "forward"
+            returns the best scoring target per source, "backward" the best scoring source per target, "max" the
+            union of both and "intersect" only the pairs that are the best scoring candidate in both directions.
+            Defaults to "max".
+        min_score (float, optional): If set, only pairs with a margin score of at least ``min_score`` are returned.
+            Defaults to None.
+        backend (Literal["exact", "ivf", "faiss", "usearch"], optional): The neighbor search backend, see
+            :func:`nearest_neighbors`. Defaults to "exact".
+        query_chunk_size (int, optional): Number of embeddings that are searched simultaneously. Defaults to 1024.
+        corpus_chunk_size (int, optional): Number of embeddings that are scored simultaneously with the "exact"
+            backend. Defaults to 100000.
+        num_clusters (int, optional): Number of k-means clusters for the "ivf" backend. Defaults to None.
+        num_probes (int, optional): Number of clusters to search with the "ivf" backend. Defaults to 8.
+        cache_folder (str, optional): Directory for caching the neighbor statistics, keyed by the embeddings and the
+            search settings. Defaults to None, i.e. no caching.
+        show_progress_bar (bool, optional): Whether to show a progress bar. Defaults to False.
+
+    Returns:
+        Tuple[Tensor, Tensor, Tensor]: The margin scores, the source indices and the target indices of the mined
+        pairs, sorted by decreasing score. Every (source, target) pair occurs at most once, but a source or target
+        can occur in multiple pairs with the "max" mode.
+
+    Example:
+        ::
+
+            from sentence_transformers import SentenceTransformer
+            from sentence_transformers.util import margin_mining
+
+            model = SentenceTransformer("sentence-transformers/LaBSE")
+            source_embeddings = model.encode(source_sentences, convert_to_tensor=True)
+            target_embeddings = model.encode(target_sentences, convert_to_tensor=True)
+            scores, source_indices, target_indices = margin_mining(source_embeddings, target_embeddings, min_score=1.0)
+            for score, source_idx, target_idx in zip(scores.tolist(), source_indices.tolist(), target_indices.tolist()):
+                print(f"{score:.4f}\\t{source_sentences[source_idx]}\\t{target_sentences[target_idx]}")
+    """
+    if margin not in ("ratio", "distance", "csls", "absolute"):
+        raise ValueError(f'Unknown margin "{margin}". Use "ratio", "distance", "csls" or "absolute".')
+    if mode not in ("max", "intersect", "forward", "backward"):
+        raise ValueError(f'Unknown mode "{mode}". Use "max", "intersect", "forward" or "backward".')
+
+    source_embeddings = normalize_embeddings(_convert_to_batch_tensor(source_embeddings))
+    target_embeddings = normalize_embeddings(_convert_to_batch_tensor(target_embeddings).to(source_embeddings.device))
+    stats = _margin_neighbor_stats(
+        source_embeddings,
+        target_embeddings,
+        top_k,
+        cache_folder,
+        show_progress_bar=show_progress_bar,
+        backend=backend,
+        query_chunk_size=query_chunk_size,
+        corpus_chunk_size=corpus_chunk_size,
+        num_clusters=num_clusters,
+        num_probes=num_probes,
+    )
+
+    def neighbor_mean(scores: Tensor) -> Tensor:
+        # Ignore the padding if there are fewer than top_k neighbors
+        found = torch.isfinite(scores)
+        return torch.where(found, scores, 0).sum(dim=1) / found.sum(dim=1).clamp(min=1)
+
+    forward_mean = neighbor_mean(stats["forward_scores"])
+    backward_mean = neighbor_mean(stats["backward_scores"])
+
+    def best_candidates(scores: Tensor, indices: Tensor, query_mean: Tensor, corpus_mean: Tensor) -> tuple:
+        valid = indices >= 0
+        neighbor_means = (query_mean[:, None] + corpus_mean[indices.clamp(min=0)]) / 2
+        if margin == "ratio":
+            margin_scores = scores / neighbor_means
+        elif margin == "distance":
+            margin_scores = scores - neighbor_means
+        elif margin == "csls":
+            margin_scores = 2 * scores - 2 * neighbor_means
+        else:
+            margin_scores = scores
+        margin_scores = torch.where(valid, margin_scores, -float("inf"))
+        best_scores, best_idx = margin_scores.max(dim=1)
+        best_indices = torch.gather(indices, 1, best_idx[:, None]).squeeze(1)
+        return best_scores, best_indices
+
+    num_sources, num_targets = len(source_embeddings), len(target_embeddings)
+    device = source_embeddings.device
+    forward_scores, forward_best = best_candidates(
+        stats["forward_scores"], stats["forward_indices"], forward_mean, backward_mean
+    )
+    backward_scores, backward_best = best_candidates(
+        stats["backward_scores"], stats["backward_indices"], backward_mean, forward_mean
+    )
+    forward_sources = torch.arange(num_sources, device=device)
+    backward_targets = torch.arange(num_targets, device=device)
+
+    if mode == "forward":
+        scores, source_indices, target_indices = forward_scores, forward_sources, forward_best
+    elif mode == "backward":
+        scores, source_indices, target_indices = backward_scores, backward_best, backward_targets
+    elif mode == "intersect":
+        # Keep the forward pairs of which the target also prefers the source
+        mutual = (forward_best >= 0) & (backward_best[forward_best.clamp(min=0)] == forward_sources)
+        scores, source_indices, target_indices = forward_scores[mutual], forward_sources[mutual], forward_best[mutual]
+    else:
+        # The margin score is symmetric, so duplicate pairs have identical scores and can simply be dropped
+        scores = torch.cat([forward_scores, backward_scores])
+        source_indices = torch.cat([forward_sources, backward_best])
+        target_indices = torch.cat([forward_best, backward_targets])
+        valid = (source_indices >= 0) & (target_indices >= 0)
+        scores, source_indices, target_indices = scores[valid], source_indices[valid], target_indices[valid]
+        pair_ids = source_indices * num_targets + target_indices
+        _, unique_idx = np.unique(pair_ids.cpu().numpy(), return_index=True)
+        unique_idx = torch.from_numpy(unique_idx).to(device)
+        scores, source_indices, target_indices = (
+            scores[unique_idx],
+            source_indices[unique_idx],
+            target_indices[unique_idx],
+        )
+
+    keep = (source_indices >= 0) & (target_indices >= 0)
+    if min_score is not None:
+        keep &= scores >= min_score
+    scores, source_indices, target_indices = scores[keep], source_indices[keep], target_indices[keep]
+
+    order = torch.argsort(scores, descending=True, stable=True)
+    return scores[order], source_indices[order], target_indices[order]
+
+
 def mine_hard_negatives(
     dataset: Dataset,
     model: SentenceTransformer,
@@ -1263,6 +1882,50 @@ def batch_to_device(batch: dict[str, Any], target_device: device) -> dict[str, A
     return batch
 
 
+# Maps every model to the versions of its parameters and buffers and the fingerprint of those versions
+_model_fingerprints: weakref.WeakKeyDictionary[torch.nn.Module, tuple[tuple[tuple[int, int], ...], str]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_model_fingerprint(model: torch.nn.Module) -> str:
+    """
+    Computes a fingerprint of the parameters and buffers of a model, which changes whenever the weights of the model
+    change, e.g. after an optimizer step. The fingerprint is a hash of the names, shapes, data types and bytes of all
+    parameters and buffers. It is memoized until any parameter or buffer is replaced or modified in-place, so
+    repeated calls on an unchanged model don't copy the weights again.
+
+    Args:
+        model (torch.nn.Module): The model to compute the fingerprint for.
+
+    Returns:
+        str: A hexadecimal fingerprint of the model weights.
+
+    Example:
+        >>> from sentence_transformers import SentenceTransformer
+        >>> from sentence_transformers.util import get_model_fingerprint
+        >>> model = SentenceTransformer("all-MiniLM-L6-v2")
+        >>> fingerprint = get_model_fingerprint(model)
+        >>> fingerprint == get_model_fingerprint(model)
+        True
+    """
+    tensors = [*model.named_parameters(), *model.named_buffers()]
+    versions = tuple((id(tensor), tensor._version) for _, tensor in tensors)
+    memoized = _model_fingerprints.get(model)
+    if memoized is not None and memoized[0] == versions:
+        return memoized[1]
+
+    hasher = hashlib.sha256()
+    with torch.no_grad():
+        for name, tensor in tensors:
+            hasher.update(f"{name}:{tuple(tensor.shape)}:{tensor.dtype}".encode())
+            # View the values as bytes, as numpy does not support all data types, e.g. bfloat16
+            hasher.update(tensor.detach().reshape(-1).contiguous().view(torch.uint8).cpu().numpy().tobytes())
+    fingerprint = hasher.hexdigest()
+    _model_fingerprints[model] = (versions, fingerprint)
+    return fingerprint
+
+
 def fullname(o) -> str:
     """
     Gives a full name (package_name.class_name) for a class / object in Python. Will
@@ -1333,6 +1996,8 @@ def community_detection(
     min_community_size: int = 10,
     batch_size: int = 1024,
     show_progress_bar: bool = False,
+    neighbor_backend: Literal["exact", "ivf", "faiss", "usearch"] | Callable[..., tuple[Tensor, Tensor]] | None = None,
+    top_k: int | None = None,
 ) -> list[list[int]]:
     """
     Function for Fast Community Detection.
@@ -1347,6 +2012,13 @@ def community_detection(
         min_community_size (int): The minimum size of a community to be considered. Defaults to 10.
         batch_size (int): The batch size for computing cosine similarity scores. Defaults to 1024.
         show_progress_bar (bool): Whether to show a progress bar during computation. Defaults to False.
+        neighbor_backend (str | Callable, optional): Backend for retrieving the ``top_k`` nearest neighbors of every
+            embedding instead of comparing all embeddings against each other. One of the :func:`nearest_neighbors`
+            backends ("exact", "ivf", "faiss" or "usearch"), or a callable with the signature of
+            :func:`nearest_neighbors`. With the approximate backends, community detection scales to millions of
+            embeddings. Defaults to None, i.e. the brute-force search.
+        top_k (int, optional): The number of neighbors to retrieve per embedding when using a ``neighbor_backend``,
+            which is also the maximum community size. Defaults to None, i.e. ``max(2 * min_community_size, 100)``.
 
     Returns:
         List[List[int]]: A list of communities, where each community is represented as a list of indices.
@@ -1363,49 +2035,67 @@ def community_detection(
     min_community_size = min(min_community_size, len(embeddings))
     sort_max_size = min(max(2 * min_community_size, 50), len(embeddings))
 
-    for start_idx in tqdm(
-        range(0, len(embeddings), batch_size), desc="Finding clusters", disable=not show_progress_bar
-    ):
-        # Compute cosine similarity scores
-        cos_scores = embeddings[start_idx : start_idx + batch_size] @ embeddings.T
-
-        # Use a torch-heavy approach if the embeddings are on CUDA, otherwise a loop-heavy one
-        if embeddings.device.type in ["cuda", "npu"]:
-            # Threshold the cos scores and determine how many close embeddings exist per embedding
-            threshold_mask = cos_scores >= threshold
-            row_wise_count = threshold_mask.sum(1)
-
-            # Only consider embeddings with enough close other embeddings
-            large_enough_mask = row_wise_count >= min_community_size
-            if not large_enough_mask.any():
-                continue
+    if neighbor_backend is not None:
+        if top_k is None:
+            top_k = max(2 * min_community_size, 100)
+        top_k = min(top_k, len(embeddings))
+        scores, indices = _self_nearest_neighbors(
+            embeddings,
+            top_k=top_k,
+            neighbor_backend=neighbor_backend,
+            score_function=dot_score,
+            query_chunk_size=batch_size,
+            show_progress_bar=show_progress_bar,
+        )
+        # The neighbors are sorted by decreasing score, so every community is a prefix of the neighbor list
+        row_wise_count = (scores >= threshold).sum(1)
+        large_enough_mask = row_wise_count >= min_community_size
+        for count, row_indices in zip(row_wise_count[large_enough_mask].tolist(), indices[large_enough_mask].tolist()):
+            extracted_communities.append(row_indices[:count])
+    else:
+        for start_idx in tqdm(
+            range(0, len(embeddings), batch_size), desc="Finding clusters", disable=not show_progress_bar
+        ):
+            # Compute cosine similarity scores
+            cos_scores = embeddings[start_idx : start_idx + batch_size] @ embeddings.T
+
+            # Use a torch-heavy approach if the embeddings are on CUDA, otherwise a loop-heavy one
+            if embeddings.device.type in ["cuda", "npu"]:
+                # Threshold the cos scores and determine how many close embeddings exist per embedding
+                threshold_mask = cos_scores >= threshold
+                row_wise_count = threshold_mask.sum(1)
+
+                # Only consider embeddings with enough close other embeddings
+                large_enough_mask = row_wise_count >= min_community_size
+                if not large_enough_mask.any():
+                    continue
 
-            row_wise_count = row_wise_count[large_enough_mask]
-            cos_scores = cos_scores[large_enough_mask]
+                row_wise_count = row_wise_count[large_enough_mask]
+                cos_scores = cos_scores[large_enough_mask]
 
-            # The max is the largest potential community, so we use that in topk
-            k = row_wise_count.max()
-            _, top_k_indices = cos_scores.topk(k=k, largest=True)
+                # The max is the largest potential community, so we use that in topk
+                k = row_wise_count.max()
+                _, top_k_indices = cos_scores.topk(k=k, largest=True)
 
-            # Use the row-wise count to slice the indices
-            for count, indices in zip(row_wise_count, top_k_indices):
-                extracted_communities.append(indices[:count].tolist())
-        else:
-            # Minimum size for a community
-            top_k_values, _ = cos_scores.topk(k=min_community_size, largest=True)
-
-            # Filter for rows >= min_threshold
-            for i in range(len(top_k_values)):
-                if top_k_values[i][-1] >= threshold:
-                    # Only check top k most similar entries
-                    top_val_large, top_idx_large = cos_scores[i].topk(k=sort_max_size, largest=True)
-
-                    # Check if we need to increase sort_max_size
-                    while top_val_large[-1] > threshold and sort_max_size < len(embeddings):
-                        sort_max_size = min(2 * sort_max_size, len(embeddings))
+                # Use the row-wise count to slice the indices
+                for count, indices in zip(row_wise_count, top_k_indices):
+                    extracted_communities.append(indices[:count].tolist())
+            else:
+                # Minimum size for a community
+                top_k_values, _ = cos_scores.topk(k=min_community_size, largest=True)
+
+                # Filter for rows >= min_threshold
+                for i in range(len(top_k_values)):
+                    if top_k_values[i][-1] >= threshold:
+                        # Only check top k most similar entries
                         top_val_large, top_idx_large = cos_scores[i].topk(k=sort_max_size, largest=True)
 
-                    extracted_communities.append(top_idx_large[top_val_large >= threshold].tolist())
+                        # Check if we need to increase sort_max_size
+                        while top_val_large[-1] > threshold and sort_max_size < len(embeddings):
+                            sort_max_size = min(2 * sort_max_size, len(embeddings))
+                            top_val_large, top_idx_large = cos_scores[i].topk(k=sort_max_size, largest=True)
+
+                        extracted_communities.append(top_idx_large[top_val_large >= threshold].tolist())
 
     # Largest cluster first
     extracted_communities = sorted(extracted_communities, key=lambda x: len(x), reverse=True)
@@ -1685,6 +2375,78 @@ def is_training_available() -> bool:
     return is_accelerate_available() and is_datasets_available()
 
 
+def _load_dataset_columns(
+    dataset_path: str,
+    subset: str,
+    columns: list[str],
+    filter_empty: str | None = None,
+    cache_folder: str | None = None,
+    revision: str | None = None,
+) -> dict[str, list]:
+    """
+    Loads the ``columns`` of the "train" split of a subset of a Hugging Face dataset as lists, and stores them in a
+    compact Arrow file in ``cache_folder``. Subsequent calls read the Arrow file directly, without going through
+    ``datasets``, which makes reloading small evaluation datasets (e.g. NanoBEIR) nearly instantaneous.
+
+    Args:
+        dataset_path (str): The name of the dataset on the Hugging Face Hub.
+        subset (str): The subset (i.e. configuration) of the dataset.
+        columns (List[str]): The columns to load.
+        filter_empty (str, optional): If set, rows in which this column is empty are dropped. Defaults to None.
+        cache_folder (str, optional): The directory for the Arrow files. Defaults to None, i.e. a "sentence_transformers"
+            directory in the ``datasets`` cache.
+        revision (str, optional): The version of the dataset to load. It can be a branch name, a tag name, or a commit
+            id. Defaults to None, i.e. the latest version.
+
+    Returns:
+        Dict[str, List]: A mapping from column name to the values of that column.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+
+    if cache_folder is None:
+        from datasets import config
+
+        cache_folder = os.path.join(config.HF_DATASETS_CACHE, "sentence_transformers")
+
+    # The Arrow files are keyed by the commit of the dataset, so that updates to the dataset are picked up. If the commit
+    # cannot be resolved, e.g. for local datasets or in offline mode, the fingerprint of the loaded dataset is used instead
+    dataset = None
+    try:
+        version = dataset_info(dataset_path, revision=revision).sha if not os.path.isdir(dataset_path) else None
+    except (OSError, ValueError):
+        version = None
+    if version is None:
+        from datasets import load_dataset
+
+        dataset = load_dataset(dataset_path, subset, split="train", revision=revision)
+        version = dataset._fingerprint
+    cache_file = os.path.join(
+        cache_folder,
+        dataset_path.replace("/", "--"),
+        version,
+        f"{subset}-{'-'.join(columns)}-{filter_empty or 'all'}.arrow",
+    )
+
+    if os.path.exists(cache_file):
+        table = feather.read_table(cache_file)
+    else:
+        if dataset is None:
+            from datasets import load_dataset
+
+            dataset = load_dataset(dataset_path, subset, split="train", revision=version)
+        table = dataset.select_columns(columns).with_format("arrow")[:]
+        if filter_empty is not None:
+            table = table.filter(pc.greater(pc.utf8_length(table[filter_empty]), 0))
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # Write to a temporary file first, so concurrent processes never read a partially written cache file
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        feather.write_feather(table, tmp_file, compression="zstd")
+        os.replace(tmp_file, cache_file)
+
+    return {column: table[column].to_pylist() for column in columns}
+
+
 @contextmanager
 def disable_datasets_caching():
     """
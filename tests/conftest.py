@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+from typing import Any
 
 import pytest
 
@@ -51,6 +52,27 @@ def distilbert_base_uncased_model() -> SentenceTransformer:
     return model
 
 
+@pytest.fixture()
+def encode_spy(monkeypatch: pytest.MonkeyPatch):
+    """
+    Returns a function that wraps the ``encode`` method of a model to record its calls, as a list of
+    (sentences, keyword arguments) tuples. The original ``encode`` method is restored after the test.
+    """
+
+    def spy(model: SentenceTransformer) -> list[tuple[Any, dict[str, Any]]]:
+        calls = []
+        original_encode = model.encode
+
+        def encode(sentences, **kwargs):
+            calls.append((sentences, kwargs))
+            return original_encode(sentences, **kwargs)
+
+        monkeypatch.setattr(model, "encode", encode)
+        return calls
+
+    return spy
+
+
 @pytest.fixture(scope="session")
 def stsb_dataset_dict() -> DatasetDict:
     return load_dataset("sentence-transformers/stsb")
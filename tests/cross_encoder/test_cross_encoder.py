@@ -3,15 +3,19 @@ from __future__ import annotations
 import json
 import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
 import pytest
 import torch
+from datasets import Dataset
 from huggingface_hub import CommitInfo, HfApi, RepoUrl
 from pytest import FixtureRequest
+from transformers import LlamaConfig, LlamaForSequenceClassification
 
 from sentence_transformers import CrossEncoder
+from sentence_transformers.cross_encoder import ScoreCache
 from sentence_transformers.cross_encoder.util import (
     cross_encoder_init_args_decorator,
     cross_encoder_predict_rank_args_decorator,
@@ -175,6 +179,225 @@ def test_predict_output_types(
         assert isinstance(embeddings, list)
 
 
+@pytest.mark.parametrize("max_tokens_per_batch", [None, 64])
+def test_predict_length_sorted(reranker_bert_tiny_model: CrossEncoder, max_tokens_per_batch: int | None) -> None:
+    model = reranker_bert_tiny_model
+    pairs = [
+        ["How many people live in Berlin?", "Berlin had a population of 3,520,031 registered inhabitants."],
+        ["Short", "Query"],
+        ["What is the capital of France?", "Paris is the capital and most populous city of France. " * 10],
+        ["Who wrote Hamlet?", "Shakespeare"],
+    ]
+    # The pairs are sorted by length for batching, but the scores are returned in the original order
+    expected_scores = np.array([model.predict(pair) for pair in pairs])
+    scores = model.predict(pairs, batch_size=2, max_tokens_per_batch=max_tokens_per_batch)
+    assert scores == pytest.approx(expected_scores, abs=1e-5)
+
+
+def test_predict_score_cache(reranker_bert_tiny_model: CrossEncoder, tmp_path: Path) -> None:
+    model = reranker_bert_tiny_model
+    pairs = [
+        ["How many people live in Berlin?", "Berlin had a population of 3,520,031 registered inhabitants."],
+        ["What is the capital of France?", "Paris is the capital and most populous city of France."],
+        ["Who wrote Hamlet?", "Shakespeare"],
+    ]
+    expected_scores = model.predict(pairs)
+
+    score_cache = ScoreCache(cache_folder=str(tmp_path))
+    scores = model.predict(pairs, score_cache=score_cache)
+    assert scores == pytest.approx(expected_scores, abs=1e-6)
+    assert score_cache.get_stats() == {"memory_hits": 0, "disk_hits": 0, "misses": 3, "hit_rate": 0.0}
+
+    # Cached pairs are not passed through the model again
+    batch_sizes = []
+    hook = model.model.register_forward_pre_hook(
+        lambda module, args, kwargs: batch_sizes.append(kwargs["input_ids"].shape[0]), with_kwargs=True
+    )
+    scores = model.predict(pairs[:2] + [["Who wrote Faust?", "Goethe"]], score_cache=score_cache)
+    hook.remove()
+    assert batch_sizes == [1]
+    assert scores[:2] == pytest.approx(expected_scores[:2], abs=1e-6)
+    assert score_cache.memory_hits == 2
+    assert score_cache.hit_rate == pytest.approx(2 / 6)
+
+    # A new cache with the same folder finds the scores on disk
+    disk_score_cache = ScoreCache(cache_folder=str(tmp_path))
+    scores = model.predict(pairs, score_cache=disk_score_cache)
+    assert scores == pytest.approx(expected_scores, abs=1e-6)
+    assert disk_score_cache.disk_hits == 3
+
+    # The cache can be shared between threads, e.g. between the request handlers of a reranking service
+    thread_score_cache = ScoreCache(cache_folder=str(tmp_path))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        thread_scores = list(
+            executor.map(lambda pair: model.predict([pair], score_cache=thread_score_cache), pairs * 4)
+        )
+    assert np.concatenate(thread_scores) == pytest.approx(np.tile(expected_scores, 4), abs=1e-6)
+    assert thread_score_cache.hits == 12
+
+    # Other activation functions or weights do not reuse the cached scores
+    model.predict(pairs, score_cache=disk_score_cache, activation_fn=torch.nn.Identity())
+    assert disk_score_cache.misses == 3
+    with torch.no_grad():
+        next(model.model.parameters()).add_(1.0)
+    model.predict(pairs, score_cache=disk_score_cache)
+    assert disk_score_cache.misses == 6
+
+
+def test_rank_cascade(reranker_bert_tiny_model: CrossEncoder, caplog: pytest.LogCaptureFixture) -> None:
+    model = reranker_bert_tiny_model
+    query = "How many people live in Berlin?"
+    documents = [
+        f"Document {i}: " + "Berlin had a population of 3,520,031 inhabitants. " * (i % 4 + 1) for i in range(10)
+    ]
+    full_scores = model.predict([[query, document] for document in documents])
+
+    # The top documents are rescored with the full pairs, the others keep their truncated scores. The pairs are
+    # truncated without changing the max_length of the model, which other threads may be using.
+    max_lengths = []
+    hook = model.model.register_forward_pre_hook(lambda *_: max_lengths.append(model.max_length))
+    with caplog.at_level(logging.DEBUG):
+        results = model.rank(query, documents, cascade_max_length=8, cascade_rescore_size=3)
+    hook.remove()
+    assert set(max_lengths) == {model.max_length}
+    assert len(results) == len(documents)
+    for result in results[:3]:
+        assert result["score"] == pytest.approx(full_scores[result["corpus_id"]], abs=1e-5)
+    assert [result["score"] for result in results[:3]] == sorted(
+        [result["score"] for result in results[:3]], reverse=True
+    )
+    assert "The cascade scored" in caplog.text
+
+    # At least top_k documents are rescored
+    results = model.rank(query, documents, top_k=4, cascade_max_length=8, cascade_rescore_size=0.1)
+    assert len(results) == 4
+    for result in results:
+        assert result["score"] == pytest.approx(full_scores[result["corpus_id"]], abs=1e-5)
+
+    # Rescoring all documents with a companion model gives the regular ranking
+    results = model.rank(query, documents, cascade_model=model, cascade_rescore_size=1.0)
+    expected_results = model.rank(query, documents)
+    assert [result["corpus_id"] for result in results] == [result["corpus_id"] for result in expected_results]
+
+    with pytest.raises(ValueError, match="Only one of `cascade_model` and `cascade_max_length` can be set."):
+        model.rank(query, documents, cascade_model=model, cascade_max_length=8)
+
+
+def test_rank_many(reranker_bert_tiny_model: CrossEncoder) -> None:
+    model = reranker_bert_tiny_model
+    queries = ["How many people live in Berlin?", "What is the capital of France?", "Who wrote Hamlet?"]
+    documents_per_query = [
+        ["Berlin had a population of 3,520,031 registered inhabitants.", "Paris", "Berlin is a city. " * 10],
+        [],
+        ["Shakespeare", "Hamlet is a tragedy by William Shakespeare.", "Christopher Marlowe", "Berlin"],
+    ]
+
+    # The pairs of all queries are predicted at once, but the results match ranking every query separately
+    results = model.rank_many(queries, documents_per_query, top_k=2, return_documents=True, batch_size=4)
+    assert len(results) == len(queries)
+    for query, documents, query_results in zip(queries, documents_per_query, results):
+        expected_results = model.rank(query, documents, top_k=2, return_documents=True) if documents else []
+        assert [result["corpus_id"] for result in query_results] == [
+            result["corpus_id"] for result in expected_results
+        ]
+        assert [result["text"] for result in query_results] == [result["text"] for result in expected_results]
+        assert [result["score"] for result in query_results] == pytest.approx(
+            [result["score"] for result in expected_results], abs=1e-5
+        )
+
+    # As arrays, queries with fewer documents are padded with -1 and nan
+    corpus_ids, scores = model.rank_many(queries, documents_per_query, return_arrays=True)
+    assert corpus_ids.shape == scores.shape == (3, 4)
+    assert (corpus_ids[1] == -1).all() and np.isnan(scores[1]).all()
+    assert corpus_ids[0, 3] == -1 and np.isnan(scores[0, 3])
+    assert sorted(corpus_ids[2].tolist()) == [0, 1, 2, 3]
+    assert (np.diff(scores[2]) <= 0).all()
+
+
+def test_rank_cache_query_prefix(reranker_bert_tiny_model: CrossEncoder, tmp_path: Path) -> None:
+    query = "Which city is the capital of France, and what is it known for?"
+    documents = [
+        "Paris is the capital and most populous city of France.",
+        "Berlin",
+        "The capital of France is Paris, known for the Eiffel Tower. " * 5,
+        "Who wrote Hamlet?",
+    ]
+
+    # Encoder-only models do not support a key/value cache, so they fall back to regular predictions
+    assert not reranker_bert_tiny_model._supports_query_prefix_cache()
+    assert reranker_bert_tiny_model.rank(query, documents, cache_query_prefix=True) == reranker_bert_tiny_model.rank(
+        query, documents
+    )
+
+    # Create a tiny decoder reranker, which does support a key/value cache
+    tokenizer = reranker_bert_tiny_model.tokenizer
+    config = LlamaConfig(
+        vocab_size=tokenizer.vocab_size,
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        num_labels=1,
+        pad_token_id=tokenizer.pad_token_id,
+    )
+    LlamaForSequenceClassification(config).save_pretrained(tmp_path)
+    tokenizer.save_pretrained(tmp_path)
+    model = CrossEncoder(str(tmp_path))
+    assert model._supports_query_prefix_cache()
+
+    expected_ranking = model.rank(query, documents, batch_size=2)
+    ranking = model.rank(query, documents, batch_size=2, cache_query_prefix=True)
+    assert [result["corpus_id"] for result in ranking] == [result["corpus_id"] for result in expected_ranking]
+    assert [result["score"] for result in ranking] == pytest.approx(
+        [result["score"] for result in expected_ranking], abs=1e-5
+    )
+
+
+def test_predict_iter(reranker_bert_tiny_model: CrossEncoder) -> None:
+    model = reranker_bert_tiny_model
+    pairs = [[f"Query {i}", "This is a document " * (i % 5 + 1)] for i in range(7)]
+    expected_scores = model.predict(pairs)
+
+    # The pairs are consumed lazily and predicted per chunk
+    score_blocks = list(model.predict_iter((pair for pair in pairs), batch_size=2, chunk_size=3))
+    assert [len(scores) for scores in score_blocks] == [3, 3, 1]
+    assert np.concatenate(score_blocks) == pytest.approx(expected_scores, abs=1e-5)
+
+    # The first two columns of the rows of an IterableDataset are used as the pairs
+    dataset = Dataset.from_dict(
+        {"query": [query for query, _ in pairs], "document": [document for _, document in pairs], "label": [1] * 7}
+    ).to_iterable_dataset()
+    score_blocks = list(model.predict_iter(dataset, chunk_size=4, convert_to_tensor=True))
+    assert all(isinstance(scores, torch.Tensor) for scores in score_blocks)
+    assert torch.cat(score_blocks).cpu().numpy() == pytest.approx(expected_scores, abs=1e-5)
+
+
+@pytest.mark.skip(
+    "This test fails if optimum.intel.openvino is imported, because openvinotoolkit/nncf "
+    "patches torch._C._nn.gelu in a way that breaks pickling."
+)
+def test_predict_multi_process(reranker_bert_tiny_model: CrossEncoder) -> None:
+    model = reranker_bert_tiny_model
+    pairs = [[f"Query {i}", "This is a document " * (i % 7 + 1)] for i in range(40)]
+
+    # Start the multi-process pool on e.g. two CPU devices & compute the scores using the pool
+    pool = model.start_multi_process_pool(["cpu", "cpu"])
+    scores = model.predict_multi_process(pairs, pool, chunk_size=10)
+    assert scores.shape == (len(pairs),)
+
+    # Compare against normal predictions, the scores are returned in the original order
+    assert scores == pytest.approx(model.predict(pairs), abs=1e-5)
+
+    # A failing chunk raises once all chunks are done, so the next call on the pool only gets its own results
+    # The invalid pair is the "longest" pair, so it is in the first chunk that is sent to the processes
+    invalid_pairs = pairs + [["Query", dict.fromkeys(range(1000))]]
+    with pytest.raises(RuntimeError, match="failed in a worker process"):
+        model.predict_multi_process(invalid_pairs, pool, chunk_size=5)
+    assert model.predict_multi_process(pairs, pool, chunk_size=10) == pytest.approx(scores, abs=1e-5)
+    model.stop_multi_process_pool(pool)
+
+
 @pytest.mark.parametrize("safe_serialization", [True, False, None])
 def test_safe_serialization(safe_serialization: bool) -> None:
     with SafeTemporaryDirectory() as cache_folder:
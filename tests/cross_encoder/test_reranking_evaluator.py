@@ -0,0 +1,84 @@
+"""
+Tests the correct computation of evaluation scores from CrossEncoderRerankingEvaluator
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from sentence_transformers import CrossEncoder
+from sentence_transformers.cross_encoder.evaluation import CrossEncoderRerankingEvaluator
+
+QUERY1 = "What is the capital of France?"
+QUERY2 = "How many legs does a spider have?"
+PARIS = "Paris is the capital and largest city of France."
+LYON = "Lyon is the third-largest city of France."
+EIFFEL = "The Eiffel Tower is located in Paris."
+SPIDER = "Spiders have eight legs."
+INSECT = "Insects have six legs and three body parts."
+WEB = "Spiders spin webs to catch their prey."
+
+
+def per_sample_metrics(
+    evaluator: CrossEncoderRerankingEvaluator, model: CrossEncoder, samples: list[dict]
+) -> dict[str, float]:
+    """Computes the mean metrics by predicting and scoring every sample separately"""
+    scores = []
+    for sample in samples:
+        positive = sample["positive"]
+        if "documents" in sample:
+            if evaluator.always_rerank_positives:
+                docs = positive + [doc for doc in sample["documents"] if doc not in positive]
+                is_relevant = [1] * len(positive) + [0] * (len(docs) - len(positive))
+            else:
+                docs = sample["documents"]
+                is_relevant = [int(doc in positive) for doc in docs]
+        else:
+            docs = positive + sample["negative"]
+            is_relevant = [1] * len(positive) + [0] * len(sample["negative"])
+
+        if sum(is_relevant) == 0:
+            scores.append((0, 0, 0))
+            continue
+        pred_scores = model.predict([[sample["query"], doc] for doc in docs], convert_to_numpy=True)
+        scores.append(evaluator.compute_metrics(is_relevant, pred_scores))
+
+    mrr, ndcg, ap = np.mean(scores, axis=0)
+    return {"map": ap, f"mrr@{evaluator.at_k}": mrr, f"ndcg@{evaluator.at_k}": ndcg}
+
+
+def test_CrossEncoderRerankingEvaluator_negatives(reranker_bert_tiny_model: CrossEncoder) -> None:
+    model = reranker_bert_tiny_model
+    samples = [
+        {"query": QUERY1, "positive": [PARIS], "negative": [LYON, EIFFEL, SPIDER]},
+        {"query": QUERY2, "positive": [SPIDER, WEB], "negative": [INSECT, PARIS]},
+        # The same pairs as the first sample, which are only predicted once
+        {"query": QUERY1, "positive": [EIFFEL], "negative": [LYON, PARIS]},
+    ]
+    evaluator = CrossEncoderRerankingEvaluator(samples, at_k=2, write_csv=False)
+    metrics = evaluator(model)
+    assert metrics == pytest.approx(per_sample_metrics(evaluator, model, samples))
+
+
+@pytest.mark.parametrize("always_rerank_positives", [True, False])
+def test_CrossEncoderRerankingEvaluator_documents(
+    reranker_bert_tiny_model: CrossEncoder, always_rerank_positives: bool
+) -> None:
+    model = reranker_bert_tiny_model
+    samples = [
+        {"query": QUERY1, "positive": [PARIS], "documents": [LYON, PARIS, EIFFEL]},
+        # One of the positives is missing from the documents
+        {"query": QUERY2, "positive": [SPIDER, WEB], "documents": [INSECT, SPIDER, PARIS]},
+        # None of the positives are in the documents
+        {"query": QUERY2, "positive": [WEB], "documents": [INSECT, EIFFEL]},
+    ]
+    evaluator = CrossEncoderRerankingEvaluator(
+        samples, at_k=2, always_rerank_positives=always_rerank_positives, write_csv=False
+    )
+    metrics = evaluator(model)
+    expected_metrics = per_sample_metrics(evaluator, model, samples)
+    assert {key: metrics[key] for key in expected_metrics} == pytest.approx(expected_metrics)
+
+    # The documents are ranked by their given order before reranking, with the missing positives at the end
+    assert metrics["base_mrr@2"] == pytest.approx((1 / 2 + 1 / 2 + 0) / 3)
@@ -5,7 +5,7 @@ Tests the correct computation of evaluation scores from BinaryClassificationEval
 from __future__ import annotations
 
 import numpy as np
-from sklearn.metrics import accuracy_score, f1_score
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
 
 from sentence_transformers import (
     evaluation,
@@ -14,8 +14,9 @@ from sentence_transformers import (
 
 def test_BinaryClassificationEvaluator_find_best_f1_and_threshold() -> None:
     """Tests that the F1 score for the computed threshold is correct"""
-    y_true = np.random.randint(0, 2, 1000)
-    y_pred_cosine = np.random.randn(1000)
+    rng = np.random.default_rng(12345)
+    y_true = rng.integers(0, 2, 1000)
+    y_pred_cosine = rng.standard_normal(1000)
     (
         best_f1,
         best_precision,
@@ -31,8 +32,9 @@ def test_BinaryClassificationEvaluator_find_best_f1_and_threshold() -> None:
 
 def test_BinaryClassificationEvaluator_find_best_accuracy_and_threshold() -> None:
     """Tests that the Acc score for the computed threshold is correct"""
-    y_true = np.random.randint(0, 2, 1000)
-    y_pred_cosine = np.random.randn(1000)
+    rng = np.random.default_rng(12345)
+    y_true = rng.integers(0, 2, 1000)
+    y_pred_cosine = rng.standard_normal(1000)
     (
         max_acc,
         threshold,
@@ -42,3 +44,27 @@ def test_BinaryClassificationEvaluator_find_best_accuracy_and_threshold() -> Non
     y_pred_labels = [1 if pred >= threshold else 0 for pred in y_pred_cosine]
     sklearn_acc = accuracy_score(y_true, y_pred_labels)
     assert np.abs(max_acc - sklearn_acc) < 1e-6
+
+
+def test_BinaryClassificationEvaluator_thresholds_with_ties() -> None:
+    """Tests that the scores for the computed thresholds are correct if many scores are tied"""
+    rng = np.random.default_rng(12345)
+    y_true = rng.integers(0, 2, 1000)
+    y_pred_distance = rng.integers(0, 10, 1000).astype(float)
+    max_acc, acc_threshold = evaluation.BinaryClassificationEvaluator.find_best_acc_and_threshold(
+        y_pred_distance, y_true, high_score_more_similar=False
+    )
+    best_f1, best_precision, best_recall, f1_threshold = (
+        evaluation.BinaryClassificationEvaluator.find_best_f1_and_threshold(
+            y_pred_distance, y_true, high_score_more_similar=False
+        )
+    )
+    # The thresholds never split up tied scores
+    assert acc_threshold not in y_pred_distance
+    assert f1_threshold not in y_pred_distance
+
+    assert np.abs(max_acc - accuracy_score(y_true, y_pred_distance <= acc_threshold)) < 1e-6
+    y_pred_labels = y_pred_distance <= f1_threshold
+    assert np.abs(best_f1 - f1_score(y_true, y_pred_labels)) < 1e-6
+    assert np.abs(best_precision - precision_score(y_true, y_pred_labels)) < 1e-6
+    assert np.abs(best_recall - recall_score(y_true, y_pred_labels)) < 1e-6
@@ -0,0 +1,63 @@
+"""
+Tests the correct computation of evaluation scores from EmbeddingSimilarityEvaluator
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from scipy.stats import pearsonr, spearmanr
+
+from sentence_transformers import SentenceTransformer
+from sentence_transformers.evaluation import EmbeddingSimilarityEvaluator
+from sentence_transformers.util import is_datasets_available
+
+
+def test_EmbeddingSimilarityEvaluator_compute_correlations() -> None:
+    """Tests that the vectorized correlations match scipy, also with tied scores"""
+    rng = np.random.default_rng(12345)
+    labels = rng.integers(0, 5, 1000).astype(float)
+    scores = np.stack([rng.standard_normal(1000), rng.integers(0, 10, 1000), -rng.random(1000)])
+    pearson, spearman = EmbeddingSimilarityEvaluator.compute_correlations(labels, scores)
+    for row, row_pearson, row_spearman in zip(scores, pearson, spearman):
+        assert np.abs(row_pearson - pearsonr(labels, row)[0]) < 1e-6
+        assert np.abs(row_spearman - spearmanr(labels, row)[0]) < 1e-6
+
+
+def test_EmbeddingSimilarityEvaluator_deduplicates(stsb_bert_tiny_model: SentenceTransformer, encode_spy) -> None:
+    """Tests that sentences occurring in both lists are only encoded once"""
+    model = stsb_bert_tiny_model
+    sentences1 = ["The cat sits on the mat.", "A man is playing guitar.", "The cat sits on the mat."]
+    sentences2 = ["A man is playing guitar.", "It is raining outside.", "A cat is sitting on a mat."]
+    evaluator = EmbeddingSimilarityEvaluator(
+        sentences1, sentences2, [0.1, 0.2, 0.9], similarity_fn_names=["cosine", "euclidean", "manhattan", "dot"]
+    )
+
+    encode_calls = encode_spy(model)
+    metrics = evaluator(model)
+    assert len(encode_calls) == 1
+    assert sorted(encode_calls[0][0]) == sorted(set(sentences1 + sentences2))
+
+    embeddings1 = model.encode(sentences1)
+    embeddings2 = model.encode(sentences2)
+    cosine_scores = model.similarity_pairwise(embeddings1, embeddings2).numpy()
+    assert metrics["pearson_cosine"] == pytest.approx(pearsonr([0.1, 0.2, 0.9], cosine_scores)[0], abs=1e-5)
+
+
+@pytest.mark.skipif(not is_datasets_available(), reason="Datasets are not installed.")
+def test_EmbeddingSimilarityEvaluator_dataset_columns(stsb_bert_tiny_model: SentenceTransformer) -> None:
+    """Tests that the sentences can be dataset columns, which don't concatenate like lists"""
+    from datasets import Dataset
+
+    dataset = Dataset.from_dict(
+        {
+            "sentence1": ["The cat sits on the mat.", "A man is playing guitar.", "It is raining outside."],
+            "sentence2": ["A cat is sitting on a mat.", "It is raining outside.", "A woman is cooking dinner."],
+            "score": [0.9, 0.1, 0.2],
+        }
+    )
+    evaluator = EmbeddingSimilarityEvaluator(dataset["sentence1"], dataset["sentence2"], dataset["score"])
+    expected_evaluator = EmbeddingSimilarityEvaluator(
+        list(dataset["sentence1"]), list(dataset["sentence2"]), list(dataset["score"])
+    )
+    assert evaluator(stsb_bert_tiny_model) == pytest.approx(expected_evaluator(stsb_bert_tiny_model))
@@ -3,6 +3,7 @@ from __future__ import annotations
 from pathlib import Path
 from unittest.mock import Mock, PropertyMock
 
+import numpy as np
 import pytest
 import torch
 
@@ -125,3 +126,128 @@ def test_metrices(test_data, mock_model, tmp_path: Path):
 
     for key, expected_value in expected_results.items():
         assert results[key] == pytest.approx(expected_value, abs=1e-9)
+
+
+def test_metrices_chunked_corpus(test_data, mock_model):
+    queries, corpus, relevant_docs = test_data
+
+    kwargs = dict(
+        queries=queries,
+        corpus=corpus,
+        relevant_docs=relevant_docs,
+        name="test",
+        accuracy_at_k=[1, 3],
+        precision_recall_at_k=[1, 3],
+        mrr_at_k=[3],
+        ndcg_at_k=[3],
+        map_at_k=[5],
+        write_csv=False,
+    )
+    expected_results = InformationRetrievalEvaluator(**kwargs)(mock_model)
+    # Merging the top-k of several corpus chunks should give the same metrics as a single chunk
+    results = InformationRetrievalEvaluator(corpus_chunk_size=2, **kwargs)(mock_model)
+    assert results == pytest.approx(expected_results)
+
+
+def test_compute_metrics_from_results_list(test_data):
+    queries, corpus, relevant_docs = test_data
+    ir_evaluator = InformationRetrievalEvaluator(
+        queries=queries,
+        corpus=corpus,
+        relevant_docs=relevant_docs,
+        accuracy_at_k=[1, 3],
+        precision_recall_at_k=[1, 3],
+        mrr_at_k=[3],
+        ndcg_at_k=[3],
+        map_at_k=[3],
+    )
+    # Every query retrieves "1" first and "3" second
+    queries_result_list = [
+        [{"corpus_id": "3", "score": 0.5}, {"corpus_id": "1", "score": 0.9}] for _ in ir_evaluator.queries_ids
+    ]
+    metrics = ir_evaluator.compute_metrics(queries_result_list)
+    assert metrics["accuracy@k"] == pytest.approx({1: 0.2, 3: 0.4})
+    assert metrics["precision@k"] == pytest.approx({1: 0.2, 3: 0.4 / 3})
+    assert metrics["recall@k"] == pytest.approx({1: 0.2, 3: 0.3})
+    assert metrics["mrr@k"] == pytest.approx({3: 0.3})
+    # NDCG@3 for query "3" is (1 / log2(3)) / (1 + 1 / log2(3)), as the only relevant hit is at the second position
+    ndcg_query_3 = (1 / np.log2(3)) / (1 + 1 / np.log2(3))
+    assert metrics["ndcg@k"] == pytest.approx({3: (1 + ndcg_query_3) / 5})
+    assert metrics["map@k"] == pytest.approx({3: (1 + 0.25) / 5})
+
+
+def test_fast_eval(test_data, mock_model):
+    queries, corpus, relevant_docs = test_data
+    kwargs = dict(
+        queries=queries,
+        corpus=corpus,
+        relevant_docs=relevant_docs,
+        name="test",
+        accuracy_at_k=[1, 3],
+        precision_recall_at_k=[1, 3],
+        mrr_at_k=[3],
+        ndcg_at_k=[3],
+        map_at_k=[5],
+        write_csv=False,
+    )
+    # Sampling all queries with a full pool of distractors gives the exact metrics, with empty confidence intervals
+    expected_results = InformationRetrievalEvaluator(**kwargs)(mock_model)
+    results = InformationRetrievalEvaluator(fast_eval_num_queries=10, fast_eval_num_distractors=10, **kwargs)(
+        mock_model
+    )
+    assert {key: value for key, value in results.items() if not key.endswith("_ci95")} == pytest.approx(
+        expected_results
+    )
+    assert {key: value for key, value in results.items() if key.endswith("_ci95")} == pytest.approx(
+        {f"{key}_ci95": 0.0 for key in expected_results}
+    )
+
+    # The subsample and the distractors are deterministic, and the corpus is restricted to the relevant documents
+    # of the sampled queries and the distractors
+    evaluators = [
+        InformationRetrievalEvaluator(fast_eval_num_queries=2, fast_eval_num_distractors=1, **kwargs) for _ in range(2)
+    ]
+    fast_evaluator = evaluators[0]._fast_eval_evaluator
+    assert len(fast_evaluator.queries_ids) == 2
+    assert fast_evaluator.queries_ids == evaluators[1]._fast_eval_evaluator.queries_ids
+    assert fast_evaluator.corpus_ids == evaluators[1]._fast_eval_evaluator.corpus_ids
+    sampled_relevant_docs = set().union(*(relevant_docs[query_id] for query_id in fast_evaluator.queries_ids))
+    assert sampled_relevant_docs <= set(fast_evaluator.corpus_ids)
+    assert len(fast_evaluator.corpus_ids) == len(sampled_relevant_docs) + 1
+
+    results = evaluators[0](mock_model)
+    assert set(results.keys()) == set(expected_results.keys()) | {f"{key}_ci95" for key in expected_results}
+
+
+def test_cache_corpus_embeddings(test_data, stsb_bert_tiny_model: SentenceTransformer, encode_spy):
+    queries, corpus, relevant_docs = test_data
+    model = stsb_bert_tiny_model
+    kwargs = dict(queries=queries, corpus=corpus, relevant_docs=relevant_docs, write_csv=False)
+    expected_results = {
+        truncate_dim: InformationRetrievalEvaluator(truncate_dim=truncate_dim, **kwargs)(model)
+        for truncate_dim in (None, 64)
+    }
+
+    evaluators = {
+        truncate_dim: InformationRetrievalEvaluator(truncate_dim=truncate_dim, cache_corpus_embeddings=True, **kwargs)
+        for truncate_dim in (None, 64)
+    }
+    encode_calls = encode_spy(model)
+
+    def num_corpus_encodes() -> int:
+        return sum(sentences == list(corpus.values()) for sentences, _ in encode_calls)
+
+    for _ in range(2):
+        for truncate_dim, evaluator in evaluators.items():
+            assert evaluator(model) == pytest.approx(expected_results[truncate_dim])
+    # The corpus is only encoded once for both dimensions and both evaluations
+    assert num_corpus_encodes() == 1
+    # The cache holds a single entry for the model, which is released together with the model
+    assert len(InformationRetrievalEvaluator._corpus_embeddings_cache[model]) == 1
+
+    # Updating the model weights invalidates the cache
+    with torch.no_grad():
+        next(model.parameters()).add_(1.0)
+    evaluators[64](model)
+    assert num_corpus_encodes() == 2
+    assert len(InformationRetrievalEvaluator._corpus_embeddings_cache[model]) == 1
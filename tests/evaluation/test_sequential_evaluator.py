@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sentence_transformers import SentenceTransformer
+from sentence_transformers.evaluation import (
+    BinaryClassificationEvaluator,
+    EmbeddingCache,
+    EmbeddingSimilarityEvaluator,
+    InformationRetrievalEvaluator,
+    SequentialEvaluator,
+    TripletEvaluator,
+)
+
+SENTENCES1 = ["The cat sits on the mat.", "A man is playing guitar.", "It is raining outside.", "She reads a book."]
+SENTENCES2 = ["A cat is sitting on a mat.", "A woman is cooking dinner.", "The weather is wet today.", "He is asleep."]
+NEGATIVES = ["The stock market fell.", "A dog runs in the park.", "Paris is in France.", "The soup is hot."]
+
+
+def get_evaluators(truncate_dims: list[int | None]) -> list[EmbeddingSimilarityEvaluator]:
+    evaluators = []
+    for truncate_dim in truncate_dims:
+        evaluators += [
+            EmbeddingSimilarityEvaluator(
+                SENTENCES1,
+                SENTENCES2,
+                [0.9, 0.1, 0.7, 0.2],
+                similarity_fn_names=["cosine", "dot"],
+                truncate_dim=truncate_dim,
+                name=f"sts_{truncate_dim}",
+            ),
+            TripletEvaluator(
+                SENTENCES1, SENTENCES2, NEGATIVES, truncate_dim=truncate_dim, name=f"triplet_{truncate_dim}"
+            ),
+            BinaryClassificationEvaluator(
+                SENTENCES1, SENTENCES2, [1, 0, 1, 0], truncate_dim=truncate_dim, name=f"binary_{truncate_dim}"
+            ),
+            InformationRetrievalEvaluator(
+                queries=dict(enumerate(SENTENCES1)),
+                corpus=dict(enumerate(SENTENCES2 + NEGATIVES)),
+                relevant_docs={idx: {idx} for idx in range(len(SENTENCES1))},
+                truncate_dim=truncate_dim,
+                name=f"ir_{truncate_dim}",
+                write_csv=False,
+            ),
+        ]
+    return evaluators
+
+
+def test_sequential_evaluator_cache_embeddings(stsb_bert_tiny_model: SentenceTransformer, encode_spy) -> None:
+    model = stsb_bert_tiny_model
+    truncate_dims = [None, 64, 32]
+    expected_results = SequentialEvaluator(get_evaluators(truncate_dims))(model)
+
+    encode_calls = encode_spy(model)
+    results = SequentialEvaluator(get_evaluators(truncate_dims), cache_embeddings=True)(model)
+    assert results == pytest.approx(expected_results, abs=1e-5)
+    # The deduplicated sentences of all evaluators and dimensions are encoded together, at full dimensionality
+    assert len(encode_calls) == 1
+    assert sorted(encode_calls[0][0]) == sorted(set(SENTENCES1 + SENTENCES2 + NEGATIVES))
+    # The cache is only active during the evaluation
+    assert EmbeddingCache.get_active() is None
+
+
+def test_embedding_cache_truncation(stsb_bert_tiny_model: SentenceTransformer) -> None:
+    model = stsb_bert_tiny_model
+    evaluator = EmbeddingSimilarityEvaluator(SENTENCES1, SENTENCES2, [0.9, 0.1, 0.7, 0.2])
+    expected_embeddings = model.encode(SENTENCES1, normalize_embeddings=True)
+    with EmbeddingCache():
+        embeddings = evaluator.embed_inputs(model, SENTENCES1, truncate_dim=32, normalize_embeddings=True)
+        assert embeddings.shape == (len(SENTENCES1), 32)
+        with model.truncate_sentence_embeddings(32):
+            assert embeddings == pytest.approx(model.encode(SENTENCES1, normalize_embeddings=True), abs=1e-6)
+
+        embeddings = evaluator.embed_inputs(model, SENTENCES1, normalize_embeddings=True)
+        assert embeddings == pytest.approx(expected_embeddings, abs=1e-6)
+
+
+def test_embedding_cache_incremental_encodes(stsb_bert_tiny_model: SentenceTransformer) -> None:
+    """Tests that encoding one sentence at a time fills a geometrically growing buffer"""
+    model = stsb_bert_tiny_model
+    sentences = SENTENCES1 + SENTENCES2 + NEGATIVES
+    with EmbeddingCache() as cache:
+        for sentence in sentences:
+            cache.encode(model, [sentence])
+        embeddings = cache.encode(model, sentences[::-1])
+        assert len(cache.embeddings[(model, None)]) == 16
+    assert embeddings == pytest.approx(model.encode(sentences[::-1], convert_to_tensor=True), abs=1e-6)
+
+
+def test_embedding_cache_is_thread_local() -> None:
+    """Tests that a cache that is active in one thread is not used by evaluations in other threads"""
+    with EmbeddingCache() as cache:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(EmbeddingCache.get_active).result() is None
+        assert EmbeddingCache.get_active() is cache
+    assert EmbeddingCache.get_active() is None
+
+
+def test_embedding_cache_prefetch_prompts(stsb_bert_tiny_model: SentenceTransformer, encode_spy) -> None:
+    model = stsb_bert_tiny_model
+    evaluators = [
+        InformationRetrievalEvaluator(
+            queries=dict(enumerate(SENTENCES1)),
+            corpus=dict(enumerate(SENTENCES2 + NEGATIVES)),
+            relevant_docs={idx: {idx} for idx in range(len(SENTENCES1))},
+            query_prompt="query: ",
+            name=name,
+            write_csv=False,
+        )
+        for name in ["first", "second"]
+    ]
+    encode_calls = encode_spy(model)
+    with EmbeddingCache() as cache:
+        cache.prefetch(model, evaluators)
+        for evaluator in evaluators:
+            evaluator(model)
+    # The queries and the corpus use different prompts, so they are encoded separately, but only once
+    assert sorted((sentences, kwargs["prompt"]) for sentences, kwargs in encode_calls) == sorted(
+        [(SENTENCES1, "query: "), (SENTENCES2 + NEGATIVES, None)]
+    )
@@ -0,0 +1,69 @@
+"""
+Tests the correct computation of evaluation scores from TranslationEvaluator
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from sentence_transformers import SentenceTransformer
+from sentence_transformers.evaluation import TranslationEvaluator
+from sentence_transformers.util import cos_sim
+
+SOURCE_SENTENCES = [
+    "The cat sits on the mat.",
+    "A man is playing guitar.",
+    "It is raining outside.",
+    "She reads a book in the garden.",
+    "The stock market fell sharply today.",
+    "Children are playing in the park.",
+    "He is cooking dinner for his family.",
+]
+TARGET_SENTENCES = [
+    "A cat is sitting on a mat.",
+    "Someone plays the guitar.",
+    "The weather outside is wet.",
+    "A woman is reading in the garden.",
+    "Share prices dropped a lot today.",
+    "Kids play in a park.",
+    "A man prepares a meal for his family.",
+]
+
+
+def test_TranslationEvaluator(stsb_bert_tiny_model: SentenceTransformer) -> None:
+    """Tests that the accuracies match a brute-force argmax over the full similarity matrix"""
+    model = stsb_bert_tiny_model
+    evaluator = TranslationEvaluator(SOURCE_SENTENCES, TARGET_SENTENCES, name="translation")
+    metrics = evaluator(model)
+
+    similarities = cos_sim(model.encode(SOURCE_SENTENCES), model.encode(TARGET_SENTENCES))
+    labels = torch.arange(len(SOURCE_SENTENCES))
+    expected_src2trg = (similarities.argmax(dim=1) == labels).float().mean().item()
+    expected_trg2src = (similarities.argmax(dim=0) == labels).float().mean().item()
+    assert metrics == pytest.approx(
+        {
+            "translation_src2trg_accuracy": expected_src2trg,
+            "translation_trg2src_accuracy": expected_trg2src,
+            "translation_mean_accuracy": (expected_src2trg + expected_trg2src) / 2,
+        }
+    )
+
+
+def test_TranslationEvaluator_print_wrong_matches(stsb_bert_tiny_model: SentenceTransformer, capsys) -> None:
+    """Tests the printed wrong matches if there are fewer than 5 targets to print"""
+    model = stsb_bert_tiny_model
+    # Every text is most similar to its exact copy, so the last two sources are matched with the wrong target
+    source_sentences = ["The cat sits on the mat.", "A man is playing guitar.", "It is raining.", "He sleeps."]
+    target_sentences = ["The cat sits on the mat.", "A man is playing guitar.", "He sleeps.", "It is raining."]
+    evaluator = TranslationEvaluator(source_sentences, target_sentences, print_wrong_matches=True)
+    metrics = evaluator(model)
+    assert metrics == pytest.approx({"src2trg_accuracy": 0.5, "trg2src_accuracy": 0.5, "mean_accuracy": 0.5})
+
+    output = capsys.readouterr().out
+    assert "Source 2 is most similar to target 3 instead of target 2" in output
+    assert "Source 3 is most similar to target 2 instead of target 3" in output
+    assert output.count("Incorrect") == 2
+    # All 4 targets are listed for both wrong matches, without the padding of the missing 5th neighbor
+    listed_targets = [line.split()[0] for line in output.splitlines() if line.startswith("\t")]
+    assert sorted(listed_targets) == sorted(["0", "1", "2", "3"] * 2)
@@ -4,8 +4,16 @@ Tests the correct computation of evaluation scores from TripletEvaluator
 
 from __future__ import annotations
 
+import pytest
+
 from sentence_transformers import SentenceTransformer
 from sentence_transformers.evaluation import TripletEvaluator
+from sentence_transformers.util import (
+    is_datasets_available,
+    pairwise_cos_sim,
+    pairwise_dot_score,
+    pairwise_euclidean_sim,
+)
 
 
 def test_TripletEvaluator(stsb_bert_tiny_model: SentenceTransformer) -> None:
@@ -34,3 +42,51 @@ def test_TripletEvaluator(stsb_bert_tiny_model: SentenceTransformer) -> None:
     evaluator_with_margin = TripletEvaluator(anchors, positives, negatives, margin=0.7, name="all_nli_dev")
     metrics = evaluator_with_margin(model)
     assert metrics[evaluator.primary_metric] == 0.0
+
+
+def test_TripletEvaluator_deduplicates(stsb_bert_tiny_model: SentenceTransformer, encode_spy) -> None:
+    """Tests that texts repeated across the anchors, positives and negatives are only encoded once"""
+    model = stsb_bert_tiny_model
+    anchors = ["Children smiling and waving at camera", "Children smiling and waving at camera", "A boy skates."]
+    positives = ["There are children looking at the camera.", "The kids are smiling", "The boy skates."]
+    negatives = ["The kids are frowning", "The kids are frowning", "There are children looking at the camera."]
+    evaluator = TripletEvaluator(anchors, positives, negatives, similarity_fn_names=["cosine", "dot", "euclidean"])
+
+    # The expected accuracies are computed from separate encodes of the anchors, positives and negatives
+    anchor_embeddings = model.encode(anchors, convert_to_tensor=True)
+    positive_embeddings = model.encode(positives, convert_to_tensor=True)
+    negative_embeddings = model.encode(negatives, convert_to_tensor=True)
+    expected_metrics = {}
+    for fn_name, pairwise_fn in [
+        ("cosine", pairwise_cos_sim),
+        ("dot", pairwise_dot_score),
+        ("euclidean", pairwise_euclidean_sim),
+    ]:
+        positive_scores = pairwise_fn(anchor_embeddings, positive_embeddings)
+        negative_scores = pairwise_fn(anchor_embeddings, negative_embeddings)
+        expected_metrics[f"{fn_name}_accuracy"] = (positive_scores > negative_scores).float().mean().item()
+    expected_metrics["max_accuracy"] = max(expected_metrics.values())
+
+    encode_calls = encode_spy(model)
+    assert evaluator(model) == pytest.approx(expected_metrics)
+    assert len(encode_calls) == 1
+    assert sorted(encode_calls[0][0]) == sorted(set(anchors + positives + negatives))
+
+
+@pytest.mark.skipif(not is_datasets_available(), reason="Datasets are not installed.")
+def test_TripletEvaluator_dataset_columns(stsb_bert_tiny_model: SentenceTransformer) -> None:
+    """Tests that the texts can be dataset columns, which don't concatenate like lists"""
+    from datasets import Dataset
+
+    dataset = Dataset.from_dict(
+        {
+            "anchor": ["Children smiling and waving at camera", "A boy skates."],
+            "positive": ["There are children looking at the camera.", "The boy skates."],
+            "negative": ["The kids are frowning", "There are children looking at the camera."],
+        }
+    )
+    evaluator = TripletEvaluator(dataset["anchor"], dataset["positive"], dataset["negative"])
+    expected_evaluator = TripletEvaluator(
+        list(dataset["anchor"]), list(dataset["positive"]), list(dataset["negative"])
+    )
+    assert evaluator(stsb_bert_tiny_model) == pytest.approx(expected_evaluator(stsb_bert_tiny_model))
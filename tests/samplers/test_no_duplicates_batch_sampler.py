@@ -99,3 +99,32 @@ def test_proportional_no_duplicates(dummy_duplicates_dataset: Dataset, drop_last
         # and it would require more (non-complete) batches to get all data.
         assert len(batches) == 18
         assert len(sum(batches, [])) == 34
+
+
+@pytest.mark.parametrize("drop_last", [True, False])
+def test_no_duplicates_mixed_value_types(drop_last: bool) -> None:
+    # Values are compared by their string representation, so the integer 1 and the string "1" are duplicates,
+    # as are a missing value and the string "None"
+    dataset = Dataset.from_dict(
+        {
+            "anchor": ["1", "a", None, "b", "c", "None", "d", "e"],
+            "positive": ["x1", "x2", "x3", "x4", "x5", "x6", "x7", "x8"],
+            "score": [5, 1, 6, 7, 8, 9, 10, 11],
+            "anchor_prompt_length": [1] * 8,
+        }
+    )
+    sampler = NoDuplicatesBatchSampler(dataset, batch_size=4, drop_last=drop_last, generator=torch.Generator(), seed=3)
+    batches = list(sampler)
+    assert all(len(batch) == 4 for batch in batches) or not drop_last
+    for batch in batches:
+        values = [
+            str(value) for index in batch for key, value in dataset[index].items() if key != "anchor_prompt_length"
+        ]
+        assert len(values) == len(set(values)), f"Batch {batch} contains duplicate values: {values}"
+    if not drop_last:
+        assert sorted(sum(batches, [])) == list(range(len(dataset)))
+
+    # The batches only depend on the seed and the epoch
+    assert list(sampler) == batches
+    sampler.set_epoch(1)
+    assert list(sampler) != batches
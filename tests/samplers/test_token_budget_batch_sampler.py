@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import pytest
+import torch
+
+from sentence_transformers.sampler import TokenBudgetBatchSampler
+from sentence_transformers.util import is_datasets_available
+
+if is_datasets_available():
+    from datasets import Dataset
+else:
+    pytest.skip(
+        reason='Sentence Transformers was not installed with the `["train"]` extra.',
+        allow_module_level=True,
+    )
+
+
+@pytest.fixture
+def pretokenized_dataset() -> Dataset:
+    """
+    Dummy pre-tokenized dataset for testing purposes, with anchors of 1 to 10 tokens and positives of 5 tokens.
+    """
+    anchor_lengths = [i % 10 + 1 for i in range(100)]
+    return Dataset.from_dict(
+        {
+            "anchor_input_ids": [list(range(length)) for length in anchor_lengths],
+            "anchor_length": anchor_lengths,
+            "positive_input_ids": [list(range(5))] * 100,
+            "positive_length": [5] * 100,
+        }
+    )
+
+
+@pytest.mark.parametrize("drop_last", [True, False])
+def test_token_budget_batch_sampler(pretokenized_dataset: Dataset, drop_last: bool) -> None:
+    max_tokens_per_batch = 64
+    sampler = TokenBudgetBatchSampler(
+        pretokenized_dataset,
+        batch_size=8,
+        drop_last=drop_last,
+        generator=torch.Generator(),
+        seed=12,
+        max_tokens_per_batch=max_tokens_per_batch,
+    )
+    batches = list(sampler)
+    assert len(batches) == len(sampler)
+
+    for batch in batches:
+        assert 1 <= len(batch) <= 8
+        max_anchor_length = max(pretokenized_dataset[index]["anchor_length"] for index in batch)
+        assert len(batch) * (max_anchor_length + 5) <= max_tokens_per_batch
+
+    indices = sum(batches, [])
+    assert len(indices) == len(set(indices))
+    if drop_last:
+        assert len(indices) < len(pretokenized_dataset)
+    else:
+        assert sorted(indices) == list(range(len(pretokenized_dataset)))
+
+    # The batches are reproducible per epoch
+    assert list(sampler) == batches
+    sampler.set_epoch(1)
+    assert list(sampler) != batches
+
+
+def test_token_budget_batch_sampler_requires_pretokenized_dataset() -> None:
+    dataset = Dataset.from_dict({"anchor": ["a", "b"], "positive": ["c", "d"]})
+    with pytest.raises(ValueError, match="requires a dataset that was pre-tokenized"):
+        TokenBudgetBatchSampler(dataset, batch_size=2, drop_last=False)
@@ -4,12 +4,14 @@ import re
 import tempfile
 from contextlib import nullcontext
 from copy import deepcopy
+from functools import partial
 from pathlib import Path
 
 import pytest
 import torch
 from datasets.dataset_dict import DatasetDict
 from torch.utils.data import ConcatDataset
+from transformers import TrainerState
 
 from sentence_transformers import SentenceTransformer, SentenceTransformerTrainer, losses
 from sentence_transformers.evaluation import EmbeddingSimilarityEvaluator
@@ -21,6 +23,7 @@ from sentence_transformers.sampler import (
     ProportionalBatchSampler,
     RoundRobinBatchSampler,
     SubsetRandomSampler,
+    TokenBudgetBatchSampler,
 )
 from sentence_transformers.training_args import SentenceTransformerTrainingArguments
 from sentence_transformers.util import is_datasets_available, is_training_available
@@ -680,6 +683,151 @@ def test_trainer_no_eval_dataset_with_eval_strategy(
         )
 
 
+def test_trainer_async_evaluation_errors(
+    stsb_bert_tiny_model: SentenceTransformer, stsb_dataset_dict: DatasetDict, tmp_path: Path
+) -> None:
+    model = stsb_bert_tiny_model
+    train_dataset = stsb_dataset_dict["train"].select(range(10))
+    eval_dataset = stsb_dataset_dict["validation"].select(range(10))
+    evaluator = EmbeddingSimilarityEvaluator(
+        sentences1=eval_dataset["sentence1"],
+        sentences2=eval_dataset["sentence2"],
+        scores=[score / 5 for score in eval_dataset["score"]],
+        name="stsb-validation",
+    )
+    loss = losses.CosineSimilarityLoss(model=model)
+
+    # The evaluator is sent to a background process, so it must be picklable
+    unpicklable_evaluator = deepcopy(evaluator)
+    unpicklable_evaluator.score_fn = lambda x, y: x @ y.T
+    args = SentenceTransformerTrainingArguments(output_dir=tmp_path, eval_strategy="steps", async_evaluation=True)
+    with pytest.raises(ValueError, match="`async_evaluation=True` requires a picklable evaluator"):
+        SentenceTransformerTrainer(
+            model=model, args=args, train_dataset=train_dataset, loss=loss, evaluator=unpicklable_evaluator
+        )
+
+    # Whether to save a checkpoint with `save_strategy="best"` is only known once its evaluation finished
+    args = SentenceTransformerTrainingArguments(
+        output_dir=tmp_path,
+        eval_strategy="steps",
+        save_strategy="best",
+        metric_for_best_model="eval_stsb-validation_spearman_cosine",
+        async_evaluation=True,
+    )
+    with pytest.raises(ValueError, match="`async_evaluation=True` is not supported with `save_strategy='best'`"):
+        SentenceTransformerTrainer(model=model, args=args, train_dataset=train_dataset, loss=loss, evaluator=evaluator)
+
+    args = SentenceTransformerTrainingArguments(output_dir=tmp_path, eval_strategy="steps", async_evaluation=True)
+    SentenceTransformerTrainer(model=model, args=args, train_dataset=train_dataset, loss=loss, evaluator=evaluator)
+
+
+def test_trainer_async_evaluation(
+    stsb_bert_tiny_model: SentenceTransformer, stsb_dataset_dict: DatasetDict, tmp_path: Path
+) -> None:
+    model = stsb_bert_tiny_model
+    train_dataset = stsb_dataset_dict["train"].select(range(16))
+    eval_dataset = stsb_dataset_dict["validation"].select(range(10))
+    evaluator = EmbeddingSimilarityEvaluator(
+        sentences1=eval_dataset["sentence1"],
+        sentences2=eval_dataset["sentence2"],
+        scores=[score / 5 for score in eval_dataset["score"]],
+        name="stsb-validation",
+    )
+    loss = losses.CosineSimilarityLoss(model=model)
+    metric_for_best_model = "eval_stsb-validation_spearman_cosine"
+    args = SentenceTransformerTrainingArguments(
+        output_dir=tmp_path,
+        max_steps=6,
+        per_device_train_batch_size=2,
+        learning_rate=1e-3,
+        eval_strategy="steps",
+        eval_steps=2,
+        save_steps=2,
+        save_total_limit=1,
+        load_best_model_at_end=True,
+        metric_for_best_model=metric_for_best_model,
+        async_evaluation=True,
+        report_to="none",
+    )
+    trainer = SentenceTransformerTrainer(
+        model=model, args=args, train_dataset=train_dataset, loss=loss, evaluator=evaluator
+    )
+    trainer.train()
+
+    # Every evaluation is logged once it finishes, in the order of the evaluated steps
+    eval_logs = [logs for logs in trainer.state.log_history if metric_for_best_model in logs]
+    assert len(eval_logs) == 3
+    assert all(
+        key.startswith("eval_stsb-validation_") for logs in eval_logs for key in logs if key not in ("epoch", "step")
+    )
+    # The evaluations are logged at the steps that were evaluated, not at the step at which they finished
+    assert [logs["step"] for logs in eval_logs] == [2, 4, 6]
+    scores = {logs["step"]: logs[metric_for_best_model] for logs in eval_logs}
+
+    # The checkpoint of the best step was protected from the rotation while it was being evaluated
+    best_step = max(scores, key=scores.get)
+    assert trainer.state.best_metric == scores[best_step]
+    assert trainer.state.best_model_checkpoint == str(tmp_path / f"checkpoint-{best_step}")
+    assert Path(trainer.state.best_model_checkpoint).is_dir()
+
+    # The trainer states of the checkpoints saved before their evaluation finished are updated with its results
+    checkpoint_dirs = list(tmp_path.glob("checkpoint-*"))
+    assert checkpoint_dirs
+    for checkpoint_dir in checkpoint_dirs:
+        checkpoint_state = TrainerState.load_from_json(str(checkpoint_dir / "trainer_state.json"))
+        assert checkpoint_state.best_metric == scores[best_step]
+        assert checkpoint_state.best_model_checkpoint == trainer.state.best_model_checkpoint
+        assert checkpoint_state.global_step in [
+            logs["step"] for logs in checkpoint_state.log_history if metric_for_best_model in logs
+        ]
+
+    # The metrics of every evaluated step are stored in the model card training logs
+    training_logs = {logs["Step"]: logs for logs in model.model_card_data.training_logs}
+    for step, score in scores.items():
+        assert training_logs[step]["stsb-validation_spearman_cosine"] == pytest.approx(score)
+    assert model.model_card_data.best_model_step == best_step
+
+
+def test_trainer_pretokenized_dataset(
+    stsb_bert_tiny_model: SentenceTransformer, stsb_dataset_dict: DatasetDict, tmp_path: Path
+) -> None:
+    model = stsb_bert_tiny_model
+    train_dataset = stsb_dataset_dict["train"].select(range(20))
+    loss = losses.CosineSimilarityLoss(model=model)
+    args = SentenceTransformerTrainingArguments(
+        output_dir=tmp_path,
+        num_train_epochs=1,
+        per_device_train_batch_size=8,
+        batch_sampler=partial(TokenBudgetBatchSampler, max_tokens_per_batch=256),
+        report_to="none",
+    )
+    trainer = SentenceTransformerTrainer(model=model, args=args, train_dataset=train_dataset, loss=loss)
+    data_collator = trainer.data_collator
+
+    # The text columns are replaced in-place by their token ids and lengths
+    pretokenized_dataset = data_collator.pretokenize_dataset(train_dataset)
+    assert pretokenized_dataset.column_names == [
+        "sentence1_input_ids",
+        "sentence1_token_type_ids",
+        "sentence1_length",
+        "sentence2_input_ids",
+        "sentence2_token_type_ids",
+        "sentence2_length",
+        "score",
+    ]
+
+    # Padding the pre-tokenized columns gives the same batch as tokenizing the texts
+    batch = data_collator([train_dataset[idx] for idx in range(4)])
+    pretokenized_batch = data_collator([pretokenized_dataset[idx] for idx in range(4)])
+    assert list(batch.keys()) == list(pretokenized_batch.keys())
+    for key, value in batch.items():
+        assert torch.equal(value, pretokenized_batch[key])
+
+    trainer = SentenceTransformerTrainer(model=model, args=args, train_dataset=pretokenized_dataset, loss=loss)
+    assert isinstance(trainer.get_train_dataloader().batch_sampler, TokenBudgetBatchSampler)
+    trainer.train()
+
+
 def test_trainer_get_batch_sampler_class(
     stsb_bert_tiny_model: SentenceTransformer, stsb_dataset_dict: DatasetDict
 ) -> None:
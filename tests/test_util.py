@@ -275,3 +275,187 @@ def test_community_detection_gpu_support():
     ]
     result = community_detection(embeddings, threshold=0.8, min_community_size=2)
     assert sorted([sorted(community) for community in result]) == sorted([sorted(community) for community in expected])
+
+
+@pytest.mark.parametrize("backend", ["exact", "ivf"])
+def test_nearest_neighbors(backend: str) -> None:
+    """Tests util.nearest_neighbors against a full similarity matrix"""
+    generator = torch.Generator().manual_seed(12)
+    centers = torch.randn(20, 32, generator=generator)
+    query_emb = util.normalize_embeddings(centers.repeat(5, 1) + 0.1 * torch.randn(100, 32, generator=generator))
+    doc_emb = util.normalize_embeddings(centers.repeat(50, 1) + 0.1 * torch.randn(1000, 32, generator=generator))
+
+    scores, indices = util.nearest_neighbors(
+        query_emb, doc_emb, top_k=10, backend=backend, query_chunk_size=7, corpus_chunk_size=33
+    )
+    assert scores.shape == indices.shape == (100, 10)
+
+    expected_scores, expected_indices = (query_emb @ doc_emb.T).topk(10)
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(indices.tolist(), expected_indices.tolist())])
+    if backend == "exact":
+        assert torch.allclose(scores, expected_scores, atol=1e-5)
+        assert recall == 1.0
+    else:
+        assert recall > 0.9
+
+
+def test_nearest_neighbors_padding() -> None:
+    """Tests that util.nearest_neighbors pads the results if the corpus is smaller than top_k"""
+    scores, indices = util.nearest_neighbors(torch.randn(4, 8), torch.randn(3, 8), top_k=5)
+    assert scores.shape == indices.shape == (4, 5)
+    assert (indices[:, 3:] == -1).all()
+    assert torch.isinf(scores[:, 3:]).all()
+
+
+@pytest.mark.parametrize("margin", ["ratio", "distance", "csls"])
+def test_margin_mining(margin: str, tmp_path) -> None:
+    """Tests util.margin_mining against margin scores computed from the full similarity matrix"""
+    generator = torch.Generator().manual_seed(12)
+    source_emb = util.normalize_embeddings(torch.randn(60, 16, generator=generator))
+    target_emb = util.normalize_embeddings(
+        torch.cat(
+            [
+                source_emb[:40] + 0.1 * torch.randn(40, 16, generator=generator),
+                torch.randn(30, 16, generator=generator),
+            ]
+        )
+    )
+    sims = source_emb @ target_emb.T
+    forward_mean = sims.topk(4, dim=1).values.mean(dim=1)
+    backward_mean = sims.T.topk(4, dim=1).values.mean(dim=1)
+    neighbor_means = (forward_mean[:, None] + backward_mean[None, :]) / 2
+    expected = {"ratio": sims / neighbor_means, "distance": sims - neighbor_means, "csls": 2 * (sims - neighbor_means)}
+
+    scores, source_indices, target_indices = util.margin_mining(
+        source_emb, target_emb, top_k=4, margin=margin, mode="intersect", cache_folder=str(tmp_path)
+    )
+    assert torch.allclose(scores, expected[margin][source_indices, target_indices], atol=1e-5)
+    assert (scores[:-1] >= scores[1:]).all()
+    # The translated sentences are mutually each other's best candidates
+    assert {(i, i) for i in range(40)} <= set(zip(source_indices.tolist(), target_indices.tolist()))
+
+    # The neighbor statistics are cached, so mining again with another mode gives consistent results
+    assert len(list(tmp_path.iterdir())) == 1
+    max_scores, max_source_indices, max_target_indices = util.margin_mining(
+        source_emb, target_emb, top_k=4, margin=margin, mode="max", cache_folder=str(tmp_path)
+    )
+    assert len(list(tmp_path.iterdir())) == 1
+    max_pairs = set(zip(max_source_indices.tolist(), max_target_indices.tolist()))
+    assert set(zip(source_indices.tolist(), target_indices.tolist())) <= max_pairs
+    assert len(max_pairs) == len(max_scores)
+
+
+@pytest.mark.parametrize("neighbor_backend", ["exact", "ivf"])
+def test_paraphrase_mining_embeddings_neighbor_backend(neighbor_backend: str) -> None:
+    embeddings = torch.randn(200, 16)
+    expected = util.paraphrase_mining_embeddings(embeddings, top_k=5)
+    pairs = util.paraphrase_mining_embeddings(embeddings, top_k=5, neighbor_backend=neighbor_backend)
+    assert all(i < j for _, i, j in pairs)
+    assert [score for score, _, _ in pairs] == sorted([score for score, _, _ in pairs], reverse=True)
+    if neighbor_backend == "exact":
+        assert {(i, j) for _, i, j in pairs} == {(i, j) for _, i, j in expected}
+
+
+@pytest.mark.parametrize("neighbor_backend", ["exact", "ivf"])
+def test_community_detection_neighbor_backend(neighbor_backend: str) -> None:
+    """Test case with two clear communities, using a nearest neighbor backend."""
+    embeddings = torch.tensor(
+        [
+            [1.0, 0.0, 0.0],  # Point 0
+            [0.9, 0.1, 0.0],  # Point 1
+            [0.8, 0.2, 0.0],  # Point 2
+            [0.1, 0.9, 0.0],  # Point 3
+            [0.0, 1.0, 0.0],  # Point 4
+            [0.2, 0.8, 0.0],  # Point 5
+        ]
+    )
+    expected = [
+        [0, 1, 2],  # Community 1
+        [3, 4, 5],  # Community 2
+    ]
+    result = community_detection(embeddings, threshold=0.8, min_community_size=2, neighbor_backend=neighbor_backend)
+    assert sorted([sorted(community) for community in result]) == sorted([sorted(community) for community in expected])
+
+
+@pytest.mark.parametrize("with_ties", [False, True])
+def test_ragged_ranking_metrics(with_ties: bool) -> None:
+    """Tests that util.ragged_ranking_metrics matches the per-query sklearn metrics"""
+    rng = np.random.default_rng(12345)
+    num_documents = rng.integers(2, 30, size=50)
+    offsets = np.concatenate([[0], np.cumsum(num_documents)])
+    scores = rng.integers(0, 5, size=offsets[-1]).astype(float) if with_ties else rng.normal(size=offsets[-1])
+    is_relevant = rng.random(offsets[-1]) < 0.3
+    at_k = 5
+
+    mrr, ndcg, ap = util.ragged_ranking_metrics(scores, is_relevant, offsets, at_k=at_k)
+    for query_idx, (start_idx, end_idx) in enumerate(zip(offsets[:-1], offsets[1:])):
+        query_scores = scores[start_idx:end_idx]
+        query_is_relevant = is_relevant[start_idx:end_idx].astype(int)
+        if query_is_relevant.sum() == 0:
+            assert mrr[query_idx] == ndcg[query_idx] == ap[query_idx] == 0
+            continue
+
+        ranking = np.argsort(query_scores, kind="stable")[::-1][:at_k]
+        relevant_ranks = np.flatnonzero(query_is_relevant[ranking])
+        expected_mrr = 1 / (relevant_ranks[0] + 1) if len(relevant_ranks) else 0
+        assert mrr[query_idx] == pytest.approx(expected_mrr)
+        assert ndcg[query_idx] == pytest.approx(
+            sklearn.metrics.ndcg_score([query_is_relevant], [query_scores], k=at_k)
+        )
+        assert ap[query_idx] == pytest.approx(sklearn.metrics.average_precision_score(query_is_relevant, query_scores))
+
+
+@pytest.mark.skipif(not util.is_datasets_available(), reason="datasets is not installed")
+def test_load_dataset_columns(tmp_path) -> None:
+    """Tests that util._load_dataset_columns filters the rows and reuses its Arrow cache until the dataset changes"""
+    dataset_dir = tmp_path / "dataset"
+    dataset_dir.mkdir()
+    (dataset_dir / "README.md").write_text("---\nconfigs:\n- config_name: corpus\n  data_files: corpus.jsonl\n---\n")
+    (dataset_dir / "corpus.jsonl").write_text(
+        '{"_id": "d1", "text": "first", "title": "a"}\n{"_id": "d2", "text": "", "title": "b"}\n'
+    )
+    cache_folder = tmp_path / "cache"
+
+    expected = {"_id": ["d1"], "text": ["first"]}
+    columns = util._load_dataset_columns(
+        str(dataset_dir), "corpus", ["_id", "text"], filter_empty="text", cache_folder=str(cache_folder)
+    )
+    assert columns == expected
+    assert len(list(cache_folder.rglob("*.arrow"))) == 1
+
+    columns = util._load_dataset_columns(
+        str(dataset_dir), "corpus", ["_id", "text"], filter_empty="text", cache_folder=str(cache_folder)
+    )
+    assert columns == expected
+    assert len(list(cache_folder.rglob("*.arrow"))) == 1
+
+    # A new version of the dataset is not served from the Arrow file of the previous version
+    (dataset_dir / "README.md").write_text(
+        "---\nconfigs:\n- config_name: corpus\n  data_files: corpus-v2.jsonl\n---\n"
+    )
+    (dataset_dir / "corpus-v2.jsonl").write_text('{"_id": "d3", "text": "third", "title": "c"}\n')
+    columns = util._load_dataset_columns(
+        str(dataset_dir), "corpus", ["_id", "text"], filter_empty="text", cache_folder=str(cache_folder)
+    )
+    assert columns == {"_id": ["d3"], "text": ["third"]}
+    assert len(list(cache_folder.rglob("*.arrow"))) == 2
+
+
+def test_get_model_fingerprint() -> None:
+    """Tests that the fingerprint changes with any change to the weights, including moment-preserving ones"""
+    model = torch.nn.Linear(4, 3)
+    fingerprint = util.get_model_fingerprint(model)
+    assert util.get_model_fingerprint(model) == fingerprint
+
+    # Permuting the rows keeps the sum and the sum of squares of the weights
+    with torch.no_grad():
+        model.weight.copy_(model.weight[[2, 0, 1]])
+    permuted_fingerprint = util.get_model_fingerprint(model)
+    assert permuted_fingerprint != fingerprint
+
+    # Replacing a parameter also changes the fingerprint, and a model with the same weights has the same fingerprint
+    model.bias = torch.nn.Parameter(model.bias.detach() + 1)
+    assert util.get_model_fingerprint(model) != permuted_fingerprint
+    copied_model = torch.nn.Linear(4, 3)
+    copied_model.load_state_dict(model.state_dict())
+    assert util.get_model_fingerprint(copied_model) == util.get_model_fingerprint(model)